@@ -0,0 +1,99 @@
+"""
+Verificação das reservas de horário (routers/appointments.py)
+Cria um médico de teste e confere, pela API (sem subir o servidor), que o
+índice único parcial de horários ativos é respeitado:
+- reservas concorrentes do mesmo horário: só uma é criada, as outras 400
+- médico inexistente: 404
+- depois de cancelar, o horário pode ser reservado de novo
+- PATCH que reativa (scheduled/confirmed) um agendamento cancelado cujo
+  horário já foi reservado de novo: 400, não 500
+O médico de teste e seus agendamentos são apagados no fim
+
+    python check_bookings.py
+"""
+import asyncio
+import sys
+import uuid
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import delete
+
+from database import SessionLocal, async_engine, init_db
+from main import app
+from models import Doctor
+from routers.appointments import SLOT_TAKEN_DETAIL
+
+CONCURRENT_BOOKINGS = 10
+
+
+def booking(doctor_id: int, slot_date: date, name: str = "Paciente Teste") -> dict:
+    return {
+        "doctor_id": doctor_id,
+        "patient_name": name,
+        "patient_email": "paciente.teste@example.com",
+        "patient_phone": "(11) 90000-0000",
+        "appointment_date": slot_date.isoformat(),
+        "appointment_time": "09:00:00",
+    }
+
+
+async def main() -> bool:
+    init_db()
+    with SessionLocal() as db:
+        doctor = Doctor(co_profissional=f"CHECK-{uuid.uuid4().hex[:12]}", name="Médico Teste", establishment_id="0000000")
+        db.add(doctor)
+        db.commit()
+        doctor_id = doctor.id
+
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    slot_date = date.today() + timedelta(days=30)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as api:
+            responses = await asyncio.gather(*(
+                api.post("/api/appointments/", json=booking(doctor_id, slot_date, f"Paciente {i}"))
+                for i in range(CONCURRENT_BOOKINGS)
+            ))
+            statuses = sorted(r.status_code for r in responses)
+            check("reservas concorrentes: uma criada, as demais recusadas",
+                  statuses == [201] + [400] * (CONCURRENT_BOOKINGS - 1), str(statuses))
+            first = next(r.json() for r in responses if r.status_code == 201)
+
+            response = await api.post("/api/appointments/", json=booking(2**31 - 1, slot_date))
+            check("médico inexistente: 404", response.status_code == 404, str(response.status_code))
+
+            await api.delete(f"/api/appointments/{first['id']}")
+            response = await api.post("/api/appointments/", json=booking(doctor_id, slot_date, "Paciente Novo"))
+            check("horário cancelado reservado de novo", response.status_code == 201, response.text)
+            second = response.json()
+
+            for status in ("scheduled", "confirmed"):
+                response = await api.patch(f"/api/appointments/{first['id']}", json={"status": status})
+                check(f"PATCH cancelado -> {status} com o horário ocupado: 400",
+                      response.status_code == 400 and response.json().get("detail") == SLOT_TAKEN_DETAIL,
+                      f"{response.status_code} {response.text}")
+
+            response = await api.get(f"/api/appointments/{first['id']}")
+            check("agendamento recusado continua cancelado", response.json().get("status") == "cancelled", response.text)
+
+            response = await api.patch(f"/api/appointments/{second['id']}", json={"status": "confirmed"})
+            check("PATCH do agendamento ativo no próprio horário", response.status_code == 200, response.text)
+            response = await api.patch(f"/api/appointments/{first['id']}", json={"status": "completed"})
+            check("PATCH para status inativo não conflita", response.status_code == 200, response.text)
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Doctor).where(Doctor.id == doctor_id))
+            db.commit()
+        await async_engine.dispose()
+
+    return not failures
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
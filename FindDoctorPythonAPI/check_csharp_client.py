@@ -0,0 +1,145 @@
+"""
+Verificação do CSharpAPIClient contra o stub local (csharp_stub.py)
+Sobe o stub numa porta livre e confere: novas tentativas em 5xx, orçamento de
+timeout por endpoint, circuito abrindo e falhando na hora, resposta vencida
+servida com o C# fora do ar e recuperação pelo meio-aberto
+
+    python check_csharp_client.py
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+# Orçamentos curtos para o teste terminar rápido (antes de importar config)
+TEST_SETTINGS = {
+    "CSHARP_SEARCH_TIMEOUT": "0.5",
+    "CSHARP_DETAILS_TIMEOUT": "0.5",
+    "CSHARP_RETRIES": "2",
+    "CSHARP_RETRY_BACKOFF": "0.05",
+    "CSHARP_BREAKER_FAILURES": "3",
+    "CSHARP_BREAKER_RESET_SECONDS": "1",
+    "CSHARP_GEO_CACHE_TTL_SECONDS": "1",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port: int):
+    import uvicorn
+    from csharp_stub import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def main() -> int:
+    import httpx
+    from csharp_client import CSharpAPIClient, CSharpUnavailableError
+    from csharp_stub import CENTER
+
+    client = CSharpAPIClient()
+    control = httpx.AsyncClient(base_url=client.base_url)
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    async def configure(**config):
+        await control.post("/_stub/reset")
+        if config:
+            await control.post("/_stub/config", json=config)
+
+    async def upstream_calls() -> int:
+        return sum((await control.get("/_stub/stats")).json()["calls"].values())
+
+    lat, lon = CENTER
+
+    # 1. Falhas transitórias: 2 respostas 503 seguidas são absorvidas pelas novas tentativas
+    await configure(fail_next=2)
+    results = await client.search_establishments(lat, lon, 2.0)
+    check("5xx transitório recuperado com novas tentativas", len(results) > 0 and client.retries == 2,
+          f"{len(results)} estabelecimentos, {client.retries} novas tentativas")
+    client.reset_upstream_stats()
+
+    # 2. Backend lento: cada tentativa respeita o timeout de leitura do endpoint
+    await configure(delay_ms=2000)
+    started = time.perf_counter()
+    try:
+        await client.get_establishment_details("9000001")
+        check("timeout de leitura por endpoint", False, "não levantou CSharpUnavailableError")
+    except CSharpUnavailableError:
+        elapsed = time.perf_counter() - started
+        # 3 tentativas x 0.5 s + backoff; sem orçamento seriam 3 x 2 s
+        check("timeout de leitura por endpoint", elapsed < 2.0, f"{elapsed:.2f} s para 3 tentativas")
+
+    # 3. Circuito aberto: falha na hora, sem chamar o backend
+    await configure(down=True)
+    client.reset_upstream_stats()
+    try:
+        await client.get_establishment_details("9000002")
+    except CSharpUnavailableError:
+        pass
+    calls_before = await upstream_calls()
+    started = time.perf_counter()
+    try:
+        await client.get_establishment_details("9000003")
+        check("circuito aberto falha na hora", False, "não levantou CSharpUnavailableError")
+    except CSharpUnavailableError:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        calls = await upstream_calls() - calls_before
+        check("circuito aberto falha na hora", client.breaker.state == "open" and calls == 0 and elapsed_ms < 20,
+              f"estado {client.breaker.state}, {calls} chamadas ao C#, {elapsed_ms:.1f} ms")
+
+    # 4. Resposta vencida servida com o C# fora do ar
+    await configure()
+    await asyncio.sleep(client.breaker.reset_timeout)
+    fresh = await client.search_establishments(lat + 0.05, lon, 1.0)
+    await configure(down=True)
+    await asyncio.sleep(1.1)  # TTL dos tiles vencido
+    stale = await client.search_establishments(lat + 0.05, lon, 1.0)
+    check("resposta vencida servida com o C# fora do ar",
+          [e["codigoCNES"] for e in stale] == [e["codigoCNES"] for e in fresh] and len(fresh) > 0,
+          f"{len(stale)} estabelecimentos, stale_served={client.geo_cache.stats()['stale_served']}")
+
+    # 5. Sem cache e sem backend: erro explícito, não lista vazia
+    try:
+        await client.search_establishments(lat - 0.1, lon - 0.1, 1.0)
+        check("indisponível sem cache levanta erro", False, "devolveu resultado")
+    except CSharpUnavailableError:
+        check("indisponível sem cache levanta erro", True)
+
+    # 6. Recuperação: passado o reset_timeout, a chamada de teste fecha o circuito
+    await configure()
+    await asyncio.sleep(client.breaker.reset_timeout)
+    details = await client.get_establishment_details("9000004")
+    check("circuito fecha após o backend voltar", details is not None and client.breaker.state == "closed",
+          f"estado {client.breaker.state}")
+
+    # 7. 404 não conta como falha do backend
+    missing = await client.get_establishment_details("404")
+    check("404 devolve None sem abrir o circuito", missing is None and client.breaker.stats()["consecutive_failures"] == 0)
+
+    print(f"\nupstream: {client.upstream_stats()}")
+    await control.aclose()
+    await client.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    port = free_port()
+    os.environ.update(TEST_SETTINGS)
+    os.environ["CSHARP_API_URL"] = f"http://127.0.0.1:{port}"
+    start_stub(port)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,107 @@
+"""
+Verificação da leitura incremental de arrays JSON (json_stream.py)
+Confere que iter_json_array devolve o mesmo que json.loads com o corpo
+cortado em pedaços de todos os tamanhos (inclusive no meio de caracteres
+UTF-8, escapes e números), que erros de formato levantam ValueError e que
+um único elemento grande dividido em muitos pedaços pequenos é lido em tempo
+linear (cada elemento é decodificado uma vez, não a cada pedaço)
+
+    python check_json_stream.py
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+from json_stream import iter_json_array, map_array
+
+SAMPLES = [
+    [],
+    [1, -2.5, 1e3, True, False, None, "texto"],
+    [{"nome": "Clínica São José", "obs": "aspas \" e barra \\ e ]} dentro", "emoji": "🩺"}],
+    [[1, [2, [3, {"a": []}]]], {"b": {"c": [{}]}}, "é\\u00e9"],
+    [{"codigoCNES": str(9000000 + i), "profissionais": [{"nome": f"Prof {j}", "sus": j % 2 == 0} for j in range(5)]}
+     for i in range(50)],
+]
+INVALID = [b'{"a": 1}', b"[1, 2", b'[{"a": 1]', b"[1] 2", b'["aberta', b"[12x]"]
+
+
+def chunked(data: bytes, sizes):
+    """Pedaços de data com os tamanhos dados (ciclando)"""
+    async def gen():
+        pos, k = 0, 0
+        while pos < len(data):
+            size = sizes[k % len(sizes)]
+            yield data[pos:pos + size]
+            pos += size
+            k += 1
+    return gen()
+
+
+async def read(data: bytes, sizes) -> list:
+    return [item async for item in iter_json_array(chunked(data, sizes))]
+
+
+async def main() -> int:
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    # 1. Mesmo resultado que json.loads, com cortes em qualquer posição
+    rng = random.Random(7)
+    mismatches = 0
+    runs = 0
+    for sample in SAMPLES:
+        for indent in (None, 2):
+            data = json.dumps(sample, ensure_ascii=False, indent=indent).encode("utf-8")
+            for sizes in ([1], [2], [3], [7], [len(data) or 1], [rng.randint(1, 9) for _ in range(20)]):
+                runs += 1
+                mismatches += await read(data, sizes) != sample
+    check("mesmo resultado que json.loads com qualquer corte", mismatches == 0, f"{runs} combinações, {mismatches} diferentes")
+
+    # 2. Erros de formato levantam ValueError
+    accepted = []
+    for data in INVALID:
+        try:
+            await read(data, [1])
+            accepted.append(data)
+        except ValueError:
+            pass
+    check("formato inválido levanta ValueError", not accepted, f"aceitos: {accepted}" if accepted else f"{len(INVALID)} casos")
+
+    # 3. map_array reescreve o array item a item
+    data = json.dumps(SAMPLES[4]).encode("utf-8")
+    out = b"".join([c async for c in map_array(chunked(data, [100]), lambda e: e["codigoCNES"])])
+    check("map_array aplica a função a cada item", json.loads(out) == [e["codigoCNES"] for e in SAMPLES[4]])
+
+    # 4. Um único elemento grande em pedaços de 64 bytes: tempo linear no tamanho
+    timings = {}
+    for professionals in (5_000, 20_000):
+        element = {"codigoCNES": "9000001", "profissionais": [
+            {"nome": f"Profissional {j}", "cns": "1" * 15, "sus": True, "especialidadeNome": "MEDICO CLINICO"}
+            for j in range(professionals)
+        ]}
+        data = json.dumps([element]).encode("utf-8")
+        best = float("inf")
+        for _ in range(3):  # melhor de 3, para o ruído não mascarar a proporção
+            started = time.perf_counter()
+            items = await read(data, [64])
+            best = min(best, time.perf_counter() - started)
+        timings[len(data)] = best
+        if items != [element]:
+            check("elemento grande lido inteiro", False)
+    (small, t_small), (large, t_large) = sorted(timings.items())
+    ratio = t_large / t_small
+    check("elemento em muitos pedaços lido em tempo linear",
+          ratio < (large / small) * 2,
+          f"{small / 1e6:.1f} MB em {small // 64} pedaços: {t_small * 1000:.0f} ms; "
+          f"{large / 1e6:.1f} MB em {large // 64} pedaços: {t_large * 1000:.0f} ms (x{ratio:.1f} para x{large / small:.1f} bytes)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,225 @@
+"""
+Verificação das queries dos routers
+Popula o banco com ~1M de agendamentos, chama os endpoints de listagem e:
+- roda EXPLAIN em cada SQL emitido; falha se alguma query cair em Seq Scan
+  numa das tabelas populadas
+- conta os SQLs por requisição; falha se o número crescer com o tamanho da
+  página (N+1) ou passar do limite do endpoint
+
+ATENÇÃO: --seed apaga os dados das tabelas. Use um banco descartável:
+    DATABASE_NAME=agendamento_check python check_queries.py --seed
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+import httpx
+from sqlalchemy import event, text
+from database import engine, async_engine, init_db
+from migrate_db import apply_migrations
+from main import app
+from pagination import encode_cursor
+
+SEEDED_TABLES = {"appointments", "doctors", "doctor_availabilities", "edit_suggestions"}
+
+SEED_SQL = [
+    "TRUNCATE appointments, doctor_availabilities, doctors, edit_suggestions RESTART IDENTITY CASCADE",
+    # 100k médicos em 5k estabelecimentos, especialidades reais do JSON
+    """
+    INSERT INTO doctors (co_profissional, name, specialty, establishment_id, establishment_name, is_active, created_at)
+    SELECT 'CHK' || g, 'Médico ' || g,
+           (CAST(:specialties AS text[]))[1 + g % :n_specialties],
+           (1000000 + g % 5000)::text, 'Estabelecimento ' || (g % 5000), true, now()
+    FROM generate_series(1, 100000) g
+    """,
+    # Segunda a sexta, 08:00-12:00
+    """
+    INSERT INTO doctor_availabilities (doctor_id, day_of_week, start_time, end_time, is_available)
+    SELECT d, dow, time '08:00', time '12:00', true
+    FROM generate_series(1, 100000) d, generate_series(0, 4) dow
+    """,
+    # 1M de agendamentos: 10 por médico, espalhados em 2 anos (sem conflito de horário)
+    """
+    INSERT INTO appointments (doctor_id, patient_name, patient_email, patient_phone,
+                              appointment_date, appointment_time, status, created_at, updated_at)
+    SELECT 1 + g % 100000, 'Paciente ' || g % 200000, 'paciente' || g % 200000 || '@example.com',
+           '(11) 90000-0000', current_date - 365 + g % 730,
+           time '08:00' + (g % 16) * interval '30 minutes',
+           CASE g % 10 WHEN 0 THEN 'cancelled' WHEN 1 THEN 'completed' WHEN 2 THEN 'confirmed' ELSE 'scheduled' END,
+           now(), now()
+    FROM generate_series(1, 1000000) g
+    """,
+    """
+    INSERT INTO edit_suggestions (establishment_id, establishment_name, field, current_value,
+                                  suggested_value, submitted_by, submitted_at, status)
+    SELECT (1000000 + g % 5000)::text, 'Estabelecimento ' || (g % 5000), 'telefone', '(11) 3000-0000',
+           '(11) 3000-0001', 'usuario' || g % 1000 || '@example.com', now() - g * interval '1 minute',
+           CASE g % 3 WHEN 0 THEN 'pending' WHEN 1 THEN 'approved' ELSE 'rejected' END
+    FROM generate_series(1, 200000) g
+    """,
+]
+
+# (descrição, path, query params) - um por formato de query dos routers
+PROBES = [
+    ("agendamentos do médico", "/api/appointments/", {"doctor_id": 4242}),
+    ("agendamentos do médico por status", "/api/appointments/", {"doctor_id": 4242, "status": "scheduled"}),
+    ("agendamentos do paciente", "/api/appointments/", {"patient_email": "paciente4242@example.com"}),
+    ("agendamentos por data", "/api/appointments/", {"appointment_date": date.today().isoformat()}),
+    ("listagem geral de agendamentos", "/api/appointments/", {}),
+    ("agendamento por id", "/api/appointments/4242", {}),
+    ("dashboard do médico", "/api/appointments/doctor/4242/dashboard", {
+        "start_date": (date.today() - timedelta(days=30)).isoformat(),
+        "end_date": (date.today() + timedelta(days=30)).isoformat()
+    }),
+    ("médicos do estabelecimento", "/api/doctors/", {"establishment_id": "1004242"}),
+    ("médicos por especialidade", "/api/doctors/", {"specialty": "cardiologista intervencionista"}),
+    ("disponibilidade do médico", "/api/doctors/4242/availability", {}),
+    ("horários livres do médico", "/api/doctors/4242/slots", {}),
+    ("primeiros horários do estabelecimento", "/api/doctors/slots/earliest", {"establishment_id": "1004242"}),
+    ("sugestões pendentes", "/api/edit-suggestions/", {"status": "pending"}),
+    ("sugestões do estabelecimento", "/api/edit-suggestions/", {"establishment_id": "1004242"}),
+    # Páginas profundas via cursor
+    ("agendamentos (cursor)", "/api/appointments/", {
+        "cursor": encode_cursor([date.today() - timedelta(days=200), time(9, 0), 500000])
+    }),
+    ("agendamentos do médico (cursor)", "/api/appointments/", {
+        "doctor_id": 4242, "cursor": encode_cursor([date.today(), time(9, 0), 500000])
+    }),
+    ("médicos (cursor)", "/api/doctors/", {"cursor": encode_cursor([80000])}),
+    ("sugestões (cursor)", "/api/edit-suggestions/", {
+        "cursor": encode_cursor([datetime.now() - timedelta(days=60), 100000])
+    }),
+    ("sugestões pendentes (cursor)", "/api/edit-suggestions/", {
+        "status": "pending", "cursor": encode_cursor([datetime.now() - timedelta(days=60), 100000])
+    }),
+]
+
+# (descrição, path, query params, máximo de SQLs) - medido com páginas de 1, 10 e 100 itens
+STATEMENT_BUDGETS = [
+    ("listagem de agendamentos", "/api/appointments/", {}, 1),
+    ("agendamentos do paciente", "/api/appointments/", {"patient_email": "paciente4242@example.com"}, 1),
+    ("agendamento por id", "/api/appointments/4242", {}, 1),
+    ("listagem de médicos", "/api/doctors/", {}, 1),
+    ("listagem de sugestões", "/api/edit-suggestions/", {"status": "pending"}, 1),
+    # Médicos, janelas e agendamentos do período numa única query (agregados por médico)
+    ("primeiros horários livres", "/api/doctors/slots/earliest", {"establishment_id": "1004242"}, 1),
+]
+PAGE_SIZES = (1, 10, 100)
+
+def seed():
+    """Popula as tabelas com o dataset de verificação"""
+    json_path = Path(__file__).parent / "medical_specialties.json"
+    specialties = [s["nome"] for s in json.loads(json_path.read_text(encoding="utf-8"))]
+    params = {"specialties": specialties, "n_specialties": len(specialties)}
+
+    print("🌱 Populando banco de verificação (pode levar alguns minutos)...")
+    with engine.begin() as conn:
+        for sql in SEED_SQL:
+            conn.execute(text(sql), params)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+    print("✅ Banco populado")
+
+def find_seq_scans(plan: dict) -> list:
+    """Lista as tabelas populadas lidas com Seq Scan no plano"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in SEEDED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+class StatementCapture:
+    """Captura os SQLs emitidos pelo engine async enquanto ativo"""
+
+    def __init__(self):
+        self.statements = []
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self._capture)
+
+def api_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check")
+
+async def check_plans() -> bool:
+    """Chama cada endpoint e verifica o plano dos SQLs emitidos"""
+    ok = True
+    with StatementCapture() as capture:
+        async with api_client() as client:
+            for description, path, params in PROBES:
+                capture.statements.clear()
+                response = await client.get(path, params=params)
+                if response.status_code != 200:
+                    print(f"❌ {description}: HTTP {response.status_code}")
+                    ok = False
+                    continue
+
+                statements = list(capture.statements)
+                seq_scans = []
+                async with async_engine.connect() as conn:
+                    for statement, parameters in statements:
+                        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                        plan = result.scalar()
+                        if isinstance(plan, str):
+                            plan = json.loads(plan)
+                        seq_scans.extend(find_seq_scans(plan[0]["Plan"]))
+
+                if seq_scans:
+                    ok = False
+                    print(f"❌ {description}: Seq Scan em {', '.join(sorted(set(seq_scans)))}")
+                else:
+                    print(f"✅ {description}: {len(statements)} query(s) com índice")
+    return ok
+
+async def check_statement_counts() -> bool:
+    """Verifica que o número de SQLs por requisição não depende do tamanho da página"""
+    ok = True
+    with StatementCapture() as capture:
+        async with api_client() as client:
+            for description, path, params, budget in STATEMENT_BUDGETS:
+                counts = []
+                for limit in PAGE_SIZES:
+                    capture.statements.clear()
+                    response = await client.get(path, params={**params, "limit": limit})
+                    if response.status_code != 200:
+                        print(f"❌ {description}: HTTP {response.status_code}")
+                        ok = False
+                        break
+                    counts.append(len(capture.statements))
+                else:
+                    summary = ", ".join(f"{limit} itens: {count}" for limit, count in zip(PAGE_SIZES, counts))
+                    if len(set(counts)) > 1 or max(counts) > budget:
+                        ok = False
+                        print(f"❌ {description}: SQLs por requisição ({summary}), limite {budget}")
+                    else:
+                        print(f"✅ {description}: {counts[0]} SQL(s) por requisição ({summary})")
+    return ok
+
+async def main(args) -> bool:
+    if args.seed:
+        init_db()
+        if not apply_migrations(engine):
+            return False
+        seed()
+    try:
+        plans_ok = await check_plans()
+        counts_ok = await check_statement_counts()
+        return plans_ok and counts_ok
+    finally:
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="Apaga e popula as tabelas antes da verificação")
+    ok = asyncio.run(main(parser.parse_args()))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,77 @@
+"""
+Circuit breaker para chamadas a serviços externos
+Depois de failure_threshold falhas seguidas o circuito abre e as chamadas
+falham na hora (CircuitOpenError), sem ocupar conexões nem workers. Passado
+reset_timeout, uma única chamada de teste é liberada (meio-aberto): sucesso
+fecha o circuito, falha abre de novo
+"""
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Circuito aberto: a chamada nem foi feita"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = CLOSED
+        self._probing = False
+        self._probe_started = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def before_call(self):
+        """Levanta CircuitOpenError se a chamada não deve ser feita agora"""
+        state = self.state
+        if state == CLOSED:
+            return
+        now = time.monotonic()
+        # Teste que nunca terminou (chamador cancelado) não prende o circuito aberto
+        if state == HALF_OPEN and (not self._probing or now - self._probe_started >= self.reset_timeout):
+            self._probing = True
+            self._probe_started = now
+            return
+        self.rejected += 1
+        raise CircuitOpenError(f"Circuito '{self.name}' aberto")
+
+    def record_success(self):
+        self._failures = 0
+        self._probing = False
+        self._state = CLOSED
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._state != OPEN or self._probing:
+                self.opened += 1
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def reset_stats(self):
+        self.opened = self.rejected = 0
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
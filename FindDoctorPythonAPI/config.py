@@ -8,8 +8,55 @@ class Settings(BaseSettings):
     DATABASE_USER: str = "postgres"
     DATABASE_PASSWORD: str = "postgres"
     
+    # Pool de conexões do engine async (routers); pool_size + max_overflow por
+    # processo, somado entre workers, precisa caber no max_connections do Postgres
+    DATABASE_POOL_SIZE: int = 20
+    DATABASE_MAX_OVERFLOW: int = 30
+    # Engine sync (init_db, migrações, scripts): pool mínimo
+    DATABASE_SYNC_POOL_SIZE: int = 2
+    DATABASE_SYNC_MAX_OVERFLOW: int = 3
+    DATABASE_POOL_TIMEOUT: int = 30  # segundos esperando uma conexão livre
+    DATABASE_POOL_RECYCLE: int = 1800  # segundos até reciclar uma conexão
+    DATABASE_POOL_PRE_PING: bool = True
+    
+    # Debug / instrumentação
+    DATABASE_ECHO: bool = False  # Loga todo SQL no stdout (apenas para debug)
+    DB_METRICS_ENABLED: bool = False  # Histograma de duração das queries em /metrics/db
+    
+    # Horários livres (/api/doctors/{id}/slots)
+    APPOINTMENT_DURATION_MINUTES: int = 30  # Duração de um agendamento existente
+    SLOTS_MAX_DAYS: int = 31  # Maior intervalo aceito por consulta
+    
     # C# API
     CSHARP_API_URL: str = "http://localhost:5210"
+    CSHARP_MAX_CONNECTIONS: int = 50
+    CSHARP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    CSHARP_KEEPALIVE_EXPIRY: float = 30.0
+    CSHARP_HTTP2: bool = False  # Requer o pacote h2 (httpx[http2]); só negocia HTTP/2 sobre HTTPS
+    CSHARP_CONNECT_TIMEOUT: float = 2.0
+    CSHARP_POOL_TIMEOUT: float = 2.0  # Espera por uma conexão livre do pool
+    CSHARP_SEARCH_TIMEOUT: float = 8.0  # Leitura: busca de estabelecimentos
+    CSHARP_DETAILS_TIMEOUT: float = 5.0  # Leitura: detalhes por CNES
+    CSHARP_ADDRESS_TIMEOUT: float = 5.0  # Leitura: busca de endereço
+    CSHARP_RETRIES: int = 2  # Novas tentativas de um GET após timeout/erro de conexão/5xx
+    CSHARP_RETRY_BACKOFF: float = 0.2  # Base (s) do backoff exponencial com jitter
+    CSHARP_RETRY_BACKOFF_MAX: float = 2.0
+    CSHARP_BREAKER_FAILURES: int = 5  # Falhas seguidas que abrem o circuito
+    CSHARP_BREAKER_RESET_SECONDS: float = 15.0  # Tempo aberto antes de testar de novo
+    CSHARP_BATCH_CONCURRENCY: int = 8  # Chamadas simultâneas ao C# por lote de detalhes
+    CSHARP_BATCH_MAX_CODES: int = 100  # Códigos CNES aceitos por lote
+    
+    # Cache das respostas da API C#
+    CSHARP_CACHE_TTL_SECONDS: int = 300  # Busca de estabelecimentos (0 desativa)
+    CSHARP_CACHE_MAX_ENTRIES: int = 2048
+    CSHARP_CACHE_COORD_PRECISION: int = 3  # Casas decimais de lat/lon na chave (~110 m)
+    CSHARP_DETAILS_CACHE_TTL_SECONDS: int = 900  # Detalhes de estabelecimento (0 desativa)
+    CSHARP_DETAILS_CACHE_MAX_ENTRIES: int = 4096
+    CSHARP_CACHE_STALE_SECONDS: int = 3600  # Respostas vencidas servidas com o C# fora do ar
+    CSHARP_GEO_CACHE_TTL_SECONDS: int = 300  # Tiles geohash da busca por raio (0 desativa)
+    CSHARP_GEO_CACHE_MAX_TILES: int = 20000
+    CSHARP_GEO_CACHE_PRECISION: int = 6  # Tiles de ~1,2 km x 0,6 km
+    CSHARP_GEO_CACHE_MAX_RADIUS_KM: float = 10.0  # Acima disso usa o cache por chave exata
     
     # API
     API_HOST: str = "0.0.0.0"
@@ -19,6 +66,10 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
+    
     class Config:
         env_file = ".env"
 
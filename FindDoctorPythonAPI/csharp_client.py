@@ -1,30 +1,137 @@
+import asyncio
+import importlib.util
+import random
 import httpx
-import json
-from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from circuit_breaker import CircuitBreaker, CircuitOpenError
 from config import settings
+from geo_cache import GeoTileCache
+from response_cache import ResponseCache
 from schemas import EstablishmentFromCSharp, SpecialtyFromCSharp
+from specialty_registry import specialty_registry
+
+# Respostas do C# que valem nova tentativa (e contam como falha no circuito)
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class CSharpUnavailableError(Exception):
+    """API C# fora do ar: timeout, erro de conexão, 5xx ou circuito aberto"""
+
+
+def _endpoint_timeout(read: float) -> httpx.Timeout:
+    return httpx.Timeout(
+        read,
+        connect=settings.CSHARP_CONNECT_TIMEOUT,
+        pool=settings.CSHARP_POOL_TIMEOUT
+    )
+
 
 class CSharpAPIClient:
     """Cliente para comunicação com a API C# do FindDoctor"""
     
     def __init__(self):
         self.base_url = settings.CSHARP_API_URL
-        self.client = httpx.AsyncClient(timeout=30.0)
+        http2 = settings.CSHARP_HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.CSHARP_HTTP2 and not http2:
+            print("⚠️  CSHARP_HTTP2 ativo, mas o pacote h2 não está instalado: usando HTTP/1.1")
+        # Pool de conexões keep-alive compartilhado por todas as requisições
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.CSHARP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CSHARP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.CSHARP_KEEPALIVE_EXPIRY
+            ),
+            timeout=_endpoint_timeout(settings.CSHARP_SEARCH_TIMEOUT)
+        )
+        self.search_timeout = _endpoint_timeout(settings.CSHARP_SEARCH_TIMEOUT)
+        self.details_timeout = _endpoint_timeout(settings.CSHARP_DETAILS_TIMEOUT)
+        self.address_timeout = _endpoint_timeout(settings.CSHARP_ADDRESS_TIMEOUT)
+        self.breaker = CircuitBreaker(
+            "csharp_api",
+            failure_threshold=settings.CSHARP_BREAKER_FAILURES,
+            reset_timeout=settings.CSHARP_BREAKER_RESET_SECONDS
+        )
+        self.retries = 0
+        # Com o C# fora do ar, respostas vencidas ainda são servidas por CSHARP_CACHE_STALE_SECONDS
+        stale = {"stale_seconds": settings.CSHARP_CACHE_STALE_SECONDS, "stale_on": (CSharpUnavailableError,)}
+        self.search_cache = ResponseCache(
+            "establishments_search",
+            max_entries=settings.CSHARP_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CSHARP_CACHE_TTL_SECONDS,
+            **stale
+        )
+        self.details_cache = ResponseCache(
+            "establishment_details",
+            max_entries=settings.CSHARP_DETAILS_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CSHARP_DETAILS_CACHE_TTL_SECONDS,
+            **stale
+        )
+        self.geo_cache = GeoTileCache(
+            "establishments_geo",
+            precision=settings.CSHARP_GEO_CACHE_PRECISION,
+            max_tiles=settings.CSHARP_GEO_CACHE_MAX_TILES,
+            ttl_seconds=settings.CSHARP_GEO_CACHE_TTL_SECONDS,
+            max_radius_km=settings.CSHARP_GEO_CACHE_MAX_RADIUS_KM,
+            **stale
+        )
+    
+    async def _get(
+        self,
+        path: str,
+        timeout: httpx.Timeout,
+        params: Optional[dict] = None,
+        stream: bool = False
+    ) -> httpx.Response:
+        """
+        GET com novas tentativas (backoff exponencial com jitter) em timeout,
+        erro de conexão e 5xx, passando pelo circuit breaker. Respostas 4xx
+        voltam normalmente; indisponibilidade vira CSharpUnavailableError.
+        Com stream=True o corpo não é lido: o chamador consome e fecha a resposta
+        """
+        attempts = settings.CSHARP_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                raise CSharpUnavailableError(str(e)) from e
+            try:
+                request = self.client.build_request("GET", f"{self.base_url}{path}", params=params, timeout=timeout)
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                error = f"HTTP {response.status_code}"
+                await response.aclose()
+            self.breaker.record_failure()
+            if attempt + 1 < attempts:
+                self.retries += 1
+                backoff = min(settings.CSHARP_RETRY_BACKOFF_MAX, settings.CSHARP_RETRY_BACKOFF * 2 ** attempt)
+                await asyncio.sleep(random.uniform(0, backoff))
+        raise CSharpUnavailableError(f"GET {path} falhou após {attempts} tentativa(s): {error}")
     
     async def search_address(self, address: str) -> List[dict]:
         """Busca endereço via API C#"""
         try:
-            response = await self.client.get(
-                f"{self.base_url}/api/Address/buscar",
-                params={"endereco": address}
-            )
+            response = await self._get("/api/Address/buscar", self.address_timeout, {"endereco": address})
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
             print(f"Erro ao buscar endereço: {e}")
             return []
     
+    @staticmethod
+    def _search_filters(specialty_id: Optional[str], doctor_name: Optional[str]) -> dict:
+        filters = {}
+        if specialty_id:
+            filters["especialidadeId"] = str(specialty_id).strip()
+        if doctor_name and doctor_name.strip():
+            filters["nomeMedico"] = " ".join(doctor_name.split())
+        return filters
+    
     async def search_establishments(
         self,
         latitude: float,
@@ -33,49 +140,133 @@ class CSharpAPIClient:
         specialty_id: Optional[str] = None,
         doctor_name: Optional[str] = None
     ) -> List[dict]:
-        """Busca estabelecimentos próximos via API C#"""
-        try:
-            params = {
-                "latitude": latitude,
-                "longitude": longitude,
-                "raioKm": radius_km
-            }
-            
-            if specialty_id:
-                params["especialidadeId"] = specialty_id
-            if doctor_name:
-                params["nomeMedico"] = doctor_name
-            
-            response = await self.client.get(
-                f"{self.base_url}/api/Estabelecimento/proximos",
-                params=params
+        """Busca estabelecimentos próximos via API C# (com cache por região)"""
+        filters = self._search_filters(specialty_id, doctor_name)
+        filters_key = (filters.get("especialidadeId"), filters.get("nomeMedico", "").casefold())
+        
+        async def fetch_circle(lat: float, lon: float, radius: float):
+            response = await self._get(
+                "/api/Estabelecimento/proximos",
+                self.search_timeout,
+                {"latitude": lat, "longitude": lon, "raioKm": radius, **filters}
             )
             response.raise_for_status()
             return response.json()
+        
+        try:
+            if self.geo_cache.accepts(radius_km):
+                # Tiles geohash: buscas que se sobrepõem a outras já feitas
+                # (arrastar o mapa) são respondidas sem chamar o C#
+                return await self.geo_cache.search(latitude, longitude, radius_km, filters_key, fetch_circle)
+            
+            # Raio grande: coordenadas/raio quantizados, e o upstream recebe os
+            # valores quantizados para o resultado corresponder exatamente à chave
+            precision = settings.CSHARP_CACHE_COORD_PRECISION
+            lat, lon, radius = round(latitude, precision), round(longitude, precision), round(radius_km, 1)
+            return await self.search_cache.get_or_fetch(
+                (lat, lon, radius) + filters_key,
+                lambda: fetch_circle(lat, lon, radius)
+            )
         except httpx.HTTPError as e:
             print(f"Erro ao buscar estabelecimentos: {e}")
             return []
     
-    async def get_establishment_details(self, cnes_code: str) -> Optional[dict]:
-        """Busca detalhes de um estabelecimento via API C#"""
-        try:
-            response = await self.client.get(
-                f"{self.base_url}/api/Estabelecimento/{cnes_code}"
-            )
+    async def stream_establishments(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 2.0,
+        specialty_id: Optional[str] = None,
+        doctor_name: Optional[str] = None
+    ) -> httpx.Response:
+        """
+        Busca de estabelecimentos sem cache e sem ler o corpo: a resposta do C#
+        volta aberta para ser repassada em streaming (o chamador deve fechá-la)
+        """
+        return await self._get(
+            "/api/Estabelecimento/proximos",
+            self.search_timeout,
+            {"latitude": latitude, "longitude": longitude, "raioKm": radius_km,
+             **self._search_filters(specialty_id, doctor_name)},
+            stream=True
+        )
+    
+    async def _details(self, cnes_code: str, semaphore: Optional[asyncio.Semaphore] = None) -> dict:
+        """Detalhes pelo cache; no miss busca no C# (dentro do semáforo, se houver)"""
+        async def fetch():
+            if semaphore is None:
+                response = await self._get(f"/api/Estabelecimento/{cnes_code}", self.details_timeout)
+            else:
+                async with semaphore:
+                    response = await self._get(f"/api/Estabelecimento/{cnes_code}", self.details_timeout)
             response.raise_for_status()
             return response.json()
+        
+        return await self.details_cache.get_or_fetch(cnes_code, fetch)
+    
+    async def get_establishment_details(self, cnes_code: str) -> Optional[dict]:
+        """Busca detalhes de um estabelecimento via API C# (com cache)"""
+        try:
+            return await self._details(cnes_code.strip())
         except httpx.HTTPError as e:
             print(f"Erro ao buscar detalhes do estabelecimento: {e}")
             return None
     
+    async def get_establishments_details(self, cnes_codes: Iterable[str]) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """
+        Detalhes de vários estabelecimentos em paralelo (no máximo
+        CSHARP_BATCH_CONCURRENCY chamadas ao C# por vez), sem códigos repetidos
+        Devolve (detalhes por CNES, mensagem de erro por CNES)
+        """
+        codes = list(dict.fromkeys(code.strip() for code in cnes_codes if code and code.strip()))
+        semaphore = asyncio.Semaphore(settings.CSHARP_BATCH_CONCURRENCY)
+        outcomes = await asyncio.gather(
+            *(self._details(code, semaphore) for code in codes),
+            return_exceptions=True
+        )
+        
+        results, errors = {}, {}
+        for code, outcome in zip(codes, outcomes):
+            if isinstance(outcome, httpx.HTTPStatusError) and outcome.response.status_code == 404:
+                errors[code] = "Estabelecimento não encontrado"
+            elif isinstance(outcome, CSharpUnavailableError):
+                errors[code] = "API C# indisponível"
+            elif isinstance(outcome, Exception):
+                print(f"Erro ao buscar detalhes do estabelecimento {code}: {outcome}")
+                errors[code] = "Erro ao buscar detalhes do estabelecimento"
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[code] = outcome
+        return results, errors
+    
+    def upstream_stats(self) -> dict:
+        """Estado do circuit breaker e novas tentativas feitas"""
+        return {"circuit": self.breaker.stats(), "retries": self.retries}
+    
+    def reset_upstream_stats(self):
+        self.breaker.reset_stats()
+        self.retries = 0
+    
+    def cache_stats(self) -> dict:
+        """Contadores dos caches de resposta"""
+        return {
+            self.search_cache.name: self.search_cache.stats(),
+            self.details_cache.name: self.details_cache.stats(),
+            self.geo_cache.name: self.geo_cache.stats()
+        }
+    
+    def reset_cache_stats(self):
+        self.search_cache.reset_stats()
+        self.details_cache.reset_stats()
+        self.geo_cache.reset_stats()
+    
     async def get_specialties(self) -> List[dict]:
         """Busca todas as especialidades do arquivo JSON local"""
         try:
             # Usar arquivo local ao invés do endpoint C# com problema
-            json_path = Path(__file__).parent / "medical_specialties.json"
-            with open(json_path, 'r', encoding='utf-8') as f:
-                specialties = json.load(f)
-            return specialties
+            # (carregado uma vez em memória, recarregado se o arquivo mudar)
+            return specialty_registry.all()
         except Exception as e:
             print(f"Erro ao carregar especialidades do arquivo: {e}")
             return []
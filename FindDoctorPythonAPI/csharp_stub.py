@@ -0,0 +1,155 @@
+"""
+Stub local da API C# para testar o CSharpAPIClient sem o backend real
+Serve /api/Estabelecimento/proximos, /api/Estabelecimento/{cnes} e
+/api/Address/buscar com estabelecimentos sintéticos em volta de São Paulo.
+Falhas são controladas em tempo de execução:
+
+    POST /_stub/config  {"delay_ms": 800, "fail_next": 2, "fail_status": 503, "down": true}
+    GET  /_stub/stats   chamadas recebidas por endpoint
+    POST /_stub/reset   volta ao normal e zera os contadores
+
+    python csharp_stub.py --port 5299
+    CSHARP_API_URL=http://localhost:5299 python start.py
+"""
+import argparse
+import asyncio
+import random
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from geo_cache import haversine_km
+from specialty_registry import specialty_registry
+
+CENTER = (-23.5505, -46.6333)
+DEFAULT_CONFIG = {"delay_ms": 0, "fail_next": 0, "fail_status": 503, "down": False}
+
+
+def build_establishments(count: int = 3000, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    specialties = specialty_registry.all()
+    establishments = []
+    for i in range(count):
+        professionals = []
+        for j in range(rng.randint(1, 4)):
+            specialty = rng.choice(specialties)
+            professionals.append({
+                "cO_Profissional": f"STUB{i:05d}{j}",
+                "nome": f"Profissional {i}-{j}",
+                "cns": f"{rng.randrange(10**14, 10**15)}",
+                "sus": rng.random() < 0.5,
+                "especialidadeNome": specialty["nome"]
+            })
+        establishments.append({
+            "codigoCNES": f"{9000000 + i}",
+            "nome": f"Estabelecimento Stub {i}",
+            "cnpj": None,
+            "endereco": f"Rua Stub {i}",
+            "numero": str(rng.randint(1, 2000)),
+            "bairro": "Centro",
+            "cidade": "São Paulo",
+            "uf": "SP",
+            "latitude": CENTER[0] + rng.uniform(-0.25, 0.25),
+            "longitude": CENTER[1] + rng.uniform(-0.25, 0.25),
+            "telefone": "(11) 3000-0000",
+            "profissionais": professionals
+        })
+    return establishments
+
+
+def _endpoint(path: str) -> str:
+    if path.startswith("/api/Address"):
+        return "address"
+    return "proximos" if path.endswith("/proximos") else "details"
+
+
+app = FastAPI(title="FindDoctor C# API (stub)")
+app.state.config = dict(DEFAULT_CONFIG)
+app.state.calls = Counter()
+app.state.establishments = build_establishments()
+app.state.by_cnes = {e["codigoCNES"]: e for e in app.state.establishments}
+# O DTO do C# não traz o id da especialidade do profissional: índice à parte para o filtro
+app.state.specialty_ids = {
+    e["codigoCNES"]: {str(specialty_registry.find_by_name(p["especialidadeNome"])["id"]) for p in e["profissionais"]}
+    for e in app.state.establishments
+}
+
+
+@app.middleware("http")
+async def inject_failures(request: Request, call_next):
+    """Atraso e falhas configurados em /_stub/config (não afetam /_stub/*)"""
+    if request.url.path.startswith("/_stub"):
+        return await call_next(request)
+    config = app.state.config
+    app.state.calls[_endpoint(request.url.path)] += 1
+    if config["down"]:
+        return JSONResponse({"error": "stub fora do ar"}, status_code=config["fail_status"])
+    if config["fail_next"] > 0:
+        config["fail_next"] -= 1
+        return JSONResponse({"error": "falha injetada"}, status_code=config["fail_status"])
+    if config["delay_ms"]:
+        await asyncio.sleep(config["delay_ms"] / 1000)
+    return await call_next(request)
+
+
+@app.get("/api/Estabelecimento/proximos")
+async def proximos(
+    latitude: float,
+    longitude: float,
+    raioKm: float = 5.0,
+    especialidadeId: str = None,
+    nomeMedico: str = None
+):
+    results = []
+    for establishment in app.state.establishments:
+        if haversine_km(latitude, longitude, establishment["latitude"], establishment["longitude"]) > raioKm:
+            continue
+        professionals = establishment["profissionais"]
+        if especialidadeId and especialidadeId not in app.state.specialty_ids[establishment["codigoCNES"]]:
+            continue
+        if nomeMedico and not any(nomeMedico.casefold() in p["nome"].casefold() for p in professionals):
+            continue
+        results.append(establishment)
+    return results
+
+
+@app.get("/api/Estabelecimento/{cnes}")
+async def details(cnes: str):
+    establishment = app.state.by_cnes.get(cnes)
+    if establishment is None:
+        return JSONResponse({"message": "Estabelecimento não encontrado"}, status_code=404)
+    return establishment
+
+
+@app.get("/api/Address/buscar")
+async def address(endereco: str):
+    return [{"endereco": endereco, "latitude": CENTER[0], "longitude": CENTER[1]}]
+
+
+@app.post("/_stub/config")
+async def set_config(config: dict):
+    app.state.config.update({k: v for k, v in config.items() if k in DEFAULT_CONFIG})
+    return app.state.config
+
+
+@app.get("/_stub/stats")
+async def stats():
+    return {"calls": dict(app.state.calls), "config": app.state.config}
+
+
+@app.post("/_stub/reset")
+async def reset():
+    app.state.config = dict(DEFAULT_CONFIG)
+    app.state.calls.clear()
+    return app.state.config
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5299)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -1,10 +1,43 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from db_metrics import query_metrics
+from migrate_db import mark_migrations_applied, pending_migrations
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+# Parâmetros comuns aos dois engines
+common_pool_options = dict(
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+)
+
+# Engine sync: só init_db, migrações e scripts; pool mínimo para não disputar
+# o max_connections do Postgres com o engine async
+engine = create_engine(
+    settings.DATABASE_URL,
+    echo=settings.DATABASE_ECHO,
+    pool_size=settings.DATABASE_SYNC_POOL_SIZE,
+    max_overflow=settings.DATABASE_SYNC_MAX_OVERFLOW,
+    **common_pool_options
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine async (asyncpg) usado pelos routers: é ele que atende as requisições
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    echo=settings.DATABASE_ECHO,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    **common_pool_options
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if settings.DB_METRICS_ENABLED:
+    query_metrics.instrument(engine)
+    query_metrics.instrument(async_engine.sync_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -15,7 +48,30 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency para obter sessão async do banco"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
-    """Cria todas as tabelas no banco"""
+    """
+    Cria as tabelas. Num banco novo o create_all já cria o schema atual e as
+    migrações são só registradas; num banco existente as pendentes ficam para
+    `python migrate_db.py` (a subida não falha por causa delas)
+    """
+    existing = set(inspect(engine).get_table_names()) & set(Base.metadata.tables)
     Base.metadata.create_all(bind=engine)
     print("✅ Tabelas criadas com sucesso!")
+    if not existing:
+        # Sem pg_trgm o índice trigram não foi criado: a 005 fica pendente
+        indexes = {index["name"] for index in inspect(engine).get_indexes("doctors")}
+        mark_migrations_applied(engine, skip=() if "ix_doctors_specialty_trgm" in indexes else ("005",))
+        return
+    pending = pending_migrations(engine)
+    if pending:
+        print(f"⚠️  Migrações pendentes ({', '.join(pending)}): rode python migrate_db.py")
+
+async def close_db():
+    """Fecha os pools de conexão"""
+    await async_engine.dispose()
+    engine.dispose()
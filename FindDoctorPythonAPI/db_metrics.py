@@ -0,0 +1,117 @@
+"""
+Instrumentação de queries SQL: duração, linhas retornadas e rota de origem
+Ativada via DB_METRICS_ENABLED; os dados ficam expostos em /metrics/db
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Limites (ms) dos buckets do histograma; o último bucket é "+inf"
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Scope ASGI da requisição em andamento (preenchido pelo middleware)
+_current_scope: ContextVar[Optional[dict]] = ContextVar("db_metrics_scope", default=None)
+
+
+class StatementHistogram:
+    """Histograma de duração das queries de uma rota"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, duration_ms: float, rowcount: int):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        if rowcount > 0:
+            self.rows += rowcount
+        self.buckets[bisect_left(BUCKETS_MS, duration_ms)] += 1
+
+    def to_dict(self) -> dict:
+        labels = [f"le_{limit}ms" for limit in BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "buckets": dict(zip(labels, self.buckets))
+        }
+
+
+class QueryMetrics:
+    """Agrega a duração das queries por rota da API"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._routes: Dict[str, StatementHistogram] = {}
+
+    def record(self, route: str, duration_ms: float, rowcount: int):
+        with self._lock:
+            histogram = self._routes.get(route)
+            if histogram is None:
+                histogram = self._routes[route] = StatementHistogram()
+            histogram.observe(duration_ms, rowcount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {route: histogram.to_dict() for route, histogram in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def instrument(self, engine: Engine):
+        """Registra os eventos de cursor no engine (para AsyncEngine use .sync_engine)"""
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.record(current_route(), duration_ms, cursor.rowcount)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def current_route() -> str:
+    """Template da rota que originou a query (ex: GET /api/doctors/{doctor_id})"""
+    scope = _current_scope.get()
+    if scope is None:
+        return "-"
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "-")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+class QueryMetricsMiddleware:
+    """Middleware ASGI que associa as queries à rota da requisição"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+
+# Instância global das métricas
+query_metrics = QueryMetrics()
@@ -0,0 +1,98 @@
+"""
+Formatos reduzidos dos estabelecimentos devolvidos pela API C#
+A busca traz todos os profissionais de cada estabelecimento; aqui ficam a
+projeção por campos, o limite de profissionais e o resumo (nome, CNES,
+distância, telefone, endereço e só os profissionais que casam com o filtro).
+Os itens de entrada não são alterados (podem vir do cache)
+"""
+from typing import Iterable, List, Optional
+
+from geo_cache import haversine_km
+from specialty_registry import normalize_name
+
+
+def project(establishment: dict, fields: Iterable[str]) -> dict:
+    """Só os campos pedidos, na ordem pedida"""
+    return {name: establishment[name] for name in fields if name in establishment}
+
+
+def cap_professionals(establishment: dict, max_professionals: int) -> dict:
+    """Cópia rasa com no máximo max_professionals profissionais"""
+    professionals = establishment.get("profissionais") or []
+    if len(professionals) <= max_professionals:
+        return establishment
+    return {**establishment, "profissionais": professionals[:max_professionals]}
+
+
+def _address(establishment: dict) -> str:
+    street = ", ".join(p for p in (establishment.get("endereco"), establishment.get("numero")) if p)
+    city = "/".join(p for p in (establishment.get("cidade"), establishment.get("uf")) if p)
+    return " - ".join(p for p in (street, establishment.get("bairro"), city) if p)
+
+
+def summarize(
+    establishment: dict,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    specialty_name: Optional[str] = None,
+    doctor_name: Optional[str] = None,
+    max_professionals: Optional[int] = None
+) -> dict:
+    """Resumo do estabelecimento com os profissionais da especialidade/nome buscados"""
+    specialty_key = normalize_name(specialty_name) if specialty_name else None
+    doctor_key = normalize_name(doctor_name) if doctor_name else None
+    professionals = []
+    for professional in establishment.get("profissionais") or []:
+        if specialty_key and normalize_name(professional.get("especialidadeNome") or "") != specialty_key:
+            continue
+        if doctor_key and doctor_key not in normalize_name(professional.get("nome") or ""):
+            continue
+        professionals.append({
+            "nome": professional.get("nome"),
+            "especialidade": professional.get("especialidadeNome")
+        })
+
+    summary = {
+        "codigoCNES": establishment.get("codigoCNES"),
+        "nome": establishment.get("nome"),
+        "distanciaKm": None,
+        "telefone": establishment.get("telefone"),
+        "endereco": _address(establishment),
+        "totalProfissionais": len(professionals),
+        "profissionais": professionals[:max_professionals] if max_professionals is not None else professionals
+    }
+    if latitude is not None and establishment.get("latitude") is not None:
+        summary["distanciaKm"] = round(
+            haversine_km(latitude, longitude, establishment["latitude"], establishment["longitude"]), 2
+        )
+    return summary
+
+
+def shape_establishments(
+    establishments: List[dict],
+    fields: Optional[List[str]] = None,
+    max_professionals: Optional[int] = None,
+    summary: bool = False,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    specialty_name: Optional[str] = None,
+    doctor_name: Optional[str] = None
+) -> List[dict]:
+    """
+    Aplica o formato pedido à lista da busca: resumo (ordenado pela distância)
+    ou limite de profissionais e depois projeção por campos
+    """
+    if summary:
+        shaped = [
+            summarize(e, latitude, longitude, specialty_name, doctor_name, max_professionals)
+            for e in establishments
+        ]
+        if latitude is not None:
+            shaped.sort(key=lambda s: s["distanciaKm"] if s["distanciaKm"] is not None else float("inf"))
+    elif max_professionals is not None:
+        shaped = [cap_professionals(e, max_professionals) for e in establishments]
+    else:
+        shaped = establishments
+    if fields:
+        shaped = [project(e, fields) for e in shaped]
+    return shaped
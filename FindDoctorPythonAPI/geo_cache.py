@@ -0,0 +1,253 @@
+"""
+Cache espacial da busca de estabelecimentos por geohash
+O C# devolve todos os estabelecimentos dentro do raio (sem limite), então um
+círculo que contém um tile traz o tile completo. Cada tile guarda os
+estabelecimentos que caem nele; uma busca (lat, lon, raio) junta os tiles que
+cobrem o círculo e filtra por distância localmente. Só os tiles ausentes vão ao
+upstream, numa única chamada pelo círculo que envolve o retângulo deles. Se o
+upstream falhar, tiles vencidos (dentro de stale_seconds) ainda respondem
+"""
+import math
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple, Type
+
+from response_cache import ResponseCache
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0088
+
+# Folga sobre as distâncias (esfera x esferoide do PostGIS)
+DISTANCE_MARGIN = 1.01
+
+# (linha, coluna) de um tile na grade do geohash
+Cell = Tuple[int, int]
+FetchCircle = Callable[[float, float, float], Awaitable[List[dict]]]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Altura (graus de latitude) e largura (graus de longitude) do tile"""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    return 180.0 / (1 << (bits - lon_bits)), 360.0 / (1 << lon_bits)
+
+
+def cell_of(latitude: float, longitude: float, precision: int) -> Cell:
+    height, width = cell_size(precision)
+    rows, cols = int(round(180.0 / height)), int(round(360.0 / width))
+    row = min(int((latitude + 90.0) / height), rows - 1)
+    col = min(int((longitude + 180.0) / width), cols - 1)
+    return row, col
+
+
+def cell_bounds(cell: Cell, precision: int) -> Tuple[float, float, float, float]:
+    """(lat_min, lat_max, lon_min, lon_max) do tile"""
+    height, width = cell_size(precision)
+    row, col = cell
+    lat_min, lon_min = row * height - 90.0, col * width - 180.0
+    return lat_min, lat_min + height, lon_min, lon_min + width
+
+
+def cell_geohash(cell: Cell, precision: int) -> str:
+    """Geohash do tile: bits de longitude e latitude intercalados, longitude primeiro"""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits - lon_bits
+    row, col = cell
+    value = 0
+    for i in range(bits):
+        if i % 2 == 0:
+            lon_bits -= 1
+            bit = (col >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (row >> lat_bits) & 1
+        value = (value << 1) | bit
+    return "".join(BASE32[(value >> shift) & 31] for shift in range(bits - 5, -1, -5))
+
+
+def encode(latitude: float, longitude: float, precision: int) -> str:
+    return cell_geohash(cell_of(latitude, longitude, precision), precision)
+
+
+def cells_covering(latitude: float, longitude: float, radius_km: float, precision: int) -> List[Cell]:
+    """Tiles que têm algum ponto a até radius_km do centro"""
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat <= math.sin(angular):
+        dlon = 180.0
+    else:
+        dlon = math.degrees(math.asin(math.sin(angular) / cos_lat))
+    row_min, col_min = cell_of(max(latitude - dlat, -90.0), max(longitude - dlon, -180.0), precision)
+    row_max, col_max = cell_of(min(latitude + dlat, 90.0), min(longitude + dlon, 180.0), precision)
+
+    limit = radius_km * DISTANCE_MARGIN
+    cells = []
+    for row in range(row_min, row_max + 1):
+        for col in range(col_min, col_max + 1):
+            lat_min, lat_max, lon_min, lon_max = cell_bounds((row, col), precision)
+            # Ponto do tile mais próximo do centro
+            nearest_lat = min(max(latitude, lat_min), lat_max)
+            nearest_lon = min(max(longitude, lon_min), lon_max)
+            if haversine_km(latitude, longitude, nearest_lat, nearest_lon) <= limit:
+                cells.append((row, col))
+    return cells
+
+
+def enclosing_circle(cells: List[Cell], precision: int) -> Tuple[float, float, float]:
+    """(lat, lon, raio_km) de um círculo que contém o retângulo formado pelos tiles"""
+    lat_min = cell_bounds((min(r for r, _ in cells), 0), precision)[0]
+    lat_max = cell_bounds((max(r for r, _ in cells), 0), precision)[1]
+    lon_min = cell_bounds((0, min(c for _, c in cells)), precision)[2]
+    lon_max = cell_bounds((0, max(c for _, c in cells)), precision)[3]
+    center_lat, center_lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    radius = max(
+        haversine_km(center_lat, center_lon, lat, lon)
+        for lat in (lat_min, lat_max) for lon in (lon_min, lon_max)
+    )
+    return center_lat, center_lon, radius * DISTANCE_MARGIN
+
+
+class GeoTileCache:
+    """Tiles de estabelecimentos por (filtros, geohash), com TTL/LRU"""
+
+    def __init__(
+        self,
+        name: str,
+        precision: int,
+        max_tiles: int,
+        ttl_seconds: float,
+        max_radius_km: float,
+        stale_seconds: float = 0,
+        stale_on: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.name = name
+        self.precision = precision
+        self.max_radius_km = max_radius_km
+        self.tiles = ResponseCache(
+            f"{name}_tiles", max_entries=max_tiles, ttl_seconds=ttl_seconds,
+            stale_seconds=stale_seconds, stale_on=stale_on
+        )
+        # Sem armazenamento: só coalesce buscas simultâneas da mesma região
+        self._regions = ResponseCache(f"{name}_regions", max_entries=0, ttl_seconds=0)
+        self.queries = 0
+        self.local = 0
+        self.partial = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.tiles.ttl_seconds > 0 and self.tiles.max_entries > 0
+
+    def accepts(self, radius_km: float) -> bool:
+        """Raios grandes demais (muitos tiles) ficam fora do cache espacial"""
+        return self.enabled and 0 < radius_km <= self.max_radius_km
+
+    async def search(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        filters: Hashable,
+        fetch_circle: FetchCircle
+    ) -> List[dict]:
+        """
+        Estabelecimentos a até radius_km, do mais próximo ao mais distante
+        filters identifica os filtros do C# (especialidade, médico); fetch_circle
+        busca no upstream todos os estabelecimentos de um círculo
+        """
+        self.queries += 1
+        cells = cells_covering(latitude, longitude, radius_km, self.precision)
+        found: Dict[Cell, Any] = {}
+        missing: List[Cell] = []
+        for cell in cells:
+            items = self.tiles.get((filters, cell_geohash(cell, self.precision)))
+            if items is None:
+                missing.append(cell)
+            else:
+                found[cell] = items
+
+        if not missing:
+            self.local += 1
+        else:
+            if found:
+                self.partial += 1
+            try:
+                found.update(await self._fetch_region(missing, filters, fetch_circle))
+            except self.tiles.stale_on:
+                for cell in missing:
+                    items = self.tiles.get_stale((filters, cell_geohash(cell, self.precision)))
+                    if items is None:
+                        raise
+                    found[cell] = items
+
+        results = []
+        for cell in cells:
+            for item in found.get(cell, ()):
+                distance = haversine_km(latitude, longitude, item["latitude"], item["longitude"])
+                if distance <= radius_km:
+                    results.append((distance, item))
+        results.sort(key=lambda pair: pair[0])
+        return [item for _, item in results]
+
+    async def _fetch_region(self, missing: List[Cell], filters: Hashable, fetch_circle: FetchCircle) -> Dict[Cell, list]:
+        """Busca o retângulo dos tiles ausentes e grava cada tile dele"""
+        rows = [r for r, _ in missing]
+        cols = [c for _, c in missing]
+        rectangle = (min(rows), max(rows), min(cols), max(cols))
+
+        async def fetch():
+            lat, lon, radius = enclosing_circle(missing, self.precision)
+            items = await fetch_circle(lat, lon, radius)
+            row_min, row_max, col_min, col_max = rectangle
+            # Todo tile do retângulo está inteiro dentro do círculo buscado
+            region: Dict[Cell, list] = {
+                (row, col): []
+                for row in range(row_min, row_max + 1)
+                for col in range(col_min, col_max + 1)
+            }
+            for item in items:
+                if item.get("latitude") is None or item.get("longitude") is None:
+                    continue
+                cell = cell_of(item["latitude"], item["longitude"], self.precision)
+                if cell in region:
+                    region[cell].append(item)
+            for cell, cell_items in region.items():
+                self.tiles.put((filters, cell_geohash(cell, self.precision)), cell_items)
+            return region
+
+        return await self._regions.get_or_fetch((filters, rectangle), fetch)
+
+    def clear(self):
+        self.tiles.clear()
+
+    def reset_stats(self):
+        self.tiles.reset_stats()
+        self._regions.reset_stats()
+        self.queries = self.local = self.partial = 0
+
+    def stats(self) -> dict:
+        tiles = self.tiles.stats()
+        return {
+            "precision": self.precision,
+            "max_radius_km": self.max_radius_km,
+            "tiles": tiles["entries"],
+            "max_tiles": tiles["max_entries"],
+            "ttl_seconds": tiles["ttl_seconds"],
+            "tile_hits": tiles["hits"],
+            "tile_misses": tiles["misses"],
+            "evictions": tiles["evictions"],
+            "stale_served": tiles["stale_served"],
+            "queries": self.queries,
+            "local": self.local,
+            "partial": self.partial,
+            "upstream_calls": self._regions.misses,
+            "coalesced": self._regions.coalesced,
+            "local_ratio": round(self.local / self.queries, 3) if self.queries else 0.0
+        }
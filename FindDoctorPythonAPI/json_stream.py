@@ -0,0 +1,152 @@
+"""
+Leitura incremental de arrays JSON vindos em pedaços (respostas em streaming)
+Um scanner acompanha profundidade de colchetes/chaves e o estado de string
+só nos caracteres novos de cada pedaço (saltando com regex até o próximo
+caractere relevante); cada elemento é decodificado uma única vez, quando o
+seu fim chega. Assim um elemento que ocupa k pedaços custa O(tamanho), não
+O(k x tamanho), e só um elemento por vez fica em memória além do pedaço
+atual. map_array reescreve o array aplicando uma função a cada item
+"""
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+_WHITESPACE = " \t\n\r"
+
+# Próximo caractere que muda o estado, conforme onde o scanner está
+_CONTAINER_SPECIAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[ \t\n\r,\]]")
+
+# Tamanho aproximado de cada pedaço escrito por map_array
+FLUSH_BYTES = 64 * 1024
+
+
+class _ArrayScanner:
+    """Estado do scanner entre um pedaço e o próximo"""
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.kind: Optional[str] = None  # elemento em andamento: container, string ou scalar
+        self.depth = 0
+        self.in_string = False
+        self.escape = False  # barra invertida no fim do pedaço anterior
+        self.parts: List[str] = []  # texto do elemento em andamento, de pedaços anteriores
+
+    def feed(self, text: str) -> Iterator[Any]:
+        """Gera os elementos que terminam dentro de text"""
+        i, n = 0, len(text)
+        item_start = 0
+        while i < n:
+            if self.kind is None:
+                c = text[i]
+                i += 1
+                if c in _WHITESPACE:
+                    continue
+                if self.finished:
+                    raise ValueError("Array JSON incompleto ou com conteúdo após o fim")
+                if not self.started:
+                    if c != "[":
+                        raise ValueError("Resposta não é um array JSON")
+                    self.started = True
+                elif c == "]":
+                    self.finished = True
+                elif c != ",":
+                    item_start = i - 1
+                    if c in "{[":
+                        self.kind, self.depth = "container", 1
+                    elif c == '"':
+                        self.kind, self.in_string = "string", True
+                    else:
+                        self.kind = "scalar"
+                        i -= 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    break
+                i = match.end()
+                if match.group() == "\\":
+                    if i < n:
+                        i += 1
+                    else:
+                        self.escape = True
+                    continue
+                self.in_string = False
+                if self.kind == "container":
+                    continue
+            elif self.kind == "container":
+                match = _CONTAINER_SPECIAL.search(text, i)
+                if match is None:
+                    break
+                i = match.end()
+                c = match.group()
+                if c == '"':
+                    self.in_string = True
+                    continue
+                self.depth += 1 if c in "{[" else -1
+                if self.depth:
+                    continue
+            else:
+                # Número/literal: só termina quando chega o delimitador seguinte
+                # ("12" pode ser o começo de "123")
+                match = _SCALAR_END.search(text, i)
+                if match is None:
+                    break
+                i = match.start()
+
+            self.parts.append(text[item_start:i])
+            item_text = "".join(self.parts)
+            self.parts, self.kind = [], None
+            yield json.loads(item_text)
+
+        if self.kind is not None:
+            self.parts.append(text[item_start:])
+
+    def close(self):
+        if not self.finished or self.kind is not None:
+            raise ValueError("Array JSON incompleto ou com conteúdo após o fim")
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Gera os elementos de um array JSON (nível de cima) conforme os bytes chegam"""
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    scanner = _ArrayScanner()
+    async for chunk in chunks:
+        for item in scanner.feed(utf8.decode(chunk)):
+            yield item
+    for item in scanner.feed(utf8.decode(b"", final=True)):
+        yield item
+    scanner.close()
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list]:
+    """"codigoCNES, nome" -> ["codigoCNES", "nome"]; vazio -> None (todos os campos)"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+async def map_array(chunks: AsyncIterator[bytes], transform: Callable[[Any], Any]) -> AsyncIterator[bytes]:
+    """Reescreve o array JSON com transform aplicada a cada elemento, conforme chegam"""
+    pending = ["["]
+    size = 1
+    first = True
+    async for item in iter_json_array(chunks):
+        encoded = json.dumps(transform(item), ensure_ascii=False, separators=(",", ":"))
+        pending.append(encoded if first else "," + encoded)
+        size += len(encoded) + 1
+        first = False
+        if size >= FLUSH_BYTES:
+            yield "".join(pending).encode("utf-8")
+            pending, size = [], 0
+    pending.append("]")
+    yield "".join(pending).encode("utf-8")
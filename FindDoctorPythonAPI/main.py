@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from database import init_db
+from database import init_db, close_db
 from csharp_client import csharp_client
+from db_metrics import query_metrics, QueryMetricsMiddleware
+from pagination import NEXT_CURSOR_HEADER
 from config import settings
 
 # Importar routers
@@ -22,6 +24,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("🔌 Fechando conexões...")
     await csharp_client.close()
+    await close_db()
     print("👋 API encerrada!")
 
 app = FastAPI(
@@ -38,8 +41,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+if settings.DB_METRICS_ENABLED:
+    app.add_middleware(QueryMetricsMiddleware)
+
 # Registrar routers
 app.include_router(edit_suggestions.router, prefix="/api")
 app.include_router(doctors.router, prefix="/api")
@@ -58,7 +65,9 @@ def root():
             "edit_suggestions": "/api/edit-suggestions",
             "doctors": "/api/doctors",
             "appointments": "/api/appointments",
-            "csharp_proxy": "/api/csharp"
+            "csharp_proxy": "/api/csharp",
+            "db_metrics": "/metrics/db",
+            "cache_metrics": "/metrics/cache"
         }
     }
 
@@ -71,6 +80,26 @@ def health_check():
         "csharp_api": settings.CSHARP_API_URL
     }
 
+@app.get("/metrics/db")
+def db_metrics(reset: bool = False):
+    """Histograma de duração das queries SQL por rota (requer DB_METRICS_ENABLED)"""
+    snapshot = query_metrics.snapshot()
+    if reset:
+        query_metrics.reset()
+    return {
+        "enabled": settings.DB_METRICS_ENABLED,
+        "routes": snapshot
+    }
+
+@app.get("/metrics/cache")
+def cache_metrics(reset: bool = False):
+    """Hits/misses dos caches de resposta da API C# e estado do circuit breaker"""
+    snapshot = {"caches": csharp_client.cache_stats(), "upstream": csharp_client.upstream_stats()}
+    if reset:
+        csharp_client.reset_cache_stats()
+        csharp_client.reset_upstream_stats()
+    return snapshot
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
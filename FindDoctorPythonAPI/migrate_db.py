@@ -1,49 +1,179 @@
 """
-Script para adicionar colunas faltantes nas tabelas existentes
-Execute uma vez para atualizar o schema do banco
+Script para aplicar as migrações de schema no banco
+Cada migração tem uma versão e é registrada em schema_migrations, então
+rodar o script de novo aplica apenas as versões pendentes. É um passo
+explícito (python migrate_db.py): a subida da API não aplica migrações,
+só as registra num banco novo, que o create_all já cria no schema atual
 """
 from sqlalchemy import create_engine, text
 from config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-
 migrations = [
     # Adicionar coluna is_active na tabela doctors (se não existir)
-    """
-    DO $$ 
+    ("001", "doctors.is_active", """
+    DO $$
     BEGIN
         IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
+            SELECT 1 FROM information_schema.columns
             WHERE table_name='doctors' AND column_name='is_active'
         ) THEN
             ALTER TABLE doctors ADD COLUMN is_active BOOLEAN DEFAULT true;
         END IF;
     END $$;
-    """,
+    """),
     # Adicionar coluna crm na tabela doctors (se não existir)
-    """
-    DO $$ 
+    ("002", "doctors.crm", """
+    DO $$
     BEGIN
         IF NOT EXISTS (
-            SELECT 1 FROM information_schema.columns 
+            SELECT 1 FROM information_schema.columns
             WHERE table_name='doctors' AND column_name='crm'
         ) THEN
             ALTER TABLE doctors ADD COLUMN crm VARCHAR(50);
         END IF;
     END $$;
-    """,
+    """),
+    # Índice único parcial: um único agendamento ativo por horário do médico
+    # (falha se já houver horários duplicados; o script lista os horários
+    # para resolvê-los antes de reaplicar)
+    ("003", "uq_appointments_active_slot", """
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_appointments_active_slot
+    ON appointments (doctor_id, appointment_date, appointment_time)
+    WHERE status IN ('scheduled', 'confirmed');
+    """),
+    # Índices compostos que seguem os filtros/ordenações dos routers
+    ("004", "indices das consultas dos routers", """
+    CREATE INDEX IF NOT EXISTS ix_appointments_doctor_date_time
+    ON appointments (doctor_id, appointment_date, appointment_time);
+    CREATE INDEX IF NOT EXISTS ix_appointments_patient_email_date
+    ON appointments (patient_email, appointment_date);
+    CREATE INDEX IF NOT EXISTS ix_doctors_establishment_id
+    ON doctors (establishment_id);
+    CREATE INDEX IF NOT EXISTS ix_doctor_availabilities_doctor_day
+    ON doctor_availabilities (doctor_id, day_of_week, start_time);
+    CREATE INDEX IF NOT EXISTS ix_edit_suggestions_status_submitted_at
+    ON edit_suggestions (status, submitted_at);
+    """),
+    # Índice trigram para o filtro Doctor.specialty ILIKE '%...%' (só se o
+    # Postgres oferece pg_trgm; sem ela a busca segue em Seq Scan)
+    ("005", "ix_doctors_specialty_trgm", """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE INDEX IF NOT EXISTS ix_doctors_specialty_trgm
+            ON doctors USING gin (specialty gin_trgm_ops);
+        ELSE
+            RAISE WARNING 'pg_trgm indisponível: busca por especialidade sem índice trigram';
+        END IF;
+    END $$;
+    """),
+    # Chaves de ordenação completas (com id) para a paginação por cursor; os
+    # índices novos têm outro nome (idempotente) e substituem os da 004
+    ("006", "indices da paginacao por cursor", """
+    CREATE INDEX IF NOT EXISTS ix_appointments_doctor_date_time_id
+    ON appointments (doctor_id, appointment_date, appointment_time, id);
+    DROP INDEX IF EXISTS ix_appointments_doctor_date_time;
+    CREATE INDEX IF NOT EXISTS ix_appointments_date_time_id
+    ON appointments (appointment_date, appointment_time, id);
+    CREATE INDEX IF NOT EXISTS ix_edit_suggestions_status_submitted_at_id
+    ON edit_suggestions (status, submitted_at, id);
+    DROP INDEX IF EXISTS ix_edit_suggestions_status_submitted_at;
+    CREATE INDEX IF NOT EXISTS ix_edit_suggestions_submitted_at_id
+    ON edit_suggestions (submitted_at, id);
+    """),
 ]
 
-print("🔧 Aplicando migrações no banco de dados...")
+# Chave do pg_advisory_lock que serializa execuções concorrentes do script
+MIGRATIONS_LOCK_KEY = 4_610_003
+
+# Horários com mais de um agendamento ativo (impedem a migração 003)
+DUPLICATE_ACTIVE_SLOTS_SQL = """
+SELECT doctor_id, appointment_date, appointment_time, array_agg(id ORDER BY id)
+FROM appointments
+WHERE status IN ('scheduled', 'confirmed')
+GROUP BY doctor_id, appointment_date, appointment_time
+HAVING count(*) > 1
+ORDER BY appointment_date, appointment_time
+"""
+
+def _create_migrations_table(conn) -> None:
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(20) PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """))
+
+def _report_duplicate_slots(conn) -> None:
+    duplicates = conn.execute(text(DUPLICATE_ACTIVE_SLOTS_SQL)).all()
+    if not duplicates:
+        return
+    print(f"⚠️  {len(duplicates)} horário(s) com mais de um agendamento ativo; cancele os excedentes e rode de novo:")
+    for doctor_id, appointment_date, appointment_time, ids in duplicates:
+        print(f"   médico {doctor_id}, {appointment_date} {appointment_time}: agendamentos {ids}")
+
+def pending_migrations(engine) -> list:
+    """Versões ainda não registradas em schema_migrations"""
+    with engine.begin() as conn:
+        _create_migrations_table(conn)
+        applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+    return [version for version, _, _ in migrations if version not in applied]
+
+def mark_migrations_applied(engine, skip=()) -> None:
+    """Registra as migrações como aplicadas sem executá-las (banco criado pelo create_all)"""
+    with engine.begin() as conn:
+        _create_migrations_table(conn)
+        for version, description, _ in migrations:
+            if version in skip:
+                continue
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description) "
+                     "ON CONFLICT (version) DO NOTHING"),
+                {"version": version, "description": description}
+            )
+
+def apply_migrations(engine) -> bool:
+    """Aplica as migrações pendentes; retorna False se alguma falhar"""
+    with engine.connect() as conn:
+        # Dois processos migrando juntos: o segundo espera e pula o que o primeiro aplicou
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        try:
+            return _apply_pending(conn)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+            conn.commit()
+
+def _apply_pending(conn) -> bool:
+    _create_migrations_table(conn)
+    conn.commit()
+    applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
 
-with engine.connect() as conn:
-    for i, migration in enumerate(migrations, 1):
+    for version, description, migration in migrations:
+        if version in applied:
+            print(f"⏭️  Migração {version} ({description}) já aplicada")
+            continue
         try:
             conn.execute(text(migration))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {"version": version, "description": description}
+            )
             conn.commit()
-            print(f"✅ Migração {i} aplicada com sucesso")
+            print(f"✅ Migração {version} ({description}) aplicada com sucesso")
         except Exception as e:
-            print(f"❌ Erro na migração {i}: {e}")
+            print(f"❌ Erro na migração {version} ({description}): {e}")
             conn.rollback()
+            if version == "003":
+                _report_duplicate_slots(conn)
+            # As próximas versões podem depender desta
+            return False
+    return True
 
-print("✅ Migrações concluídas!")
+if __name__ == "__main__":
+    print("🔧 Aplicando migrações no banco de dados...")
+    engine = create_engine(settings.DATABASE_URL)
+    if apply_migrations(engine):
+        print("✅ Migrações concluídas!")
@@ -1,8 +1,36 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, Time, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Date, Time, Text, Boolean, ForeignKey, Index, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
 
+# Status que ocupam o horário do médico
+ACTIVE_APPOINTMENT_STATUSES = ("scheduled", "confirmed")
+ACTIVE_APPOINTMENT_PREDICATE = text("status IN ('scheduled', 'confirmed')")
+
+
+def pg_trgm_enabled(bind) -> bool:
+    """
+    Habilita pg_trgm se o Postgres oferece a extensão e retorna se ela está
+    instalada. Sem contrib (ou sem permissão para criá-la) avisa e retorna
+    False: a busca por especialidade segue sem o índice trigram (Seq Scan)
+    """
+    installed = bind.execute(text(
+        "SELECT installed_version IS NOT NULL FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).scalar()
+    if installed:
+        return True
+    if installed is None:
+        print("⚠️  Extensão pg_trgm indisponível neste Postgres: busca por especialidade sem índice trigram")
+        return False
+    try:
+        with bind.begin_nested():
+            bind.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        return True
+    except DBAPIError as e:
+        print(f"⚠️  Não foi possível criar a extensão pg_trgm ({str(e.orig).splitlines()[0]}): busca por especialidade sem índice trigram")
+        return False
+
 class EditSuggestion(Base):
     """Sugestões de edição para estabelecimentos"""
     __tablename__ = "edit_suggestions"
@@ -17,6 +45,12 @@ class EditSuggestion(Base):
     submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     status = Column(String(20), default="pending", nullable=False)  # pending, approved, rejected
     
+    __table_args__ = (
+        # id no fim do índice permite a paginação por cursor (submitted_at, id)
+        Index("ix_edit_suggestions_status_submitted_at_id", "status", "submitted_at", "id"),
+        Index("ix_edit_suggestions_submitted_at_id", "submitted_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<EditSuggestion {self.id} - {self.establishment_name}>"
 
@@ -30,7 +64,7 @@ class Doctor(Base):
     name = Column(String(255), nullable=False)
     specialty = Column(String(255))
     crm = Column(String(50))  # Número do CRM (opcional)
-    establishment_id = Column(String(50), nullable=False)  # CNES do estabelecimento
+    establishment_id = Column(String(50), nullable=False, index=True)  # CNES do estabelecimento
     establishment_name = Column(String(255))
     email = Column(String(255))
     phone = Column(String(50))
@@ -41,6 +75,17 @@ class Doctor(Base):
     availabilities = relationship("DoctorAvailability", back_populates="doctor", cascade="all, delete-orphan")
     appointments = relationship("Appointment", back_populates="doctor", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        # Busca por especialidade (ILIKE '%...%'): índice trigram, criado só
+        # quando pg_trgm está disponível (bancos antigos: migração 005)
+        Index(
+            "ix_doctors_specialty_trgm",
+            "specialty",
+            postgresql_using="gin",
+            postgresql_ops={"specialty": "gin_trgm_ops"}
+        ).ddl_if(callable_=lambda ddl, target, bind, **kw: pg_trgm_enabled(bind)),
+    )
+    
     def __repr__(self):
         return f"<Doctor {self.id} - {self.name}>"
 
@@ -59,6 +104,10 @@ class DoctorAvailability(Base):
     # Relacionamento
     doctor = relationship("Doctor", back_populates="availabilities")
     
+    __table_args__ = (
+        Index("ix_doctor_availabilities_doctor_day", "doctor_id", "day_of_week", "start_time"),
+    )
+    
     def __repr__(self):
         return f"<DoctorAvailability {self.id} - Doctor {self.doctor_id}>"
 
@@ -90,5 +139,21 @@ class Appointment(Base):
     # Relacionamento
     doctor = relationship("Doctor", back_populates="appointments")
     
+    __table_args__ = (
+        # Garante no banco um único agendamento ativo por horário do médico
+        Index(
+            "uq_appointments_active_slot",
+            "doctor_id", "appointment_date", "appointment_time",
+            unique=True,
+            postgresql_where=ACTIVE_APPOINTMENT_PREDICATE
+        ),
+        # Dashboard do médico e listagem filtrada por médico (ordenada por data/hora);
+        # id no fim do índice permite a paginação por cursor (data, hora, id)
+        Index("ix_appointments_doctor_date_time_id", "doctor_id", "appointment_date", "appointment_time", "id"),
+        Index("ix_appointments_date_time_id", "appointment_date", "appointment_time", "id"),
+        # "Meus agendamentos" por email do paciente
+        Index("ix_appointments_patient_email_date", "patient_email", "appointment_date"),
+    )
+    
     def __repr__(self):
         return f"<Appointment {self.id} - {self.patient_name}>"
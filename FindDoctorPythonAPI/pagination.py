@@ -0,0 +1,51 @@
+"""
+Paginação por cursor (keyset) para os endpoints de listagem
+O cursor é um token opaco com a chave de ordenação do último item da página;
+a próxima página é buscada com WHERE (chave) < (cursor) em vez de OFFSET,
+então o custo por página não cresce com a profundidade
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from typing import Callable, List, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Header com o cursor da próxima página (ausente na última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_PARSERS = {
+    date: date.fromisoformat,
+    time: time.fromisoformat,
+    datetime: datetime.fromisoformat,
+    int: int,
+    str: str,
+}
+
+def encode_cursor(values: Sequence) -> str:
+    """Serializa a chave de ordenação em um token base64 url-safe"""
+    payload = [v.isoformat() if isinstance(v, (date, time, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str, types: Sequence[type]) -> List:
+    """Reconstrói a chave de ordenação; cursor inválido vira HTTP 400"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("tamanho inesperado")
+        return [_PARSERS[t](v) for t, v in zip(types, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def apply_cursor(query, columns: Sequence, cursor: str, descending: bool = True):
+    """Restringe a query aos itens depois do cursor na ordem (columns)"""
+    values = decode_cursor(cursor, [column.type.python_type for column in columns])
+    key = tuple_(*columns)
+    return query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+
+def set_next_cursor(response: Response, items: Sequence, limit: int, key: Callable):
+    """Publica o cursor da próxima página quando a página veio cheia"""
+    if items and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
@@ -0,0 +1,136 @@
+"""
+Cache em memória das respostas da API C#
+TTL + LRU com tamanho máximo e single-flight: requisições concorrentes pela
+mesma chave aguardam uma única chamada ao upstream. Erros não são cacheados;
+com stale_seconds, entradas vencidas ainda são servidas por esse tempo se a
+busca falhar com uma das exceções de stale_on (upstream fora do ar)
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, Type
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """Cache TTL/LRU com coalescência de misses concorrentes"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: float,
+        stale_seconds: float = 0,
+        stale_on: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.stale_on = stale_on
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_served = 0
+
+    def _fresh(self, key: Hashable) -> Any:
+        """Valor dentro do TTL, ou _MISSING; vencidos ficam guardados até o fim do stale"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        now = time.monotonic()
+        if expires_at > now:
+            self._entries.move_to_end(key)
+            return value
+        if expires_at + self.stale_seconds <= now:
+            del self._entries[key]
+        return _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Valor ainda válido da chave (conta hit/miss), sem buscar no upstream"""
+        value = self._fresh(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """Último valor guardado da chave, mesmo vencido (dentro de stale_seconds)"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] + self.stale_seconds <= time.monotonic():
+            return default
+        self.stale_served += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._store(key, value)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Valor da chave; no miss chama fetch() uma vez, mesmo com chamadas concorrentes"""
+        value = self._fresh(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, fetch))
+            # Evita o aviso de exceção não lida se todos os chamadores desistirem
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        try:
+            # shield: um chamador cancelado (cliente desconectou) não cancela a busca dos demais
+            return await asyncio.shield(task)
+        except self.stale_on:
+            stale = self.get_stale(key, _MISSING)
+            if stale is _MISSING:
+                raise
+            return stale
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: Hashable, value: Any):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.coalesced = self.evictions = self.stale_served = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "stale_served": self.stale_served,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+        }
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import date, datetime
-from database import get_db
-from models import Appointment, Doctor
+from database import get_async_db
+from models import Appointment, Doctor, ACTIVE_APPOINTMENT_PREDICATE
+from pagination import apply_cursor, set_next_cursor
 from schemas import (
     AppointmentCreate,
     AppointmentUpdate,
@@ -14,52 +18,65 @@ from schemas import (
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
+# SQLSTATEs do Postgres: violação de chave estrangeira e de índice único
+FOREIGN_KEY_VIOLATION = "23503"
+UNIQUE_VIOLATION = "23505"
+
+SLOT_TAKEN_DETAIL = "Já existe agendamento para este horário"
+
 @router.post("/", response_model=AppointmentResponse, status_code=201)
-def create_appointment(
+async def create_appointment(
     appointment: AppointmentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cria um novo agendamento"""
-    # Verifica se o médico existe
-    doctor = db.query(Doctor).filter(Doctor.id == appointment.doctor_id).first()
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Médico não encontrado")
+    # Verifica se a data não é no passado
+    if appointment.appointment_date < date.today():
+        raise HTTPException(status_code=400, detail="Não é possível agendar para datas passadas")
     
-    # Verifica se já existe agendamento para este horário
-    existing = db.query(Appointment).filter(
-        and_(
-            Appointment.doctor_id == appointment.doctor_id,
-            Appointment.appointment_date == appointment.appointment_date,
-            Appointment.appointment_time == appointment.appointment_time,
-            Appointment.status.in_(["scheduled", "confirmed"])
+    # INSERT ... ON CONFLICT atômico: o índice único parcial de horários ativos
+    # rejeita reservas concorrentes sem SELECT prévio nem lock de tabela
+    stmt = (
+        pg_insert(Appointment)
+        .values(**appointment.model_dump())
+        .on_conflict_do_nothing(
+            index_elements=["doctor_id", "appointment_date", "appointment_time"],
+            index_where=ACTIVE_APPOINTMENT_PREDICATE
         )
-    ).first()
+        .returning(Appointment)
+    )
     
-    if existing:
-        raise HTTPException(status_code=400, detail="Já existe agendamento para este horário")
+    try:
+        db_appointment = await db.scalar(stmt)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        # Violação da FK doctor_id -> médico inexistente
+        if getattr(e.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION:
+            raise HTTPException(status_code=404, detail="Médico não encontrado")
+        raise
     
-    # Verifica se a data não é no passado
-    if appointment.appointment_date < date.today():
-        raise HTTPException(status_code=400, detail="Não é possível agendar para datas passadas")
+    if db_appointment is None:
+        raise HTTPException(status_code=400, detail=SLOT_TAKEN_DETAIL)
     
-    db_appointment = Appointment(**appointment.model_dump())
-    db.add(db_appointment)
-    db.commit()
-    db.refresh(db_appointment)
     return db_appointment
 
 @router.get("/", response_model=List[AppointmentWithDoctorResponse])
-def list_appointments(
+async def list_appointments(
+    response: Response,
     doctor_id: Optional[int] = Query(None, description="Filtrar por médico"),
     appointment_date: Optional[date] = Query(None, description="Filtrar por data"),
     status: Optional[str] = Query(None, description="Filtrar por status"),
     patient_email: Optional[str] = Query(None, description="Filtrar por email do paciente"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor); substitui skip"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Lista agendamentos com filtros opcionais"""
-    query = db.query(Appointment)
+    # O médico vem no mesmo SELECT (JOIN) para a serialização não disparar
+    # uma query por agendamento
+    query = select(Appointment).options(joinedload(Appointment.doctor))
     
     if doctor_id:
         query = query.filter(Appointment.doctor_id == doctor_id)
@@ -70,81 +87,102 @@ def list_appointments(
     if patient_email:
         query = query.filter(Appointment.patient_email == patient_email)
     
-    appointments = query.order_by(
-        Appointment.appointment_date.desc(),
-        Appointment.appointment_time.desc()
-    ).offset(skip).limit(limit).all()
+    sort_key = (Appointment.appointment_date, Appointment.appointment_time, Appointment.id)
+    if cursor:
+        query = apply_cursor(query, sort_key, cursor)
+    else:
+        query = query.offset(skip)
     
+    appointments = (await db.scalars(
+        query.order_by(
+            Appointment.appointment_date.desc(),
+            Appointment.appointment_time.desc(),
+            Appointment.id.desc()
+        ).limit(limit)
+    )).all()
+    
+    set_next_cursor(response, appointments, limit, lambda a: (a.appointment_date, a.appointment_time, a.id))
     return appointments
 
 @router.get("/{appointment_id}", response_model=AppointmentWithDoctorResponse)
-def get_appointment(
+async def get_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Busca um agendamento por ID"""
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = await db.get(
+        Appointment, appointment_id, options=[joinedload(Appointment.doctor)]
+    )
     if not appointment:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado")
     return appointment
 
 @router.patch("/{appointment_id}", response_model=AppointmentResponse)
-def update_appointment_status(
+async def update_appointment_status(
     appointment_id: int,
     update: AppointmentUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Atualiza o status de um agendamento"""
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = await db.get(Appointment, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado")
     
     appointment.status = update.status
     appointment.updated_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(appointment)
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        # Reativar um agendamento cancelado cujo horário já foi reservado de novo
+        if getattr(e.orig, "sqlstate", None) == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=400, detail=SLOT_TAKEN_DETAIL)
+        raise
+    await db.refresh(appointment)
     return appointment
 
 @router.delete("/{appointment_id}", status_code=204)
-def cancel_appointment(
+async def cancel_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancela um agendamento (muda status para cancelled)"""
-    appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+    appointment = await db.get(Appointment, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado")
     
     appointment.status = "cancelled"
     appointment.updated_at = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
     return None
 
 @router.get("/doctor/{doctor_id}/dashboard", response_model=List[AppointmentResponse])
-def get_doctor_dashboard(
+async def get_doctor_dashboard(
     doctor_id: int,
     start_date: Optional[date] = Query(None, description="Data inicial"),
     end_date: Optional[date] = Query(None, description="Data final"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Dashboard do médico - Lista agendamentos do médico"""
     # Verifica se o médico existe
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+    doctor = await db.get(Doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
-    query = db.query(Appointment).filter(Appointment.doctor_id == doctor_id)
+    query = select(Appointment).filter(Appointment.doctor_id == doctor_id)
     
     if start_date:
         query = query.filter(Appointment.appointment_date >= start_date)
     if end_date:
         query = query.filter(Appointment.appointment_date <= end_date)
     
-    appointments = query.order_by(
-        Appointment.appointment_date,
-        Appointment.appointment_time
-    ).all()
+    appointments = await db.scalars(
+        query.order_by(
+            Appointment.appointment_date,
+            Appointment.appointment_time
+        )
+    )
     
-    return appointments
+    return appointments.all()
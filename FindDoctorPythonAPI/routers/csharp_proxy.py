@@ -1,15 +1,58 @@
-from fastapi import APIRouter, Query
-from typing import List, Optional
-from csharp_client import csharp_client
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Callable, List, Optional
+import httpx
+from config import settings
+from csharp_client import CSharpUnavailableError, csharp_client
+from establishment_payload import shape_establishments
+from json_stream import map_array, parse_fields
+from schemas import EstablishmentBatchRequest, EstablishmentBatchResponse
+from specialty_registry import specialty_registry
 
 router = APIRouter(prefix="/csharp", tags=["C# API Proxy"])
 
+def _unavailable(e: CSharpUnavailableError) -> HTTPException:
+    print(f"API C# indisponível: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="API C# indisponível, tente novamente em instantes",
+        headers={"Retry-After": "5"}
+    )
+
+async def _passthrough(upstream: httpx.Response, transform: Optional[Callable[[dict], dict]]) -> Response:
+    """Repassa o corpo do C# em pedaços, sem decodificar (ou transformando cada item)"""
+    if upstream.status_code != 200:
+        body = await upstream.aread()
+        await upstream.aclose()
+        return Response(body, status_code=upstream.status_code, media_type=upstream.headers.get("content-type"))
+    
+    headers = {}
+    if transform:
+        chunks = map_array(upstream.aiter_bytes(), transform)
+    else:
+        # Bytes crus: se o C# comprimiu, o cliente recebe comprimido
+        chunks = upstream.aiter_raw()
+        if "content-encoding" in upstream.headers:
+            headers["Content-Encoding"] = upstream.headers["content-encoding"]
+    
+    async def relay():
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await upstream.aclose()
+    
+    return StreamingResponse(relay(), media_type="application/json", headers=headers)
+
 @router.get("/address/search")
 async def search_address(
     address: str = Query(..., description="Endereço para buscar")
 ):
     """Proxy para busca de endereços na API C#"""
-    results = await csharp_client.search_address(address)
+    try:
+        results = await csharp_client.search_address(address)
+    except CSharpUnavailableError as e:
+        raise _unavailable(e)
     return results
 
 @router.get("/establishments/search")
@@ -18,24 +61,77 @@ async def search_establishments(
     longitude: float = Query(..., description="Longitude"),
     radius_km: float = Query(5.0, description="Raio de busca em km"),
     specialty_id: Optional[str] = Query(None, description="ID da especialidade"),
-    doctor_name: Optional[str] = Query(None, description="Nome do médico")
+    doctor_name: Optional[str] = Query(None, description="Nome do médico"),
+    stream: bool = Query(False, description="Repassa a resposta do C# em streaming, sem cache"),
+    fields: Optional[str] = Query(None, description="Campos mantidos em cada estabelecimento (ex.: codigoCNES,nome,latitude,longitude)"),
+    max_professionals: Optional[int] = Query(None, ge=0, description="Máximo de profissionais por estabelecimento"),
+    summary: bool = Query(False, description="Resumo: nome, CNES, distância, telefone, endereço e só os profissionais que casam com o filtro")
 ):
     """Proxy para busca de estabelecimentos na API C#"""
-    results = await csharp_client.search_establishments(
-        latitude=latitude,
-        longitude=longitude,
-        radius_km=radius_km,
-        specialty_id=specialty_id,
-        doctor_name=doctor_name
-    )
-    return results
+    shape = None
+    if summary or fields or max_professionals is not None:
+        specialty = specialty_registry.get(specialty_id) if specialty_id else None
+        options = {
+            "fields": parse_fields(fields),
+            "max_professionals": max_professionals,
+            "summary": summary,
+            "latitude": latitude,
+            "longitude": longitude,
+            "specialty_name": specialty["nome"] if specialty else None,
+            "doctor_name": doctor_name
+        }
+        shape = lambda items: shape_establishments(items, **options)
+    
+    if stream:
+        # Respostas grandes (com todos os profissionais) não são montadas em
+        # memória nem serializadas de novo
+        try:
+            upstream = await csharp_client.stream_establishments(
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=radius_km,
+                specialty_id=specialty_id,
+                doctor_name=doctor_name
+            )
+        except CSharpUnavailableError as e:
+            raise _unavailable(e)
+        # Em streaming cada item é formatado ao chegar (o resumo não é ordenado pela distância)
+        transform = (lambda item: shape([item])[0]) if shape else None
+        return await _passthrough(upstream, transform)
+    
+    try:
+        results = await csharp_client.search_establishments(
+            latitude=latitude,
+            longitude=longitude,
+            radius_km=radius_km,
+            specialty_id=specialty_id,
+            doctor_name=doctor_name
+        )
+    except CSharpUnavailableError as e:
+        raise _unavailable(e)
+    # Já é JSON puro vindo do C#: serializa direto, sem o jsonable_encoder do FastAPI
+    return JSONResponse(shape(results) if shape else results)
+
+@router.post("/establishments/batch", response_model=EstablishmentBatchResponse)
+async def get_establishments_details(batch: EstablishmentBatchRequest):
+    """Detalhes de vários estabelecimentos em uma requisição (erros por CNES em errors)"""
+    if len(batch.cnes_codes) > settings.CSHARP_BATCH_MAX_CODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.CSHARP_BATCH_MAX_CODES} códigos CNES por lote"
+        )
+    results, errors = await csharp_client.get_establishments_details(batch.cnes_codes)
+    return {"results": results, "errors": errors}
 
 @router.get("/establishments/{cnes_code}")
 async def get_establishment_details(
     cnes_code: str
 ):
     """Proxy para detalhes de um estabelecimento na API C#"""
-    result = await csharp_client.get_establishment_details(cnes_code)
+    try:
+        result = await csharp_client.get_establishment_details(cnes_code)
+    except CSharpUnavailableError as e:
+        raise _unavailable(e)
     if not result:
         return {"error": "Estabelecimento não encontrado"}
     return result
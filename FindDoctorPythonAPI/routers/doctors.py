@@ -1,135 +1,301 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from typing import List, Optional
-from database import get_db
-from models import Doctor, DoctorAvailability
+from datetime import date, datetime, timedelta
+from itertools import islice
+from config import settings
+from database import get_async_db
+from models import Doctor, DoctorAvailability, Appointment, ACTIVE_APPOINTMENT_STATUSES
+from pagination import apply_cursor, set_next_cursor
+from slots import group_windows, iter_free_slots, merge_free_slots
 from schemas import (
     DoctorCreate, 
     DoctorResponse, 
     DoctorAvailabilityCreate,
-    DoctorAvailabilityResponse
+    DoctorAvailabilityResponse,
+    DoctorSlotsResponse,
+    EarliestSlot,
+    EarliestSlotsResponse
 )
 
 router = APIRouter(prefix="/doctors", tags=["Doctors"])
 
+def _slot_range(from_date: Optional[date], to_date: Optional[date]):
+    """Aplica os padrões do período de horários livres e valida o tamanho"""
+    from_date = from_date or date.today()
+    to_date = to_date or from_date + timedelta(days=6)
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="Data final anterior à data inicial")
+    if (to_date - from_date).days + 1 > settings.SLOTS_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo máximo é de {settings.SLOTS_MAX_DAYS} dias"
+        )
+    return from_date, to_date
+
 # ==================== DOCTORS ====================
 
 @router.post("/", response_model=DoctorResponse, status_code=201)
-def create_doctor(
+async def create_doctor(
     doctor: DoctorCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cadastra um novo médico"""
     # Verifica se já existe
-    existing = db.query(Doctor).filter(Doctor.co_profissional == doctor.co_profissional).first()
+    existing = await db.scalar(select(Doctor).filter(Doctor.co_profissional == doctor.co_profissional))
     if existing:
         raise HTTPException(status_code=400, detail="Médico já cadastrado")
     
     db_doctor = Doctor(**doctor.model_dump())
     db.add(db_doctor)
-    db.commit()
-    db.refresh(db_doctor)
+    await db.commit()
+    await db.refresh(db_doctor)
     return db_doctor
 
 @router.get("/", response_model=List[DoctorResponse])
-def list_doctors(
+async def list_doctors(
+    response: Response,
     establishment_id: Optional[str] = Query(None, description="Filtrar por CNES do estabelecimento"),
     specialty: Optional[str] = Query(None, description="Filtrar por especialidade"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor); substitui skip"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Lista todos os médicos cadastrados"""
-    query = db.query(Doctor)
+    query = select(Doctor)
     
     if establishment_id:
         query = query.filter(Doctor.establishment_id == establishment_id)
     if specialty:
         query = query.filter(Doctor.specialty.ilike(f"%{specialty}%"))
     
-    doctors = query.offset(skip).limit(limit).all()
+    if cursor:
+        query = apply_cursor(query, (Doctor.id,), cursor, descending=False)
+    else:
+        query = query.offset(skip)
+    
+    doctors = (await db.scalars(query.order_by(Doctor.id).limit(limit))).all()
+    set_next_cursor(response, doctors, limit, lambda d: (d.id,))
     return doctors
 
+@router.get("/slots/earliest", response_model=EarliestSlotsResponse)
+async def list_earliest_slots(
+    specialty: Optional[str] = Query(None, description="Filtrar por especialidade"),
+    establishment_id: Optional[str] = Query(None, description="Filtrar por CNES do estabelecimento"),
+    from_date: Optional[date] = Query(None, alias="from", description="Data inicial (padrão: hoje)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Data final, inclusive (padrão: from + 6 dias)"),
+    duration: int = Query(settings.APPOINTMENT_DURATION_MINUTES, ge=5, le=480, description="Duração da consulta em minutos"),
+    limit: int = Query(10, ge=1, le=100, description="Quantidade de horários retornados"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Primeiros horários livres entre todos os médicos que atendem aos filtros"""
+    if not specialty and not establishment_id:
+        raise HTTPException(status_code=400, detail="Informe specialty e/ou establishment_id")
+    from_date, to_date = _slot_range(from_date, to_date)
+    
+    doctor_filters = [Doctor.is_active.is_not(False)]
+    if establishment_id:
+        doctor_filters.append(Doctor.establishment_id == establishment_id)
+    if specialty:
+        doctor_filters.append(Doctor.specialty.ilike(f"%{specialty}%"))
+    
+    # Uma linha por médico, numa única query: colunas do médico, janelas de
+    # atendimento agregadas em arrays e os inícios dos agendamentos ativos no
+    # período (subquery correlacionada, já em ordem) - sem objetos ORM e sem
+    # multiplicar janelas x agendamentos como faria um JOIN das três tabelas
+    booked_starts = (
+        select(func.array_agg(aggregate_order_by(
+            Appointment.appointment_date + Appointment.appointment_time,
+            Appointment.appointment_date, Appointment.appointment_time
+        )))
+        .filter(
+            Appointment.doctor_id == Doctor.id,
+            Appointment.appointment_date.between(from_date, to_date),
+            Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+        )
+        .scalar_subquery()
+    )
+    rows = await db.execute(
+        select(
+            Doctor.id, Doctor.name, Doctor.specialty, Doctor.establishment_id, Doctor.establishment_name,
+            func.array_agg(DoctorAvailability.day_of_week),
+            func.array_agg(DoctorAvailability.start_time),
+            func.array_agg(DoctorAvailability.end_time),
+            booked_starts
+        )
+        .join(DoctorAvailability, DoctorAvailability.doctor_id == Doctor.id)
+        .filter(*doctor_filters, DoctorAvailability.is_available.is_(True))
+        .group_by(Doctor.id)
+    )
+    doctors = {}
+    availabilities = {}
+    booked = {}
+    for doctor_id, name, doctor_specialty, doctor_establishment_id, establishment_name, days, starts, ends, doctor_booked in rows:
+        doctors[doctor_id] = (name, doctor_specialty, doctor_establishment_id, establishment_name)
+        availabilities[doctor_id] = list(zip(days, starts, ends))
+        booked[doctor_id] = doctor_booked or []
+    if not doctors:
+        return EarliestSlotsResponse(duration_minutes=duration, slots=[])
+    
+    now = datetime.now()
+    streams = {
+        doctor_id: iter_free_slots(
+            group_windows(doctor_availabilities),
+            booked.get(doctor_id, []),
+            from_date,
+            to_date,
+            duration=timedelta(minutes=duration),
+            booked_duration=timedelta(minutes=settings.APPOINTMENT_DURATION_MINUTES),
+            not_before=now
+        )
+        for doctor_id, doctor_availabilities in availabilities.items()
+    }
+    
+    slots = []
+    for slot, doctor_id in islice(merge_free_slots(streams), limit):
+        name, doctor_specialty, doctor_establishment_id, establishment_name = doctors[doctor_id]
+        slots.append(EarliestSlot(
+            slot=slot,
+            doctor_id=doctor_id,
+            doctor_name=name,
+            specialty=doctor_specialty,
+            establishment_id=doctor_establishment_id,
+            establishment_name=establishment_name
+        ))
+    return EarliestSlotsResponse(duration_minutes=duration, slots=slots)
+
 @router.get("/{doctor_id}", response_model=DoctorResponse)
-def get_doctor(
+async def get_doctor(
     doctor_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Busca um médico por ID"""
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+    doctor = await db.get(Doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     return doctor
 
 @router.delete("/{doctor_id}", status_code=204)
-def delete_doctor(
+async def delete_doctor(
     doctor_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove um médico"""
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+    doctor = await db.get(Doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
-    db.delete(doctor)
-    db.commit()
+    await db.delete(doctor)
+    await db.commit()
     return None
 
 # ==================== DOCTOR AVAILABILITY ====================
 
 @router.post("/{doctor_id}/availability", response_model=DoctorAvailabilityResponse, status_code=201)
-def create_doctor_availability(
+async def create_doctor_availability(
     doctor_id: int,
     availability: DoctorAvailabilityCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Adiciona disponibilidade de horário para um médico"""
     # Verifica se o médico existe
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+    doctor = await db.get(Doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
     # Verifica se já existe disponibilidade para esse dia/horário
-    existing = db.query(DoctorAvailability).filter(
-        DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.day_of_week == availability.day_of_week,
-        DoctorAvailability.start_time == availability.start_time
-    ).first()
+    existing = await db.scalar(
+        select(DoctorAvailability).filter(
+            DoctorAvailability.doctor_id == doctor_id,
+            DoctorAvailability.day_of_week == availability.day_of_week,
+            DoctorAvailability.start_time == availability.start_time
+        ).limit(1)
+    )
     
     if existing:
         raise HTTPException(status_code=400, detail="Já existe disponibilidade para este horário")
     
     db_availability = DoctorAvailability(doctor_id=doctor_id, **availability.model_dump(exclude={"doctor_id"}))
     db.add(db_availability)
-    db.commit()
-    db.refresh(db_availability)
+    await db.commit()
+    await db.refresh(db_availability)
     return db_availability
 
 @router.get("/{doctor_id}/availability", response_model=List[DoctorAvailabilityResponse])
-def list_doctor_availability(
+async def list_doctor_availability(
     doctor_id: int,
     day_of_week: Optional[int] = Query(None, ge=0, le=6, description="0=Monday, 6=Sunday"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Lista disponibilidade de um médico"""
-    query = db.query(DoctorAvailability).filter(DoctorAvailability.doctor_id == doctor_id)
+    query = select(DoctorAvailability).filter(DoctorAvailability.doctor_id == doctor_id)
     
     if day_of_week is not None:
         query = query.filter(DoctorAvailability.day_of_week == day_of_week)
     
-    availabilities = query.order_by(DoctorAvailability.day_of_week, DoctorAvailability.start_time).all()
-    return availabilities
+    availabilities = await db.scalars(query.order_by(DoctorAvailability.day_of_week, DoctorAvailability.start_time))
+    return availabilities.all()
+
+@router.get("/{doctor_id}/slots", response_model=DoctorSlotsResponse)
+async def list_doctor_slots(
+    doctor_id: int,
+    from_date: Optional[date] = Query(None, alias="from", description="Data inicial (padrão: hoje)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Data final, inclusive (padrão: from + 6 dias)"),
+    duration: int = Query(settings.APPOINTMENT_DURATION_MINUTES, ge=5, le=480, description="Duração da consulta em minutos"),
+    limit: int = Query(200, ge=1, le=1000, description="Máximo de horários retornados"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Lista os horários livres do médico: disponibilidade semanal menos agendamentos ativos"""
+    from_date, to_date = _slot_range(from_date, to_date)
+    
+    doctor = await db.get(Doctor, doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Médico não encontrado")
+    
+    slots = []
+    if doctor.is_active is not False:
+        availabilities = await db.execute(
+            select(
+                DoctorAvailability.day_of_week, DoctorAvailability.start_time, DoctorAvailability.end_time
+            ).filter(
+                DoctorAvailability.doctor_id == doctor_id,
+                DoctorAvailability.is_available.is_(True)
+            )
+        )
+        # Inícios dos agendamentos ativos no intervalo, já ordenados pelo índice (médico, data, hora)
+        booked = await db.execute(
+            select(Appointment.appointment_date, Appointment.appointment_time).filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.appointment_date.between(from_date, to_date),
+                Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+            ).order_by(Appointment.appointment_date, Appointment.appointment_time)
+        )
+        free = iter_free_slots(
+            group_windows(availabilities.all()),
+            [datetime.combine(day, start) for day, start in booked],
+            from_date,
+            to_date,
+            duration=timedelta(minutes=duration),
+            booked_duration=timedelta(minutes=settings.APPOINTMENT_DURATION_MINUTES),
+            not_before=datetime.now()
+        )
+        slots = list(islice(free, limit))
+    
+    return DoctorSlotsResponse(doctor_id=doctor_id, duration_minutes=duration, slots=slots)
 
 @router.delete("/availability/{availability_id}", status_code=204)
-def delete_doctor_availability(
+async def delete_doctor_availability(
     availability_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove uma disponibilidade"""
-    availability = db.query(DoctorAvailability).filter(DoctorAvailability.id == availability_id).first()
+    availability = await db.get(DoctorAvailability, availability_id)
     if not availability:
         raise HTTPException(status_code=404, detail="Disponibilidade não encontrada")
     
-    db.delete(availability)
-    db.commit()
+    await db.delete(availability)
+    await db.commit()
     return None
@@ -1,83 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from database import get_async_db
 from models import EditSuggestion
 from schemas import EditSuggestionCreate, EditSuggestionResponse
+from pagination import apply_cursor, set_next_cursor
 
 router = APIRouter(prefix="/edit-suggestions", tags=["Edit Suggestions"])
 
 @router.post("/", response_model=EditSuggestionResponse, status_code=201)
-def create_edit_suggestion(
+async def create_edit_suggestion(
     suggestion: EditSuggestionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cria uma nova sugestão de edição"""
     db_suggestion = EditSuggestion(**suggestion.model_dump())
     db.add(db_suggestion)
-    db.commit()
-    db.refresh(db_suggestion)
+    await db.commit()
+    await db.refresh(db_suggestion)
     return db_suggestion
 
 @router.get("/", response_model=List[EditSuggestionResponse])
-def list_edit_suggestions(
+async def list_edit_suggestions(
+    response: Response,
     status: str = Query(None, description="Filtrar por status: pending, approved, rejected"),
     establishment_id: str = Query(None, description="Filtrar por CNES do estabelecimento"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor); substitui skip"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Lista todas as sugestões de edição com filtros opcionais"""
-    query = db.query(EditSuggestion)
+    query = select(EditSuggestion)
     
     if status:
         query = query.filter(EditSuggestion.status == status)
     if establishment_id:
         query = query.filter(EditSuggestion.establishment_id == establishment_id)
     
-    suggestions = query.order_by(EditSuggestion.submitted_at.desc()).offset(skip).limit(limit).all()
+    if cursor:
+        query = apply_cursor(query, (EditSuggestion.submitted_at, EditSuggestion.id), cursor)
+    else:
+        query = query.offset(skip)
+    
+    suggestions = (await db.scalars(
+        query.order_by(EditSuggestion.submitted_at.desc(), EditSuggestion.id.desc()).limit(limit)
+    )).all()
+    set_next_cursor(response, suggestions, limit, lambda s: (s.submitted_at, s.id))
     return suggestions
 
 @router.get("/{suggestion_id}", response_model=EditSuggestionResponse)
-def get_edit_suggestion(
+async def get_edit_suggestion(
     suggestion_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Busca uma sugestão de edição por ID"""
-    suggestion = db.query(EditSuggestion).filter(EditSuggestion.id == suggestion_id).first()
+    suggestion = await db.get(EditSuggestion, suggestion_id)
     if not suggestion:
         raise HTTPException(status_code=404, detail="Sugestão não encontrada")
     return suggestion
 
 @router.delete("/{suggestion_id}", status_code=204)
-def delete_edit_suggestion(
+async def delete_edit_suggestion(
     suggestion_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Deleta uma sugestão de edição"""
-    suggestion = db.query(EditSuggestion).filter(EditSuggestion.id == suggestion_id).first()
+    suggestion = await db.get(EditSuggestion, suggestion_id)
     if not suggestion:
         raise HTTPException(status_code=404, detail="Sugestão não encontrada")
     
-    db.delete(suggestion)
-    db.commit()
+    await db.delete(suggestion)
+    await db.commit()
     return None
 
 @router.patch("/{suggestion_id}/status", response_model=EditSuggestionResponse)
-def update_suggestion_status(
+async def update_suggestion_status(
     suggestion_id: int,
     status: str = Query(..., description="Novo status: approved ou rejected"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Atualiza o status de uma sugestão (aprovar ou rejeitar)"""
     if status not in ["approved", "rejected"]:
         raise HTTPException(status_code=400, detail="Status inválido. Use 'approved' ou 'rejected'")
     
-    suggestion = db.query(EditSuggestion).filter(EditSuggestion.id == suggestion_id).first()
+    suggestion = await db.get(EditSuggestion, suggestion_id)
     if not suggestion:
         raise HTTPException(status_code=404, detail="Sugestão não encontrada")
     
     suggestion.status = status
-    db.commit()
-    db.refresh(suggestion)
+    await db.commit()
+    await db.refresh(suggestion)
     return suggestion
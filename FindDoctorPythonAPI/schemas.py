@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime, date, time
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 # ==================== EDIT SUGGESTIONS ====================
 
@@ -75,6 +75,23 @@ class DoctorAvailabilityResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class DoctorSlotsResponse(BaseModel):
+    doctor_id: int
+    duration_minutes: int
+    slots: List[datetime]
+
+class EarliestSlot(BaseModel):
+    slot: datetime
+    doctor_id: int
+    doctor_name: str
+    specialty: Optional[str]
+    establishment_id: str
+    establishment_name: Optional[str]
+
+class EarliestSlotsResponse(BaseModel):
+    duration_minutes: int
+    slots: List[EarliestSlot]
+
 # ==================== APPOINTMENTS ====================
 
 class AppointmentCreate(BaseModel):
@@ -125,6 +142,15 @@ class EstablishmentFromCSharp(BaseModel):
     telefone: Optional[str] = None
     profissionais: Optional[List[dict]] = []
 
+class EstablishmentBatchRequest(BaseModel):
+    """Códigos CNES para buscar os detalhes de uma vez"""
+    cnes_codes: List[str] = Field(..., min_length=1)
+
+class EstablishmentBatchResponse(BaseModel):
+    """Detalhes por CNES e erro por CNES (não encontrado, C# indisponível)"""
+    results: Dict[str, dict]
+    errors: Dict[str, str]
+
 class SpecialtyFromCSharp(BaseModel):
     """Response do backend C# para especialidades"""
     id: str
@@ -0,0 +1,77 @@
+"""
+Cálculo dos horários livres de um médico
+Expande as janelas semanais de DoctorAvailability em horários concretos e
+descarta os que colidem com agendamentos ativos. Agendamentos e horários são
+percorridos em ordem (merge de intervalos), então o custo é linear e nada da
+grade é materializado além do que o chamador consumir
+"""
+import heapq
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Janelas de atendimento por dia da semana (0=Segunda): [(início, fim), ...]
+Windows = Dict[int, List[Tuple[time, time]]]
+
+def group_windows(availabilities: Iterable[Tuple[int, time, time]]) -> Windows:
+    """Agrupa (dia da semana, início, fim) por dia, em ordem e sem sobreposição"""
+    by_day: Windows = {}
+    for day_of_week, start_time, end_time in availabilities:
+        if start_time < end_time:
+            by_day.setdefault(day_of_week, []).append((start_time, end_time))
+
+    # Janelas sobrepostas viram uma só, para os horários saírem em ordem crescente
+    windows: Windows = {}
+    for day_of_week, day_windows in by_day.items():
+        merged = []
+        for window_start, window_end in sorted(day_windows):
+            if merged and window_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], window_end))
+            else:
+                merged.append((window_start, window_end))
+        windows[day_of_week] = merged
+    return windows
+
+def iter_free_slots(
+    windows: Windows,
+    booked: List[datetime],
+    start: date,
+    end: date,
+    duration: timedelta,
+    booked_duration: timedelta,
+    not_before: Optional[datetime] = None
+) -> Iterator[datetime]:
+    """
+    Gera, em ordem, o início de cada horário livre entre start e end (inclusive)
+
+    booked são os inícios dos agendamentos ativos, em ordem crescente; cada um
+    ocupa [início, início + booked_duration). Um horário [s, s + duration) é
+    livre se cabe inteiro na janela e não se sobrepõe a nenhum agendamento
+    """
+    i = 0
+    day = start
+    while day <= end:
+        for window_start, window_end in windows.get(day.weekday(), ()):
+            slot = datetime.combine(day, window_start)
+            last_start = datetime.combine(day, window_end) - duration
+            while slot <= last_start:
+                slot_end = slot + duration
+                # Agendamentos que terminam até o início do horário não afetam mais nada
+                while i < len(booked) and booked[i] + booked_duration <= slot:
+                    i += 1
+                conflict = i < len(booked) and booked[i] < slot_end
+                if not conflict and (not_before is None or slot >= not_before):
+                    yield slot
+                slot = slot_end
+        day += timedelta(days=1)
+
+def merge_free_slots(streams: Dict[int, Iterator[datetime]]) -> Iterator[Tuple[datetime, int]]:
+    """
+    Intercala os horários livres de vários médicos em ordem cronológica
+    Gera (horário, doctor_id); cada stream só avança quando é o próximo da fila,
+    então pedir os N primeiros não expande a agenda inteira de cada médico
+    """
+    return heapq.merge(*(_tag(stream, doctor_id) for doctor_id, stream in streams.items()))
+
+def _tag(stream: Iterator[datetime], doctor_id: int) -> Iterator[Tuple[datetime, int]]:
+    for slot in stream:
+        yield slot, doctor_id
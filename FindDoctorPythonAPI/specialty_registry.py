@@ -0,0 +1,86 @@
+"""
+Registro em memória das especialidades de medical_specialties.json
+O arquivo é lido uma vez e recarregado apenas quando o mtime muda; as buscas
+por id e por nome normalizado (sem acento, sem caixa) são acessos a dicionário
+"""
+import json
+import os
+import time
+import unicodedata
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+def normalize_name(name: str) -> str:
+    """Remove acentos, caixa e espaços repetidos ("Médico  Cardiologista" -> "medico cardiologista")"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.casefold().split())
+
+
+class SpecialtyRegistry:
+    """Especialidades indexadas por id e por nome normalizado"""
+
+    def __init__(self, path: Path, check_interval: float = 2.0):
+        self.path = Path(path)
+        # Intervalo mínimo (s) entre verificações do mtime do arquivo
+        self.check_interval = check_interval
+        self._lock = Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._specialties: List[dict] = []
+        self._json = "[]"
+        self._by_id: Dict[str, dict] = {}
+        self._by_name: Dict[str, dict] = {}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._mtime is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    specialties = json.load(f)
+            except ValueError:
+                # Arquivo sendo reescrito: mantém a versão anterior, se houver
+                if self._mtime is None:
+                    raise
+                print(f"⚠️  {self.path.name} inválido, mantendo a versão carregada")
+                return
+            self._by_id = {str(s["id"]): s for s in specialties}
+            self._by_name = {normalize_name(s["nome"]): s for s in specialties}
+            self._json = json.dumps(specialties, ensure_ascii=False)
+            self._specialties = specialties
+            self._mtime = mtime
+
+    def all(self) -> List[dict]:
+        """Lista completa (não modificar: é compartilhada entre as chamadas)"""
+        self._refresh()
+        return self._specialties
+
+    def as_json(self) -> str:
+        """Lista completa já serializada"""
+        self._refresh()
+        return self._json
+
+    def get(self, specialty_id: str) -> Optional[dict]:
+        self._refresh()
+        return self._by_id.get(str(specialty_id))
+
+    def find_by_name(self, name: str) -> Optional[dict]:
+        """Busca exata pelo nome, ignorando acentos, caixa e espaços"""
+        self._refresh()
+        return self._by_name.get(normalize_name(name))
+
+    def __len__(self) -> int:
+        return len(self.all())
+
+
+# Instância global (arquivo ao lado deste módulo)
+specialty_registry = SpecialtyRegistry(Path(__file__).parent / "medical_specialties.json")
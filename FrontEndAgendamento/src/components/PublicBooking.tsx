@@ -25,11 +25,6 @@ interface PublicBookingProps {
   onNavigateToDashboard: () => void;
 }
 
-const timeSlots = [
-  '08:00', '08:30', '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
-  '14:00', '14:30', '15:00', '15:30', '16:00', '16:30', '17:00', '17:30',
-];
-
 export function PublicBooking({ establishment, onNavigateToDashboard }: PublicBookingProps) {
   const [date, setDate] = useState<Date | undefined>(new Date());
   const [selectedTime, setSelectedTime] = useState<string>('');
@@ -39,6 +34,8 @@ export function PublicBooking({ establishment, onNavigateToDashboard }: PublicBo
   const [patientPhone, setPatientPhone] = useState('');
   const [notes, setNotes] = useState('');
   const [doctors, setDoctors] = useState<api.Doctor[]>([]);
+  const [timeSlots, setTimeSlots] = useState<string[]>([]);
+  const [loadingSlots, setLoadingSlots] = useState(false);
   const [loading, setLoading] = useState(false);
   const [submitting, setSubmitting] = useState(false);
 
@@ -62,6 +59,31 @@ export function PublicBooking({ establishment, onNavigateToDashboard }: PublicBo
     loadDoctors();
   }, [establishment.id]);
 
+  // Horários livres do médico na data escolhida
+  const loadSlots = async () => {
+    setSelectedTime('');
+    if (!date || !selectedDoctor) {
+      setTimeSlots([]);
+      return;
+    }
+    setLoadingSlots(true);
+    try {
+      const day = date.toISOString().split('T')[0]; // YYYY-MM-DD
+      const data = await api.getDoctorSlots(parseInt(selectedDoctor), { from: day, to: day });
+      setTimeSlots(data.slots.map((slot) => slot.slice(11, 16))); // HH:MM
+    } catch (err) {
+      console.error('Erro ao carregar horários:', err);
+      toast.error('Erro ao carregar horários livres');
+      setTimeSlots([]);
+    } finally {
+      setLoadingSlots(false);
+    }
+  };
+
+  useEffect(() => {
+    loadSlots();
+  }, [selectedDoctor, date]);
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     
@@ -90,6 +112,7 @@ export function PublicBooking({ establishment, onNavigateToDashboard }: PublicBo
       // Reset form
       setSelectedTime('');
       setSelectedDoctor('');
+      setTimeSlots([]);
       setPatientName('');
       setPatientEmail('');
       setPatientPhone('');
@@ -97,6 +120,8 @@ export function PublicBooking({ establishment, onNavigateToDashboard }: PublicBo
     } catch (err) {
       console.error('Erro ao agendar consulta:', err);
       toast.error('Erro ao agendar consulta. Tente novamente.');
+      // O horário pode ter sido ocupado nesse meio tempo
+      loadSlots();
     } finally {
       setSubmitting(false);
     }
@@ -211,6 +236,13 @@ export function PublicBooking({ establishment, onNavigateToDashboard }: PublicBo
                       <Clock className="h-4 w-4" />
                       Horário *
                     </Label>
+                    {!selectedDoctor ? (
+                      <p className="text-sm text-gray-500">Selecione um médico para ver os horários livres</p>
+                    ) : loadingSlots ? (
+                      <p className="text-sm text-gray-500">Carregando horários...</p>
+                    ) : timeSlots.length === 0 ? (
+                      <p className="text-sm text-gray-500">Nenhum horário livre nesta data</p>
+                    ) : null}
                     <div className="grid grid-cols-4 gap-2">
                       {timeSlots.map((time) => (
                         <Button
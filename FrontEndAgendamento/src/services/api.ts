@@ -79,6 +79,60 @@ export async function getDoctorAvailability(doctorId: number): Promise<DoctorAva
   return response.json();
 }
 
+export interface DoctorSlots {
+  doctor_id: number;
+  duration_minutes: number;
+  slots: string[]; // "2025-12-15T09:00:00"
+}
+
+/**
+ * Listar horários livres de um médico (disponibilidade menos consultas ativas)
+ */
+export async function getDoctorSlots(
+  doctorId: number,
+  params?: { from?: string; to?: string; duration?: number }
+): Promise<DoctorSlots> {
+  const query = new URLSearchParams();
+  if (params?.from) query.set('from', params.from);
+  if (params?.to) query.set('to', params.to);
+  if (params?.duration) query.set('duration', params.duration.toString());
+
+  const response = await fetch(`${API_BASE_URL}/doctors/${doctorId}/slots?${query.toString()}`);
+  if (!response.ok) throw new Error('Erro ao carregar horários livres');
+  return response.json();
+}
+
+export interface EarliestSlot {
+  slot: string; // "2025-12-15T09:00:00"
+  doctor_id: number;
+  doctor_name: string;
+  specialty?: string;
+  establishment_id: string;
+  establishment_name?: string;
+}
+
+/**
+ * Primeiros horários livres entre todos os médicos de uma especialidade/estabelecimento
+ */
+export async function getEarliestSlots(params: {
+  specialty?: string;
+  establishment_id?: string;
+  from?: string;
+  to?: string;
+  limit?: number;
+}): Promise<{ duration_minutes: number; slots: EarliestSlot[] }> {
+  const query = new URLSearchParams();
+  if (params.specialty) query.set('specialty', params.specialty);
+  if (params.establishment_id) query.set('establishment_id', params.establishment_id);
+  if (params.from) query.set('from', params.from);
+  if (params.to) query.set('to', params.to);
+  if (params.limit) query.set('limit', params.limit.toString());
+
+  const response = await fetch(`${API_BASE_URL}/doctors/slots/earliest?${query.toString()}`);
+  if (!response.ok) throw new Error('Erro ao buscar horários livres');
+  return response.json();
+}
+
 /**
  * Adicionar disponibilidade para um médico
  */
@@ -0,0 +1,54 @@
+"""
+Custo por passo do nó chatbot: versão antiga (cria o ChatOpenAI, vincula as
+ferramentas e monta o prompt a cada chamada) x modelo e prompt criados uma
+vez. O modelo é trocado por um falso que responde na hora, então o tempo
+medido é só o overhead do passo, sem rede
+
+    python benchmark_agent_step.py
+"""
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_openai import ChatOpenAI
+
+from finddoctor_agent import SYSTEM_PROMPT, TOOLS, create_chatbot
+
+STEPS = 200
+
+# Modelo falso: devolve a resposta sem chamar a OpenAI
+fake_llm = RunnableLambda(lambda messages: AIMessage(content="ok"))
+
+
+def legacy_step(state):
+    """O que o chatbot antigo fazia a cada passo antes de chamar o modelo"""
+    system_message = SystemMessage(content=SYSTEM_PROMPT)
+    messages = [system_message] + state["messages"]
+    llm = ChatOpenAI(temperature=0.1, model="gpt-4o-mini", api_key="benchmark")
+    llm.bind_tools(TOOLS)
+    response = fake_llm.invoke(messages)
+    return {"messages": messages + [response]}
+
+
+def measure(step, state) -> float:
+    step(state)  # aquecimento
+    started = time.perf_counter()
+    for _ in range(STEPS):
+        step(state)
+    return (time.perf_counter() - started) * 1000 / STEPS
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    state = {"messages": [HumanMessage(content="Quero um cardiologista perto da Av. Paulista, 1000")]}
+    chatbot = create_chatbot(fake_llm)
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_ms = measure(legacy_step, state)
+        cached_ms = measure(chatbot, state)
+
+    print(f"Passos medidos: {STEPS}")
+    print(f"Antigo (modelo e prompt por passo): {legacy_ms:.3f} ms/passo")
+    print(f"Atual (criados uma vez):            {cached_ms:.3f} ms/passo")
+    print(f"Overhead evitado por passo:         {legacy_ms - cached_ms:.3f} ms ({legacy_ms / cached_ms:.0f}x)")
@@ -0,0 +1,136 @@
+"""
+Compara o resolvedor de especialidades com o loop de pontuação antigo do
+search_establishments: acerto sobre termos rotulados e latência por busca
+
+    python benchmark_specialty_resolver.py
+"""
+import time
+
+from specialty_registry import specialty_registry
+from specialty_resolver import specialty_resolver
+
+# (termo digitado pelo usuário, especialidade esperada; None = não deve resolver)
+CASES = [
+    ("cardiologista", "MEDICO CARDIOLOGISTA"),
+    ("Cardiologia", "MEDICO CARDIOLOGISTA"),
+    ("médico cardiologista", "MEDICO CARDIOLOGISTA"),
+    ("cardiolojista", "MEDICO CARDIOLOGISTA"),
+    ("cardio", "MEDICO CARDIOLOGISTA"),
+    ("coração", "MEDICO CARDIOLOGISTA"),
+    ("cardiologista intervencionista", "MEDICO CARDIOLOGISTA INTERVENCIONISTA"),
+    ("pediatra", "MEDICO PEDIATRA"),
+    ("pediatria", "MEDICO PEDIATRA"),
+    ("médico para criança", "MEDICO PEDIATRA"),
+    ("dermatologista", "MEDICO DERMATOLOGISTA"),
+    ("dermatologia", "MEDICO DERMATOLOGISTA"),
+    ("médico de pele", "MEDICO DERMATOLOGISTA"),
+    ("ortopedista", "MEDICO ORTOPEDISTA E TRAUMATOLOGISTA"),
+    ("ortopedia", "MEDICO ORTOPEDISTA E TRAUMATOLOGISTA"),
+    ("traumatologista", "MEDICO ORTOPEDISTA E TRAUMATOLOGISTA"),
+    ("ginecologista", "MEDICO GINECOLOGISTA E OBSTETRA"),
+    ("ginecologia", "MEDICO GINECOLOGISTA E OBSTETRA"),
+    ("obstetra", "MEDICO GINECOLOGISTA E OBSTETRA"),
+    ("oftalmologista", "MEDICO OFTALMOLOGISTA"),
+    ("oftamologista", "MEDICO OFTALMOLOGISTA"),
+    ("oculista", "MEDICO OFTALMOLOGISTA"),
+    ("otorrino", "MEDICO OTORRINOLARINGOLOGISTA"),
+    ("otorrinolaringologia", "MEDICO OTORRINOLARINGOLOGISTA"),
+    ("psiquiatra", "MEDICO PSIQUIATRA"),
+    ("psiquiatria", "MEDICO PSIQUIATRA"),
+    ("pisiquiatra", "MEDICO PSIQUIATRA"),
+    ("neurologista", "MEDICO NEUROLOGISTA"),
+    ("neurologia", "MEDICO NEUROLOGISTA"),
+    ("nefrologia", "MEDICO NEFROLOGISTA"),
+    ("urologista", "MEDICO UROLOGISTA"),
+    ("urologia", "MEDICO UROLOGISTA"),
+    ("endocrinologista", "MEDICO ENDOCRINOLOGISTA E METABOLOGISTA"),
+    ("endocrino", "MEDICO ENDOCRINOLOGISTA E METABOLOGISTA"),
+    ("gastro", "MEDICO GASTROENTEROLOGISTA"),
+    ("gastroenterologia", "MEDICO GASTROENTEROLOGISTA"),
+    ("pneumologista", "MEDICO PNEUMOLOGISTA"),
+    ("geriatra", "MEDICO GERIATRA"),
+    ("geriatria", "MEDICO GERIATRA"),
+    ("clínico geral", "MEDICO CLINICO"),
+    ("cirurgião plástico", "MEDICO CIRURGIAO PLASTICO"),
+    ("cirurgia plástica", "MEDICO CIRURGIAO PLASTICO"),
+    ("médico de família", "MEDICO DE FAMILIA E COMUNIDADE"),
+    ("oncologista", "MEDICO ONCOLOGISTA CLINICO"),
+    ("hematologia", "MEDICO HEMATOLOGISTA"),
+    ("reumatologista", "MEDICO REUMATOLOGISTA"),
+    ("mastologista", "MEDICO MASTOLOGISTA"),
+    ("anestesista", "MEDICO ANESTESIOLOGISTA"),
+    ("dentista", None),
+    ("fisioterapeuta", None),
+    ("nutricionista", None),
+]
+
+
+def legacy_match(specialty_name: str):
+    """Loop de pontuação usado antes pelo search_establishments (lido do registro)"""
+    specialty_name_lower = specialty_name.lower().strip()
+    matched_specialty = None
+    best_match_score = 0
+    for specialty in specialty_registry.all():
+        specialty_nome_lower = specialty['nome'].lower().strip()
+        score = 0
+        if specialty_name_lower == specialty_nome_lower:
+            score = 100
+        elif specialty_name_lower in specialty_nome_lower:
+            score = 90
+        elif specialty_nome_lower in specialty_name_lower:
+            score = 85
+        elif any(word in specialty_nome_lower for word in specialty_name_lower.split() if len(word) > 3):
+            score = 75
+        elif specialty_nome_lower.startswith(specialty_name_lower[:6]):
+            score = 70
+        if score > best_match_score:
+            best_match_score = score
+            matched_specialty = specialty
+    if matched_specialty and best_match_score >= 70:
+        return matched_specialty
+    return None
+
+
+def resolver_match(specialty_name: str):
+    match = specialty_resolver.resolve(specialty_name)
+    return match.specialty if match else None
+
+
+def resolver_match_cold(specialty_name: str):
+    specialty_resolver.clear_cache()
+    return resolver_match(specialty_name)
+
+
+def evaluate(name: str, match_fn, rounds: int = 200):
+    hits = 0
+    misses = []
+    for term, expected in CASES:
+        found = match_fn(term)
+        found_name = found["nome"] if found else None
+        if found_name == expected:
+            hits += 1
+        else:
+            misses.append((term, expected, found_name))
+
+    # Aquece (índice/cache) e mede a latência média por busca
+    for term, _ in CASES:
+        match_fn(term)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for term, _ in CASES:
+            match_fn(term)
+    per_lookup_us = (time.perf_counter() - started) / (rounds * len(CASES)) * 1e6
+
+    print(f"\n{name}")
+    print(f"   ✅ Acertos: {hits}/{len(CASES)} ({hits / len(CASES):.0%})")
+    print(f"   ⏱️  Latência média: {per_lookup_us:.1f} µs/busca")
+    for term, expected, found_name in misses:
+        print(f"   ❌ {term!r}: esperado {expected}, obtido {found_name}")
+    return hits, per_lookup_us
+
+
+if __name__ == "__main__":
+    print(f"📚 {len(specialty_registry)} especialidades, {len(CASES)} termos rotulados")
+    evaluate("Loop antigo (substring + prefixo)", legacy_match)
+    evaluate("SpecialtyResolver (tokens + trigramas)", resolver_match)
+    evaluate("SpecialtyResolver sem cache de tokens (primeira busca de cada termo)", resolver_match_cold)
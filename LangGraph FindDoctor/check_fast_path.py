@@ -0,0 +1,114 @@
+"""
+Verificação dos atalhos sem LLM (fast_path.py)
+Confere quais mensagens caem em atalho e quais seguem para o agente, e compara
+/especialidades pelo atalho com o mesmo pedido pelo grafo real (modelo
+simulado que chama get_specialties e depois responde): chamadas ao LLM,
+latência e o turno do atalho aparecendo no histórico visto pelo modelo.
+A API de agendamentos é simulada (não precisa estar no ar)
+
+    python check_fast_path.py
+"""
+import json
+import sys
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+import finddoctor_agent
+from fast_path import AGENT_PATH, FastPathRouter
+
+APPOINTMENTS = [{
+    "agendamento_id": 12, "paciente": "Ana", "medico": "Dr. Paulo", "especialidade": "Cardiologia",
+    "estabelecimento": "Clínica Centro", "data": "2026-11-03", "horario": "09:30", "status": "scheduled"
+}]
+
+# (mensagem, caminho esperado; None = agente)
+ROUTES = [
+    ("/especialidades", "specialties"),
+    ("Quais são as especialidades?", "specialties"),
+    ("Mostre todas as especialidades médicas disponíveis", "specialties"),
+    ("Quais especialidades atendem perto da Paulista?", None),
+    ("Quero ver meus agendamentos", None),
+    ("Meus agendamentos", None),  # email ainda desconhecido: o agente pede
+    ("Meus agendamentos, email ana@exemplo.com", "appointments"),
+    ("quais são minhas consultas?", "appointments"),  # email lembrado
+    ("Cancelar agendamento #12", None),  # cancelar sempre passa pelo agente, que confirma
+    ("cancelar a consulta nº 12 por favor", None),
+    ("cancelar agendamento", None),
+    ("Quero cancelar a consulta de amanhã", None),
+    ("Quero um cardiologista perto da Av. Paulista, 1000", None),
+]
+
+
+def scripted_llm(calls: list):
+    """Modelo simulado: pede get_specialties e depois responde com a lista"""
+    def respond(messages):
+        calls.append(messages)
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="Estas são as especialidades: " + messages[-1].content[:80])
+        return AIMessage(content="", tool_calls=[{"name": "get_specialties", "args": {}, "id": f"call_{len(calls)}"}])
+    return RunnableLambda(respond)
+
+
+def main() -> int:
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    # 1. Roteamento: só pedidos determinísticos e completos caem em atalho
+    api_calls = []
+    router = FastPathRouter(
+        specialties=finddoctor_agent.specialty_registry.as_json,
+        list_appointments=lambda email: api_calls.append(("list", email)) or json.dumps(APPOINTMENTS)
+    )
+    wrong = []
+    for text, expected in ROUTES:
+        routed = router.route(text, "roteamento")
+        if (routed and routed["path"]) != expected:
+            wrong.append(f"{text!r} -> {routed and routed['path']}")
+    check("mensagens roteadas para o caminho esperado", not wrong, "; ".join(wrong) or f"{len(ROUTES)} mensagens")
+    check("email lembrado na conversa e nenhuma ação sem confirmação",
+          api_calls == [("list", "ana@exemplo.com")] * 2, str(api_calls))
+    router.forget("roteamento")
+    check("/reset esquece o email", router.route("meus agendamentos", "roteamento") is None)
+
+    # 2. /especialidades pelo grafo real com modelo simulado
+    llm_calls = []
+    finddoctor_agent.default_llm = lambda: scripted_llm(llm_calls)
+    started = time.perf_counter()
+    result = finddoctor_agent.ask_agent("Mostre todas as especialidades médicas disponíveis", thread_id="check-agente")
+    agent_ms = (time.perf_counter() - started) * 1000
+    check("pelo agente: 2 chamadas ao LLM e 1 ferramenta", result["llm_calls"] == 2 == len(llm_calls),
+          f"{result['llm_calls']} chamadas ao LLM, {agent_ms:.1f} ms sem rede")
+
+    # 3. Mesmo pedido pelo atalho padrão do agente: nenhuma chamada ao LLM
+    fast = finddoctor_agent.fast_path_router
+    fast.reset_stats()
+    llm_calls.clear()
+    routed = fast.route("/especialidades", "check-atalho")
+    stats = fast.stats()["specialties"]
+    check("pelo atalho: nenhuma chamada ao LLM", routed is not None and not llm_calls and stats["llm_calls"] == 0,
+          f"{stats['avg_ms']:.1f} ms")
+    check("resposta do atalho formatada pelos formatters",
+          routed is not None and routed["response"].startswith("🏥 **Especialidades Médicas Disponíveis:**"))
+
+    # 4. O turno do atalho fica no histórico e o modelo o vê no turno seguinte
+    state = finddoctor_agent.agent.get_state({"configurable": {"thread_id": "check-atalho"}})
+    messages = state.values.get("messages", [])
+    check("turno do atalho gravado no histórico",
+          [type(m) for m in messages] == [HumanMessage, AIMessage] and messages[1].content == routed["response"])
+    finddoctor_agent.ask_agent("E a terceira da lista?", thread_id="check-atalho")
+    seen = [m.content for m in llm_calls[0]]
+    check("modelo recebe o turno do atalho no prompt", routed["response"] in seen)
+
+    fast.record(AGENT_PATH, agent_ms, result["llm_calls"])
+    print(f"\nCaminhos: {fast.stats()}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
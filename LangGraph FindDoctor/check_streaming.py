@@ -0,0 +1,92 @@
+"""
+Verificação do streaming do bot (ask_streaming) com um agente simulado
+Confere que o turno normal devolve o evento final e que, quando o consumo
+falha no meio (progress.update levanta), o handler retorna logo, sem esperar
+o gerador, e o gerador é fechado sem produzir o resto dos eventos
+
+    python check_streaming.py
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from load_test_telegram_bot import TOKEN
+from telegram_bot import FindDoctorTelegramBot
+
+TOKENS = 100
+TOKEN_INTERVAL = 0.02
+
+
+class StreamingAgent:
+    """Gera TOKENS tokens com TOKEN_INTERVAL entre eles e registra até onde foi"""
+
+    def __init__(self):
+        self.produced = 0
+        self.closed = threading.Event()
+
+    def stream(self, user_message: str, thread_id: str):
+        try:
+            yield {"type": "tool", "name": "search_establishments"}
+            for i in range(TOKENS):
+                time.sleep(TOKEN_INTERVAL)
+                self.produced += 1
+                yield {"type": "token", "content": f" t{i}", "message_id": "final"}
+            yield {"type": "done", "response": f"Resposta para {user_message}", "llm_calls": 1}
+        finally:
+            self.closed.set()
+
+
+class FakeProgress:
+    """Como ProgressiveMessage.update; levanta na atualização fail_at"""
+
+    def __init__(self, fail_at=None):
+        self.updates = 0
+        self.fail_at = fail_at
+
+    async def update(self, text: str) -> None:
+        self.updates += 1
+        if self.updates == self.fail_at:
+            raise RuntimeError("falha ao editar a mensagem")
+
+
+async def main() -> int:
+    logging.getLogger("telegram_bot").setLevel(logging.ERROR)
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    # Turno completo
+    agent = StreamingAgent()
+    bot = FindDoctorTelegramBot(token=TOKEN, agent=None, reset=lambda thread_id: None, agent_stream=agent.stream, router=None)
+    progress = FakeProgress()
+    result = await bot.ask_streaming("Quero um cardiologista", 1, progress)
+    check("turno completo devolve o evento final", result.get("response") == "Resposta para Quero um cardiologista", str(result))
+    check("todos os eventos consumidos", progress.updates == TOKENS + 1 and agent.closed.is_set(), f"{progress.updates} atualizações")
+
+    # O consumidor falha no 3º evento: o handler não espera o resto do stream
+    agent = StreamingAgent()
+    bot.agent_stream = agent.stream
+    started = time.perf_counter()
+    try:
+        await bot.ask_streaming("Quero um cardiologista", 1, FakeProgress(fail_at=3))
+        raised = None
+    except RuntimeError as e:
+        raised = e
+    elapsed = time.perf_counter() - started
+    full_stream = TOKENS * TOKEN_INTERVAL
+    check("erro do consumidor chega ao handler", raised is not None, str(raised))
+    check("handler retorna sem esperar o gerador", elapsed < full_stream / 4, f"{elapsed * 1000:.0f} ms; stream inteiro ~{full_stream * 1000:.0f} ms")
+
+    closed = await asyncio.get_running_loop().run_in_executor(None, agent.closed.wait, 1.0)
+    check("gerador fechado logo depois", closed and agent.produced < 10, f"{agent.produced} de {TOKENS} tokens gerados")
+
+    bot.executor.shutdown(wait=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,98 @@
+"""
+Verificação do modo webhook com updates gravados
+Sobe a API do Telegram falsa do teste de carga e o app do webhook (uvicorn)
+em portas livres, com o agente simulado, e posta sample_update.json: confere
+o registro do webhook na subida, o segredo, update inválido, update repetido
+e a resposta do bot chegando ao Telegram
+
+    python check_webhook.py
+"""
+import asyncio
+import copy
+import json
+import logging
+
+import httpx
+import uvicorn
+from aiohttp import web
+from telebot import asyncio_helper
+
+from load_test_telegram_bot import TOKEN, FakeTelegramApi, SlowAgent, free_port
+from telegram_bot import FindDoctorTelegramBot
+
+SECRET = "segredo-de-teste"
+
+
+async def main() -> int:
+    logging.getLogger("telegram_bot").setLevel(logging.ERROR)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    api = FakeTelegramApi()
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", api.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    api_port = free_port()
+    await web.TCPSite(runner, "127.0.0.1", api_port).start()
+    asyncio_helper.API_URL = f"http://127.0.0.1:{api_port}/bot{{0}}/{{1}}"
+
+    bot = FindDoctorTelegramBot(token=TOKEN, agent=SlowAgent(0.2, 0), reset=lambda thread_id: None, agent_stream=None)
+    webhook = bot.webhook_app(secret_token=SECRET, webhook_url="https://bot.exemplo.com/telegram/webhook")
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(webhook, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    with open("sample_update.json", encoding="utf-8") as f:
+        update = json.load(f)
+    url = f"http://127.0.0.1:{port}{webhook.path}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    async with httpx.AsyncClient() as http:
+        check("setWebhook chamado na subida com o segredo", api.calls["setWebhook"] == 1)
+
+        response = await http.post(url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": "errado"})
+        check("segredo errado recusado", response.status_code == 401, str(response.status_code))
+        response = await http.post(url, json=update)
+        check("sem segredo recusado", response.status_code == 401, str(response.status_code))
+
+        response = await http.post(url, content=b"{nao e json", headers=headers)
+        check("update inválido recusado", response.status_code == 400, str(response.status_code))
+
+        response = await http.post(url, json=update, headers=headers)
+        check("update gravado aceito", response.status_code == 200, response.text)
+        response = await http.post(url, json=update, headers=headers)
+        check("update repetido ignorado", response.json().get("duplicate") is True, response.text)
+
+        # Outra mensagem do mesmo chat
+        second = copy.deepcopy(update)
+        second["update_id"] += 1
+        second["message"]["message_id"] += 1
+        second["message"]["text"] = "E pediatras?"
+        await http.post(url, json=second, headers=headers)
+
+        await asyncio.sleep(0.1)
+        await bot.dispatcher.join()
+        chat_id = update["message"]["chat"]["id"]
+        replies = [text for text, _ in api.replies[chat_id]]
+        check("respostas do agente enviadas ao Telegram, em ordem",
+              replies == [f"Resposta para {update['message']['text']}", "Resposta para E pediatras?"], str(replies))
+
+        health = (await http.get(f"http://127.0.0.1:{port}/health")).json()
+        check("health com contadores", health["webhook"] == {"received": 2, "duplicates": 1, "rejected": 3}, str(health))
+
+    server.should_exit = True
+    await serving
+    await runner.cleanup()
+    bot.executor.shutdown(wait=False)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
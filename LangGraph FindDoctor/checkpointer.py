@@ -0,0 +1,225 @@
+"""
+Checkpointers das conversas do agente (histórico por thread)
+memory: InMemorySaver limitado. Guarda só o último checkpoint de cada thread,
+no máximo max_threads threads (as menos usadas saem primeiro, LRU) e apaga
+as paradas há mais de ttl_seconds.
+sqlite/postgres: histórico em disco, sobrevive a reinícios. A última
+atividade de cada thread fica numa tabela própria (agent_thread_activity),
+usada para apagar as threads paradas há mais de ttl_seconds.
+Os pacotes langgraph-checkpoint-sqlite / langgraph-checkpoint-postgres só
+são necessários para o backend correspondente
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from config import (
+    CHECKPOINTER_BACKEND,
+    CHECKPOINTER_URL,
+    CONVERSATION_MAX_THREADS,
+    CONVERSATION_TTL_SECONDS,
+)
+
+# Intervalo máximo entre varreduras de threads paradas
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """InMemorySaver com só o último checkpoint por thread, limite de threads (LRU) e expiração"""
+
+    def __init__(self, max_threads: int = CONVERSATION_MAX_THREADS, ttl_seconds: float = CONVERSATION_TTL_SECONDS):
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.evicted = 0
+        self.expired = 0
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        # Versão guardada de cada canal por (thread, ns): a anterior vira lixo no próximo put
+        self._versions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._last_sweep = time.monotonic()
+
+    def get_tuple(self, config):
+        with self._lock:
+            found = super().get_tuple(config)
+            if found is not None:
+                self._touch(config["configurable"]["thread_id"])
+            return found
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            self._prune(thread_id, checkpoint_ns, checkpoint["id"], new_versions)
+            self._touch(thread_id)
+            return saved
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            return super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._last_used.pop(thread_id, None)
+            for key in [k for k in self._versions if k[0] == thread_id]:
+                del self._versions[key]
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, new_versions) -> None:
+        """Remove os checkpoints anteriores da thread, suas escritas e as versões antigas dos canais"""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for old_id in [c for c in checkpoints if c != checkpoint_id]:
+            del checkpoints[old_id]
+            self.writes.pop((thread_id, checkpoint_ns, old_id), None)
+        versions = self._versions.setdefault((thread_id, checkpoint_ns), {})
+        for channel, version in new_versions.items():
+            previous = versions.get(channel)
+            if previous is not None and previous != version:
+                self.blobs.pop((thread_id, checkpoint_ns, channel, previous), None)
+            versions[channel] = version
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_used[thread_id] = time.monotonic()
+        self._last_used.move_to_end(thread_id)
+        while len(self._last_used) > self.max_threads:
+            oldest = next(iter(self._last_used))
+            self.delete_thread(oldest)
+            self.evicted += 1
+        if time.monotonic() - self._last_sweep >= min(SWEEP_INTERVAL_SECONDS, self.ttl_seconds):
+            self.expire_idle_threads()
+
+    def expire_idle_threads(self) -> int:
+        """Apaga as threads sem uso há mais de ttl_seconds; devolve quantas"""
+        with self._lock:
+            self._last_sweep = now = time.monotonic()
+            idle = [t for t, used in self._last_used.items() if now - used > self.ttl_seconds]
+            for thread_id in idle:
+                self.delete_thread(thread_id)
+            self.expired += len(idle)
+            return len(idle)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "threads": len(self._last_used),
+                "max_threads": self.max_threads,
+                "blobs": len(self.blobs),
+                "evicted": self.evicted,
+                "expired": self.expired
+            }
+
+
+class _ThreadActivityMixin(ABC):
+    """
+    Última atividade de cada thread numa tabela do próprio banco do checkpointer.
+    As subclasses definem _activity(sql, params) com placeholders "?"
+    """
+
+    ttl_seconds: float
+    expired = 0
+    _last_sweep = 0.0
+
+    def _setup_activity(self) -> None:
+        self._activity(
+            "CREATE TABLE IF NOT EXISTS agent_thread_activity ("
+            "thread_id TEXT PRIMARY KEY, last_seen DOUBLE PRECISION NOT NULL)"
+        )
+
+    @abstractmethod
+    def _activity(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Executa o SQL no banco do checkpointer e devolve as linhas como tuplas"""
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        self._activity(
+            "INSERT INTO agent_thread_activity (thread_id, last_seen) VALUES (?, ?) "
+            "ON CONFLICT (thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+            (str(config["configurable"]["thread_id"]), time.time())
+        )
+        if time.monotonic() - self._last_sweep >= min(SWEEP_INTERVAL_SECONDS, self.ttl_seconds):
+            self.expire_idle_threads()
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._activity("DELETE FROM agent_thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+    def expire_idle_threads(self) -> int:
+        """Apaga as threads sem atividade há mais de ttl_seconds; devolve quantas"""
+        self._last_sweep = time.monotonic()
+        rows = self._activity(
+            "SELECT thread_id FROM agent_thread_activity WHERE last_seen < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        for (thread_id,) in rows:
+            self.delete_thread(thread_id)
+        self.expired += len(rows)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        threads = self._activity("SELECT COUNT(*) FROM agent_thread_activity")[0][0]
+        return {"backend": self.backend, "threads": threads, "expired": self.expired}
+
+
+def _sqlite_saver(path: str, ttl_seconds: float):
+    import sqlite3
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class ExpiringSqliteSaver(_ThreadActivityMixin, SqliteSaver):
+        backend = "sqlite"
+
+        def _activity(self, sql, params=()):
+            with self.lock, self.conn:
+                return self.conn.execute(sql, params).fetchall()
+
+    conn = sqlite3.connect(path, check_same_thread=False)
+    saver = ExpiringSqliteSaver(conn)
+    saver.ttl_seconds = ttl_seconds
+    saver.setup()
+    saver._setup_activity()
+    return saver
+
+
+def _postgres_saver(url: str, ttl_seconds: float):
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    class ExpiringPostgresSaver(_ThreadActivityMixin, PostgresSaver):
+        backend = "postgres"
+
+        def _activity(self, sql, params=()):
+            with self.conn.connection() as conn:
+                cursor = conn.execute(sql.replace("?", "%s"), params)
+                rows = cursor.fetchall() if cursor.description else []
+                return [tuple(row.values()) for row in rows]
+
+    pool = ConnectionPool(url, kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}, open=True)
+    saver = ExpiringPostgresSaver(pool)
+    saver.ttl_seconds = ttl_seconds
+    saver.setup()
+    saver._setup_activity()
+    return saver
+
+
+def create_checkpointer(
+    backend: str = CHECKPOINTER_BACKEND,
+    url: str = CHECKPOINTER_URL,
+    ttl_seconds: float = CONVERSATION_TTL_SECONDS,
+    max_threads: int = CONVERSATION_MAX_THREADS
+):
+    """Checkpointer configurado: "memory", "sqlite" (url = arquivo) ou "postgres" (url = conexão)"""
+    if backend == "memory":
+        return BoundedMemorySaver(max_threads=max_threads, ttl_seconds=ttl_seconds)
+    if backend == "sqlite":
+        return _sqlite_saver(url, ttl_seconds)
+    if backend == "postgres":
+        return _postgres_saver(url, ttl_seconds)
+    raise ValueError(f"Backend de checkpointer desconhecido: {backend}")
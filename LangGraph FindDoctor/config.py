@@ -5,11 +5,55 @@ Configurações do bot Telegram FindDoctor
 # Token do bot Telegram (substitua pelo seu token do @BotFather)
 TELEGRAM_BOT_TOKEN = ""
 
+# Bot: turnos do agente em paralelo (usuários diferentes) e limites da fila
+BOT_MAX_CONCURRENT_TURNS = 16
+BOT_MAX_PENDING_PER_USER = 3  # mensagens na fila por usuário (contando a em andamento)
+BOT_MAX_PENDING_TOTAL = 500  # mensagens na fila no total
+
+# Modo webhook (python telegram_bot.py --webhook): o Telegram envia os updates por POST
+WEBHOOK_URL = ""  # URL pública registrada no Telegram, ex: https://bot.exemplo.com/telegram/webhook
+WEBHOOK_PATH = "/telegram/webhook"
+WEBHOOK_SECRET_TOKEN = ""  # obrigatório; letras, números, _ e -, conferido em cada update
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = 8080
+
+# Resposta em streaming: a mensagem de processamento é editada com o texto parcial
+# (no máximo uma edição por intervalo por chat, limite do Telegram)
+STREAM_EDIT_INTERVAL_SECONDS = 1.0
+
+# Atalhos sem LLM (fast_path.py): lista de especialidades e "meus agendamentos"
+# são respondidos direto pela API/registro
+FAST_PATH_ENABLED = True
+
 # Configurações do agente
 DEFAULT_RADIUS_KM = 1
 MAX_MESSAGE_LENGTH = 4096
 MAX_RESULTS_PER_MESSAGE = 5
 
+# Cliente HTTP das APIs (C# e agendamento)
+API_CONNECT_TIMEOUT = 3.0  # segundos para abrir a conexão
+API_READ_TIMEOUT = 15.0  # segundos sem receber dados da resposta
+API_MAX_CONNECTIONS = 20  # conexões simultâneas por cliente
+API_MAX_KEEPALIVE_CONNECTIONS = 10  # conexões ociosas mantidas abertas
+API_RETRIES = 2  # novas tentativas após falha de conexão/timeout ou 502/503/504
+API_RETRY_BACKOFF = 0.3  # base (s) do backoff exponencial com jitter
+API_RETRY_BACKOFF_MAX = 3.0
+
+# Ferramentas chamadas no mesmo turno do modelo rodam em paralelo nesse pool
+TOOL_MAX_WORKERS = 8
+
+# Histórico das conversas (tokens estimados, ~4 caracteres por token)
+HISTORY_MAX_TOKENS = 6000  # acima disso as mensagens antigas viram resumo
+HISTORY_KEEP_TOKENS = 3000  # janela recente mantida depois de resumir
+HISTORY_TOOL_OUTPUT_MAX_CHARS = 500  # saídas de ferramentas de turnos anteriores
+HISTORY_SUMMARY_MAX_CHARS = 2000  # tamanho máximo do resumo corrente
+
+# Onde o histórico das conversas fica salvo: "memory", "sqlite" ou "postgres"
+CHECKPOINTER_BACKEND = "memory"
+CHECKPOINTER_URL = "finddoctor_conversations.sqlite"  # arquivo SQLite ou URL do Postgres
+CONVERSATION_TTL_SECONDS = 7 * 24 * 3600  # conversas paradas há mais tempo são apagadas
+CONVERSATION_MAX_THREADS = 1000  # backend memory: acima disso sai a conversa menos usada
+
 # Mensagens do bot
 WELCOME_MESSAGE = """
 🏥 **Bem-vindo ao FindDoctor Bot!**
@@ -62,6 +106,7 @@ HELP_MESSAGE = """
 Precisa de mais alguma coisa? É só perguntar! 😊
 """
 
+BUSY_MESSAGE = "⏳ Ainda estou respondendo suas mensagens anteriores. Aguarde a resposta e tente de novo."
 ERROR_MESSAGE = "❌ Desculpe, ocorreu um erro. Tente novamente em alguns instantes."
 PROCESSING_MESSAGE = "🔄 Processando sua solicitação..."
 NO_RESULTS_MESSAGE = "😔 Não encontrei resultados para sua busca. Tente refinar os critérios."
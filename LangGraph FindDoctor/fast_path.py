@@ -0,0 +1,145 @@
+"""
+Atalhos sem LLM para pedidos determinísticos
+Lista de especialidades e "meus agendamentos" com email conhecido são
+respondidos direto pelo registro/API e pelos formatters; o resto segue para
+o agente, inclusive cancelamentos, que ele confirma com o paciente antes de
+executar. O texto só cai num atalho se casar inteiro com o padrão (pedidos
+abertos vão ao LLM). Cada caminho tem contadores de chamadas, latência e
+chamadas ao LLM
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from formatters import format_appointments_results, format_specialties_results
+from specialty_registry import normalize_name
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# Aplicados ao texto normalizado (sem acentos, caixa, pontuação e email)
+_POLITE = r"(?:por favor )?"
+_EMAIL_WORD = r"(?:(?: do| pelo| com o| com| meu)? e-?mail)?"
+SPECIALTIES_RE = re.compile(
+    _POLITE + r"(?:/especialidades|(?:(?:quais|quais sao|listar|lista|liste|mostrar|mostre|ver)(?: as| todas as)? )?"
+    r"especialidades(?: medicas)?(?: disponiveis)?)(?: por favor)?"
+)
+APPOINTMENTS_RE = re.compile(
+    _POLITE + r"(?:(?:quais sao|quais|listar|lista|liste|mostrar|mostre|ver|consultar) )?(?:os |as )?"
+    r"(?:meus agendamentos|minhas consultas)" + _EMAIL_WORD + r"(?: por favor)?"
+)
+
+# Caminho dos turnos que não caíram em nenhum atalho
+AGENT_PATH = "agent"
+
+
+def normalize_text(text: str) -> str:
+    """Texto "Quais são as especialidades?" vira "quais sao as especialidades" (mantém / e #)"""
+    return normalize_name(re.sub(r"[^\w\s/#-]", " ", text))
+
+
+def _format_tool_result(result: str, formatter: Callable[[str], str]) -> str:
+    """Saída das ferramentas: JSON vai para o formatter; mensagens prontas (erro, lista vazia) passam direto"""
+    return formatter(result) if result.lstrip().startswith(("[", "{")) else result
+
+
+class FastPathRouter:
+    """Responde os pedidos determinísticos sem o agente e conta os turnos por caminho"""
+
+    def __init__(
+        self,
+        specialties: Callable[[], str],
+        list_appointments: Callable[[str], str],
+        record: Optional[Callable[[str, str, str], None]] = None,
+        max_emails: int = 1000
+    ):
+        # specialties() -> JSON; list_appointments(email) devolve a saída da ferramenta
+        # do agente; record(user_input, response, thread_id)
+        # grava o turno no histórico para o agente ver o que já foi respondido
+        self.specialties = specialties
+        self.list_appointments = list_appointments
+        self.record_turn = record
+        self.max_emails = max_emails
+        self._lock = threading.Lock()
+        self._emails: "OrderedDict[str, str]" = OrderedDict()
+        self._paths: Dict[str, Dict[str, float]] = {}
+
+    def known_email(self, thread_id: str) -> Optional[str]:
+        with self._lock:
+            return self._emails.get(thread_id)
+
+    def remember_email(self, thread_id: str, email: str) -> None:
+        """Último email informado na conversa (no máximo max_emails conversas)"""
+        with self._lock:
+            self._emails[thread_id] = email
+            self._emails.move_to_end(thread_id)
+            while len(self._emails) > self.max_emails:
+                self._emails.popitem(last=False)
+
+    def forget(self, thread_id: str) -> None:
+        """/reset: esquece o email da conversa"""
+        with self._lock:
+            self._emails.pop(thread_id, None)
+
+    def match(self, text: str, thread_id: str) -> Optional[Tuple[str, Callable[[], str]]]:
+        """(caminho, resposta) do atalho que atende text, ou None se o pedido precisa do agente"""
+        found = EMAIL_RE.search(text)
+        if found:
+            self.remember_email(thread_id, found.group(0))
+        key = normalize_text(EMAIL_RE.sub(" ", text))
+
+        if SPECIALTIES_RE.fullmatch(key):
+            return "specialties", lambda: format_specialties_results(self.specialties())
+        email = self.known_email(thread_id)
+        if not email:
+            return None
+        if APPOINTMENTS_RE.fullmatch(key):
+            return "appointments", lambda: _format_tool_result(self.list_appointments(email), format_appointments_results)
+        return None
+
+    def route(self, text: str, thread_id: str) -> Optional[Dict[str, Any]]:
+        """
+        {"path", "response"} quando text cai num atalho; None quando deve ir ao
+        agente (o chamador registra esse turno com record(AGENT_PATH, ...))
+        """
+        started = time.perf_counter()
+        matched = self.match(text, thread_id)
+        if matched is None:
+            return None
+        path, answer = matched
+
+        print(f"⚡ ATALHO ({path}): '{text}' sem chamar o modelo")
+        response = answer()
+        if self.record_turn:
+            try:
+                self.record_turn(text, response, thread_id)
+            except Exception as e:
+                print(f"   ⚠️ Turno não gravado no histórico: {e}")
+        self.record(path, (time.perf_counter() - started) * 1000)
+        return {"path": path, "response": response}
+
+    def record(self, path: str, elapsed_ms: float, llm_calls: int = 0) -> None:
+        with self._lock:
+            counters = self._paths.setdefault(path, {"calls": 0, "llm_calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            counters["calls"] += 1
+            counters["llm_calls"] += llm_calls
+            counters["total_ms"] += elapsed_ms
+            counters["max_ms"] = max(counters["max_ms"], elapsed_ms)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Por caminho: turnos, chamadas ao LLM e latência média/máxima"""
+        with self._lock:
+            return {
+                path: {
+                    "calls": c["calls"],
+                    "llm_calls": c["llm_calls"],
+                    "avg_ms": round(c["total_ms"] / c["calls"], 1),
+                    "max_ms": round(c["max_ms"], 1)
+                }
+                for path, c in self._paths.items()
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._paths.clear()
@@ -1,20 +1,32 @@
-from typing import List, Dict, Any, Optional, TypedDict
+from typing import List, Dict, Any, Iterator, Optional, Tuple, TypedDict
 from langchain.tools import tool
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END, MessagesState
-from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import MemorySaver
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import json
-import os
+import threading
+import time
 
+from checkpointer import create_checkpointer
+from config import CONVERSATION_MAX_THREADS, TOOL_MAX_WORKERS
+from fast_path import FastPathRouter
 from finddoctor_api_client import FindDoctorApiClient
+from history import create_history_node, prompt_messages
+from specialty_registry import specialty_registry
+from specialty_resolver import specialty_resolver
 
 # Inicializa o cliente da API
 client = FindDoctorApiClient("http://localhost:5210", "http://localhost:8000")
 
-# Define o estado do agente usando MessagesState padrão
-# MessagesState já inclui a lista de mensagens com add_messages
+# Profissionais por estabelecimento enviados ao LLM na busca
+MAX_PROFESSIONALS_PER_ESTABLISHMENT = 5
+
+# Estado do agente: MessagesState (lista de mensagens com add_messages)
+# mais o resumo corrente das mensagens que saíram da janela do histórico
+class AgentState(MessagesState):
+    summary: str
 
 # Define as ferramentas
 @tool
@@ -36,21 +48,14 @@ def get_specialties() -> str:
     """Obtém a lista de todas as especialidades médicas disponíveis do arquivo local filtrado."""
     print(f"🏥 EXECUTANDO: get_specialties (arquivo médico filtrado)")
     try:
-        # Caminho para o arquivo JSON de especialidades médicas filtrado
-        json_file_path = os.path.join(os.path.dirname(__file__), "medical_specialties.json")
-        
-        # Verifica se o arquivo existe
-        if not os.path.exists(json_file_path):
-            print(f"   ❌ Arquivo {json_file_path} não encontrado")
-            return "Erro: Arquivo de especialidades médicas não encontrado."
-        
-        # Lê o arquivo JSON local filtrado
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            specialties = json.load(file)
-        
-        print(f"   ✅ {len(specialties)} especialidade(s) médica(s) carregada(s) do arquivo filtrado")
-        return json.dumps(specialties, ensure_ascii=False)
+        # Lista em memória (o arquivo só é relido se mudar), já serializada
+        specialties_json = specialty_registry.as_json()
+        print(f"   ✅ {len(specialty_registry)} especialidade(s) médica(s) carregada(s) do arquivo filtrado")
+        return specialties_json
         
+    except FileNotFoundError:
+        print(f"   ❌ Arquivo {specialty_registry.path} não encontrado")
+        return "Erro: Arquivo de especialidades médicas não encontrado."
     except Exception as e:
         print(f"   ❌ Erro ao ler arquivo de especialidades médicas: {str(e)}")
         return f"Erro ao buscar especialidades médicas: {str(e)}"
@@ -85,76 +90,37 @@ def search_establishments(
     if specialty_name:
         print(f"   🔍 Buscando ID da especialidade para: {specialty_name}")
         try:
-            # Carrega especialidades médicas do arquivo filtrado
-            json_file_path = os.path.join(os.path.dirname(__file__), "medical_specialties.json")
-            
-            if os.path.exists(json_file_path):
-                print("   📁 Carregando especialidades médicas do arquivo filtrado...")
-                with open(json_file_path, 'r', encoding='utf-8') as file:
-                    specialties = json.load(file)
-                print(f"   ✅ {len(specialties)} especialidades médicas carregadas do arquivo filtrado")
-            else:
-                print("   ❌ Arquivo de especialidades médicas não encontrado")
-                return "Erro: Arquivo de especialidades médicas não encontrado."
-            
-            specialty_name_lower = specialty_name.lower().strip()
-            
-            # Busca direta por correspondência (já que o arquivo só tem especialidades médicas)
-            print(f"   🔍 Procurando por: {specialty_name_lower}")
-            
-            matched_specialty = None
-            best_match_score = 0
-            
-            for specialty in specialties:
-                specialty_nome_upper = specialty['nome'].upper().strip()
-                specialty_nome_lower = specialty['nome'].lower().strip()
-                
-                # Score de correspondência
-                score = 0
-                
-                # Correspondência exata (ignora case)
-                if specialty_name_lower == specialty_nome_lower:
-                    score = 100
-                # Contém o termo completo
-                elif specialty_name_lower in specialty_nome_lower:
-                    score = 90
-                elif specialty_nome_lower in specialty_name_lower:
-                    score = 85
-                # Busca por palavras-chave parciais
-                elif any(word in specialty_nome_lower for word in specialty_name_lower.split() if len(word) > 3):
-                    score = 75
-                # Busca por início do nome
-                elif specialty_nome_lower.startswith(specialty_name_lower[:6]):
-                    score = 70
-                
-                # Atualiza melhor correspondência
-                if score > best_match_score:
-                    best_match_score = score
-                    matched_specialty = specialty
-            
-            if matched_specialty and best_match_score >= 70:
-                specialty_id = matched_specialty['id']
-                print(f"   ✅ Especialidade encontrada: {matched_specialty['nome']} (ID: {specialty_id}) - Score: {best_match_score}")
+            # Índice de tokens/trigramas sobre as especialidades em memória
+            match = specialty_resolver.resolve(specialty_name)
+            if match:
+                specialty_id = match.specialty['id']
+                print(f"   ✅ Especialidade encontrada: {match.specialty['nome']} (ID: {specialty_id}) - Confiança: {match.confidence:.0%}")
             else:
                 print(f"   ⚠️ Especialidade '{specialty_name}' não encontrada com confiança suficiente, buscando sem filtro de especialidade")
-                
+        
+        except FileNotFoundError:
+            print("   ❌ Arquivo de especialidades médicas não encontrado")
+            return "Erro: Arquivo de especialidades médicas não encontrado."
         except Exception as e:
             print(f"   ❌ Erro ao buscar especialidades: {str(e)}")
             print("   ⚠️ Continuando busca sem filtro de especialidade")
     
     try:
+        # Resumo: só os profissionais que casam com a busca, do mais próximo ao mais distante
         results = client.search_establishments(
             latitude=latitude,
             longitude=longitude,
             radius_km=radius_km,
             specialty_id=specialty_id,
-            doctor_name=doctor_name
+            doctor_name=doctor_name,
+            summary=True,
+            max_professionals=MAX_PROFESSIONALS_PER_ESTABLISHMENT
         )
         if not results:
             print("   ❌ Nenhum estabelecimento encontrado")
             return "Nenhum estabelecimento encontrado que atenda aos seus critérios."
         print(f"   ✅ {len(results)} estabelecimento(s) encontrado(s)")
-        return json.dumps(results, ensure_ascii=False)
+        return json.dumps(results, ensure_ascii=False, separators=(",", ":"))
     except Exception as e:
         return f"Erro ao buscar estabelecimentos: {str(e)}"
 
@@ -169,6 +135,23 @@ def get_establishment_details(cnes_code: str) -> str:
     except Exception as e:
         return f"Erro ao buscar detalhes do estabelecimento: {str(e)}"
 
+@tool
+def get_establishments_details(cnes_codes: List[str]) -> str:
+    """
+    Obtém os detalhes de vários estabelecimentos de saúde de uma vez.
+    Use no lugar de chamar get_establishment_details várias vezes.
+    
+    Argumentos:
+        cnes_codes: Lista de códigos CNES dos estabelecimentos
+    """
+    print(f"🏥 EXECUTANDO: get_establishments_details com {len(cnes_codes)} CNES")
+    try:
+        batch = client.get_establishments_details(cnes_codes)
+        print(f"   ✅ {len(batch['results'])} encontrado(s), {len(batch['errors'])} erro(s)")
+        return json.dumps(batch, ensure_ascii=False)
+    except Exception as e:
+        return f"Erro ao buscar detalhes dos estabelecimentos: {str(e)}"
+
 # ========== FERRAMENTAS DE AGENDAMENTO ==========
 
 @tool
@@ -232,6 +215,99 @@ def list_available_doctors(establishment_id: Optional[str] = None, specialty: Op
         print(f"   ❌ Erro: {str(e)}")
         return f"Erro ao buscar médicos disponíveis: {str(e)}"
 
+@tool
+def list_doctor_slots(doctor_id: int, date_from: Optional[str] = None, date_to: Optional[str] = None) -> str:
+    """
+    Lista os horários livres de um médico para agendamento.
+    
+    Use SEMPRE antes de schedule_appointment para oferecer ao paciente apenas
+    horários realmente disponíveis (em vez de tentar um horário e esperar erro).
+    
+    Argumentos:
+        doctor_id: ID do médico (obtido da lista de médicos)
+        date_from: Data inicial no formato YYYY-MM-DD (opcional, padrão: hoje)
+        date_to: Data final no formato YYYY-MM-DD (opcional, padrão: 7 dias a partir da inicial)
+    """
+    print(f"🗓️ EXECUTANDO: list_doctor_slots")
+    print(f"   👨‍⚕️ Médico ID: {doctor_id}")
+    if date_from or date_to:
+        print(f"   📆 Período: {date_from or 'hoje'} a {date_to or '+7 dias'}")
+    
+    try:
+        result = client.get_doctor_slots(doctor_id, date_from, date_to)
+        slots = result.get("slots", [])
+        if not slots:
+            print("   ❌ Nenhum horário livre no período")
+            return "Nenhum horário livre para este médico no período informado."
+        
+        print(f"   ✅ {len(slots)} horário(s) livre(s)")
+        
+        # Agrupa por data no formato compacto {"YYYY-MM-DD": ["HH:MM", ...]}
+        by_date = {}
+        for slot in slots:
+            slot_date, slot_time = slot.split("T")
+            by_date.setdefault(slot_date, []).append(slot_time[:5])
+        
+        return json.dumps({"medico_id": doctor_id, "horarios_livres": by_date}, ensure_ascii=False)
+    except Exception as e:
+        print(f"   ❌ Erro: {str(e)}")
+        return f"Erro ao buscar horários livres: {str(e)}"
+
+@tool
+def find_earliest_slots(
+    specialty: Optional[str] = None,
+    establishment_id: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+) -> str:
+    """
+    Busca os primeiros horários livres entre TODOS os médicos de uma especialidade
+    e/ou estabelecimento, em uma única chamada.
+    
+    Use quando o usuário perguntar "qual o primeiro cardiologista disponível",
+    "quem atende mais cedo" ou quiser o horário mais próximo sem escolher o médico.
+    
+    Argumentos:
+        specialty: Especialidade médica (ex: "cardiologia", "pediatria")
+        establishment_id: ID do estabelecimento (opcional)
+        date_from: Data inicial no formato YYYY-MM-DD (opcional, padrão: hoje)
+        date_to: Data final no formato YYYY-MM-DD (opcional, padrão: 7 dias a partir da inicial)
+    """
+    print(f"⏱️ EXECUTANDO: find_earliest_slots")
+    if specialty:
+        print(f"   🩺 Especialidade: {specialty}")
+    if establishment_id:
+        print(f"   🏥 Estabelecimento: {establishment_id}")
+    
+    if not specialty and not establishment_id:
+        return "Informe a especialidade ou o estabelecimento para buscar horários."
+    
+    try:
+        result = client.find_earliest_slots(specialty, establishment_id, date_from, date_to)
+        slots = result.get("slots", [])
+        if not slots:
+            print("   ❌ Nenhum horário livre encontrado")
+            return "Nenhum horário livre encontrado para os filtros informados."
+        
+        print(f"   ✅ {len(slots)} horário(s) encontrado(s)")
+        
+        horarios = []
+        for slot in slots:
+            slot_date, slot_time = slot["slot"].split("T")
+            horarios.append({
+                "data": slot_date,
+                "horario": slot_time[:5],
+                "medico_id": slot["doctor_id"],
+                "medico": slot["doctor_name"],
+                "especialidade": slot["specialty"],
+                "estabelecimento": slot["establishment_name"]
+            })
+        
+        return json.dumps(horarios, ensure_ascii=False)
+    except Exception as e:
+        print(f"   ❌ Erro: {str(e)}")
+        return f"Erro ao buscar horários livres: {str(e)}"
+
 @tool
 def schedule_appointment(
     doctor_id: int,
@@ -302,7 +378,7 @@ def schedule_appointment(
         
         # Trata erros específicos
         if "already exists" in error_msg.lower() or "já existe" in error_msg.lower():
-            return "Este horário já está ocupado. Por favor, escolha outro horário disponível."
+            return "Este horário já está ocupado. Consulte list_doctor_slots e ofereça outro horário livre."
         elif "not found" in error_msg.lower() or "não encontrado" in error_msg.lower():
             return "Médico não encontrado. Verifique o ID do médico e tente novamente."
         elif "passadas" in error_msg.lower() or "past" in error_msg.lower():
@@ -402,15 +478,83 @@ def cancel_patient_appointment(appointment_id: int, patient_email: str) -> str:
         else:
             return f"Erro ao cancelar agendamento: {error_msg}"
 
-# Cria os nós do grafo
-def chatbot(state: MessagesState) -> MessagesState:
-    """Nó principal do chatbot que processa mensagens e decide se precisa usar ferramentas."""
-    messages = state["messages"]
-    
-    # Adiciona a mensagem do sistema se ainda não existir
-    if not messages or not isinstance(messages[0], SystemMessage):
-        system_message = SystemMessage(
-            content="""Você é um assistente especializado em ajudar usuários a encontrar profissionais de saúde, estabelecimentos médicos e agendar consultas no Brasil.
+# Ferramentas disponíveis para o modelo
+TOOLS = [
+    search_address, 
+    get_specialties, 
+    search_establishments, 
+    get_establishment_details,
+    get_establishments_details,
+    list_available_doctors,
+    list_doctor_slots,
+    find_earliest_slots,
+    schedule_appointment,
+    list_patient_appointments,
+    cancel_patient_appointment
+]
+TOOLS_BY_NAME = {t.name: t for t in TOOLS}
+
+# Pool das chamadas de ferramenta: as do mesmo turno são independentes e
+# rodam em paralelo (o turno leva o tempo da mais lenta, não a soma)
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
+# Tempo acumulado por ferramenta: {nome: {"calls", "errors", "total_ms", "max_ms"}}
+tool_timings: Dict[str, Dict[str, float]] = {}
+_tool_timings_lock = threading.Lock()
+
+def _record_tool_timing(name: str, elapsed_ms: float, failed: bool) -> None:
+    with _tool_timings_lock:
+        timing = tool_timings.setdefault(name, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        timing["calls"] += 1
+        timing["errors"] += int(failed)
+        timing["total_ms"] += elapsed_ms
+        timing["max_ms"] = max(timing["max_ms"], elapsed_ms)
+
+def _run_tool_call(tool_call: Dict[str, Any]) -> Tuple[ToolMessage, float]:
+    """Executa uma chamada de ferramenta; erros viram ToolMessage com status error"""
+    name = tool_call["name"]
+    started = time.perf_counter()
+    selected = TOOLS_BY_NAME.get(name)
+    if selected is None:
+        message = ToolMessage(
+            content=f"Erro: a ferramenta '{name}' não existe.",
+            name=name, tool_call_id=tool_call["id"], status="error"
+        )
+    else:
+        try:
+            message = selected.invoke({**tool_call, "type": "tool_call"})
+        except Exception as e:
+            message = ToolMessage(
+                content=f"Erro ao executar {name}: {str(e)}",
+                name=name, tool_call_id=tool_call["id"], status="error"
+            )
+    return message, (time.perf_counter() - started) * 1000
+
+def run_tools(state: MessagesState) -> MessagesState:
+    """Nó de ferramentas: executa as chamadas do último AIMessage em paralelo, na ordem original."""
+    tool_calls = state["messages"][-1].tool_calls
+    started = time.perf_counter()
+    if len(tool_calls) == 1:
+        results = [_run_tool_call(tool_calls[0])]
+    else:
+        # map devolve na ordem das chamadas, não na ordem em que terminam
+        results = list(tool_executor.map(_run_tool_call, tool_calls))
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    messages = []
+    for tool_call, (message, elapsed_ms) in zip(tool_calls, results):
+        failed = getattr(message, "status", "success") == "error"
+        _record_tool_timing(tool_call["name"], elapsed_ms, failed)
+        message.response_metadata["elapsed_ms"] = round(elapsed_ms, 1)
+        print(f"   ⏱️ {tool_call['name']}: {elapsed_ms:.0f} ms{' (erro)' if failed else ''}")
+        messages.append(message)
+    if len(results) > 1:
+        print(f"⏱️ {len(results)} ferramentas em {wall_ms:.0f} ms (soma {sum(ms for _, ms in results):.0f} ms)")
+
+    return {"messages": messages}
+
+# Prompt do sistema: montado uma vez e reaproveitado em todos os turnos e threads
+SYSTEM_PROMPT = """Você é um assistente especializado em ajudar usuários a encontrar profissionais de saúde, estabelecimentos médicos e agendar consultas no Brasil.
 
 CAPACIDADES PRINCIPAIS:
 
@@ -441,11 +585,11 @@ FLUXO RECOMENDADO PARA AGENDAMENTO:
       - Email (será usado para consultar agendamentos futuros)
       - Telefone com DDD (ex: (11) 98765-4321)
       - Data desejada (formato: YYYY-MM-DD)
-      - Horário desejado (formato: HH:MM, ex: 14:30)
       - Observações (opcional)
-   c. Confirme os dados antes de agendar
-   d. Use schedule_appointment para criar o agendamento
-   e. Forneça o número do agendamento e orientações
+   c. Use list_doctor_slots para obter os horários livres do médico e ofereça apenas esses horários
+   d. Confirme os dados antes de agendar
+   e. Use schedule_appointment com um dos horários livres
+   f. Forneça o número do agendamento e orientações
 
 3. Para CONSULTAR AGENDAMENTOS:
    - Peça o email do paciente
@@ -473,48 +617,61 @@ BUSCA POR LOCALIZAÇÃO (quando usuário menciona endereço/proximidade):
 - get_specialties: Listar todas as especialidades médicas cadastradas
 - search_establishments: Buscar estabelecimentos próximos a uma localização específica
 - get_establishment_details: Obter detalhes completos de um estabelecimento por CNES
+- get_establishments_details: Obter detalhes de vários estabelecimentos de uma vez (lista de CNES)
 
 AGENDAMENTO (quando usuário quer marcar consulta - NÃO peça localização):
 - list_available_doctors: Listar TODOS os médicos cadastrados no sistema de agendamento (use quando perguntarem sobre médicos para agendar)
+- list_doctor_slots: Listar os horários livres de um médico (use antes de agendar)
+- find_earliest_slots: Primeiros horários livres entre todos os médicos de uma especialidade/estabelecimento
 - schedule_appointment: Criar um novo agendamento de consulta com médico específico
 - list_patient_appointments: Consultar todos os agendamentos de um paciente por email
 - cancel_patient_appointment: Cancelar um agendamento específico do paciente"""
-        )
-    messages = [system_message] + messages
-    
-    # Inicializa o modelo de linguagem com ferramentas
-    tools = [
-        search_address, 
-        get_specialties, 
-        search_establishments, 
-        get_establishment_details,
-        list_available_doctors,
-        schedule_appointment,
-        list_patient_appointments,
-        cancel_patient_appointment
-    ]
-    llm = ChatOpenAI(temperature=0.1, model="gpt-4o-mini", api_key="")
-    llm_with_tools = llm.bind_tools(tools)    # Invoca o modelo com as mensagens
-    response = llm_with_tools.invoke(messages)
-    
-    # Verifica se o modelo quer usar ferramentas e exibe informações detalhadas
-    if hasattr(response, 'tool_calls') and response.tool_calls:
-        print(f"🔧 FERRAMENTAS CHAMADAS: {len(response.tool_calls)} ferramenta(s)")
-        for i, tool_call in enumerate(response.tool_calls, 1):
-            tool_name = tool_call['name']
-            tool_args = tool_call.get('args', {})
-            print(f"   {i}. 📋 {tool_name}")
-            if tool_args:
-                for key, value in tool_args.items():
-                    print(f"      - {key}: {value}")
-        print("➡️ DIRECIONANDO para execução das ferramentas...")
-    else:
-        print("🏁 FINALIZANDO resposta (sem ferramentas necessárias)")
-    
-    # Atualiza as mensagens
-    updated_messages = messages + [response]
-    
-    return {"messages": updated_messages}
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+
+def create_llm(model: str = "gpt-4o-mini", temperature: float = 0.1, api_key: str = ""):
+    """Cria o modelo de linguagem já com as ferramentas vinculadas."""
+    llm = ChatOpenAI(temperature=temperature, model=model, api_key=api_key)
+    return llm.bind_tools(TOOLS)
+
+@lru_cache(maxsize=1)
+def default_llm():
+    """Modelo padrão do agente, criado na primeira chamada e reutilizado depois."""
+    return create_llm()
+
+@lru_cache(maxsize=1)
+def default_summarizer():
+    """Modelo sem ferramentas usado para resumir o histórico antigo."""
+    return ChatOpenAI(temperature=0, model="gpt-4o-mini", api_key="")
+
+def create_chatbot(llm=None):
+    """
+    Cria o nó chatbot. Sem llm, usa default_llm(); testes e benchmarks passam
+    qualquer Runnable que receba a lista de mensagens e devolva um AIMessage
+    """
+    def chatbot(state: AgentState) -> AgentState:
+        """Nó principal do chatbot que processa mensagens e decide se precisa usar ferramentas."""
+        # Prompt do sistema e resumo vão só na chamada ao modelo, não no histórico salvo
+        messages = prompt_messages(SYSTEM_MESSAGE, state)
+        response = (llm or default_llm()).invoke(messages)
+        
+        # Verifica se o modelo quer usar ferramentas e exibe informações detalhadas
+        if hasattr(response, 'tool_calls') and response.tool_calls:
+            print(f"🔧 FERRAMENTAS CHAMADAS: {len(response.tool_calls)} ferramenta(s)")
+            for i, tool_call in enumerate(response.tool_calls, 1):
+                tool_name = tool_call['name']
+                tool_args = tool_call.get('args', {})
+                print(f"   {i}. 📋 {tool_name}")
+                if tool_args:
+                    for key, value in tool_args.items():
+                        print(f"      - {key}: {value}")
+            print("➡️ DIRECIONANDO para execução das ferramentas...")
+        else:
+            print("🏁 FINALIZANDO resposta (sem ferramentas necessárias)")
+        
+        # add_messages acrescenta a resposta ao histórico da thread
+        return {"messages": [response]}
+
+    return chatbot
 
 def should_continue(state: MessagesState) -> str:
     """Decide se deve continuar para as ferramentas ou finalizar."""
@@ -528,29 +685,18 @@ def should_continue(state: MessagesState) -> str:
     return END
 
 # Cria o grafo
-def create_agent_graph() -> StateGraph:
-    """Cria o grafo do agente LangGraph."""
-    workflow = StateGraph(MessagesState)
-    
-    # Cria as ferramentas disponíveis
-    tools = [
-        search_address, 
-        get_specialties, 
-        search_establishments, 
-        get_establishment_details,
-        list_available_doctors,
-        schedule_appointment,
-        list_patient_appointments,
-        cancel_patient_appointment
-    ]
-    tool_node = ToolNode(tools)
+def create_agent_graph(llm=None, summarizer=None) -> StateGraph:
+    """Cria o grafo do agente LangGraph (llm e summarizer opcionais, para testes)."""
+    workflow = StateGraph(AgentState)
     
     # Adiciona nós
-    workflow.add_node("chatbot", chatbot)
-    workflow.add_node("tools", tool_node)
+    workflow.add_node("history", create_history_node((lambda: summarizer) if summarizer else default_summarizer))
+    workflow.add_node("chatbot", create_chatbot(llm))
+    workflow.add_node("tools", run_tools)
     
-    # Define o ponto de entrada
-    workflow.set_entry_point("chatbot")
+    # Cada turno começa ajustando o histórico ao orçamento de tokens
+    workflow.set_entry_point("history")
+    workflow.add_edge("history", "chatbot")
     
     # Adiciona arestas condicionais
     workflow.add_conditional_edges(
@@ -567,11 +713,41 @@ def create_agent_graph() -> StateGraph:
     
     return workflow
 
-# Inicializa o agente com MemorySaver
-memory = MemorySaver()
+# Inicializa o agente com o checkpointer configurado (CHECKPOINTER_BACKEND)
+memory = create_checkpointer()
 agent_graph = create_agent_graph()
 agent = agent_graph.compile(checkpointer=memory)
 
+def reset_thread(thread_id: str) -> None:
+    """Apaga o histórico da thread (a próxima mensagem começa uma conversa nova)."""
+    memory.delete_thread(thread_id)
+
+def record_turn(user_input: str, response: str, thread_id: str = "02") -> None:
+    """Grava no histórico um turno respondido fora do grafo (atalho sem LLM)."""
+    config = {"configurable": {"thread_id": thread_id}}
+    agent.update_state(
+        config,
+        {"messages": [HumanMessage(content=user_input), AIMessage(content=response)]},
+        as_node="chatbot"
+    )
+
+def count_llm_calls(messages: List[Any]) -> int:
+    """Chamadas ao modelo no último turno: AIMessages depois da última mensagem do usuário."""
+    calls = 0
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        calls += isinstance(msg, AIMessage)
+    return calls
+
+# Atalhos sem LLM (lista de especialidades e agendamentos); cancelar fica com o agente
+fast_path_router = FastPathRouter(
+    specialties=specialty_registry.as_json,
+    list_appointments=lambda email: list_patient_appointments.invoke({"patient_email": email}),
+    record=record_turn,
+    max_emails=CONVERSATION_MAX_THREADS
+)
+
 def ask_agent(user_input: str, thread_id: str = "02") -> Dict[str, Any]:
     """Função para interagir com o agente."""
     
@@ -603,5 +779,40 @@ def ask_agent(user_input: str, thread_id: str = "02") -> Dict[str, Any]:
     
     return {
         "response": response_content,
-        "thread_id": thread_id
-    }
\ No newline at end of file
+        "thread_id": thread_id,
+        "llm_calls": count_llm_calls(final_messages)
+    }
+
+def ask_agent_stream(user_input: str, thread_id: str = "02") -> Iterator[Dict[str, Any]]:
+    """
+    Versão de ask_agent que gera eventos enquanto o grafo roda:
+    {"type": "tool", "name"} quando o modelo chama uma ferramenta,
+    {"type": "token", "content", "message_id"} para cada pedaço de texto do modelo
+    e {"type": "done", "response", "thread_id", "llm_calls"} no fim, com a resposta final
+    """
+    print(f"\n🤖 INICIANDO PROCESSAMENTO (streaming): '{user_input}'")
+    print(f"📱 Thread ID: {thread_id}")
+    
+    config = {"configurable": {"thread_id": thread_id}}
+    user_message = HumanMessage(content=user_input)
+    response_content = ""
+    llm_calls = 0
+    
+    # "messages" traz os tokens do modelo; "updates" as mensagens completas de cada nó
+    for mode, payload in agent.stream({"messages": [user_message]}, config=config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "chatbot" and isinstance(chunk, AIMessage) and isinstance(chunk.content, str) and chunk.content:
+                yield {"type": "token", "content": chunk.content, "message_id": chunk.id}
+        elif payload and "chatbot" in payload:
+            llm_calls += 1
+            for msg in payload["chatbot"]["messages"]:
+                for tool_call in msg.tool_calls:
+                    yield {"type": "tool", "name": tool_call["name"]}
+                if not msg.tool_calls or msg.content:
+                    response_content = msg.content
+    
+    print(f"✅ PROCESSAMENTO CONCLUÍDO - Resposta pronta!")
+    print("-" * 50)
+    
+    yield {"type": "done", "response": response_content, "thread_id": thread_id, "llm_calls": llm_calls}
@@ -1,82 +1,236 @@
-import requests
-from typing import List, Dict, Optional, Any
+"""
+Clientes HTTP das APIs usadas pelo agente: backend C# (busca) e API Python
+(agendamento, lote de detalhes e busca já formatada no servidor)
+FindDoctorApiClient usa um httpx.Client com pool de conexões keep-alive, e
+AsyncFindDoctorApiClient oferece os mesmos métodos sobre httpx.AsyncClient
+(com await). Os dois têm timeouts de conexão/leitura e a mesma política de
+novas tentativas: GETs são repetidos após erro de conexão, timeout ou
+502/503/504; os demais métodos só quando a conexão nem chegou a ser aberta
+Erros: respostas de erro da API levantam FindDoctorApiError (subclasse de
+httpx.HTTPStatusError) e falhas de transporte esgotadas as tentativas
+levantam httpx.TransportError; `except httpx.HTTPError` cobre as duas
+"""
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config import (
+    API_CONNECT_TIMEOUT,
+    API_MAX_CONNECTIONS,
+    API_MAX_KEEPALIVE_CONNECTIONS,
+    API_READ_TIMEOUT,
+    API_RETRIES,
+    API_RETRY_BACKOFF,
+    API_RETRY_BACKOFF_MAX,
+)
+
+RETRY_STATUSES = {502, 503, 504}
+
+# Falhas em que a requisição não chegou ao servidor: seguro repetir qualquer método
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class FindDoctorApiError(httpx.HTTPStatusError):
+    """Resposta de erro da API, com o status e o "detail" devolvido por ela"""
+
+    def __init__(self, detail: str, response: httpx.Response):
+        self.status_code = response.status_code
+        self.detail = detail
+        self.url = str(response.url)
+        super().__init__(f"{self.status_code}: {detail}", request=response.request, response=response)
+
+
+def _should_retry(method: str, error: Optional[Exception] = None, status_code: Optional[int] = None) -> bool:
+    if error is not None:
+        return method == "GET" or isinstance(error, CONNECT_ERRORS)
+    return method == "GET" and status_code in RETRY_STATUSES
+
+
+def _backoff(attempt: int) -> float:
+    """Espera antes da próxima tentativa: exponencial com jitter total"""
+    return random.uniform(0, min(API_RETRY_BACKOFF_MAX, API_RETRY_BACKOFF * 2 ** attempt))
+
+
+def _result(response: httpx.Response) -> Any:
+    """JSON da resposta, ou FindDoctorApiError com a mensagem da API"""
+    if response.is_error:
+        try:
+            detail = response.json()
+            if isinstance(detail, dict):
+                detail = detail.get("detail") or detail.get("message") or detail
+        except ValueError:
+            detail = response.text or response.reason_phrase
+        raise FindDoctorApiError(str(detail), response)
+    if not response.content:
+        return None
+    return response.json()
+
+
+class _FindDoctorApi(ABC):
+    """
+    Métodos das duas APIs. Cada método monta a requisição e chama _send, que
+    as subclasses implementam de forma síncrona ou assíncrona
+    """
 
-class FindDoctorApiClient:
-    """Cliente para interação com a API FindDoctor para busca de profissionais de saúde"""
-    
     def __init__(self, base_url: str = "http://localhost:5210", appointment_api_url: str = "http://localhost:8000"):
         self.base_url = base_url.rstrip("/")
         self.appointment_api_url = appointment_api_url.rstrip("/")
-        
+        self.timeout = httpx.Timeout(API_READ_TIMEOUT, connect=API_CONNECT_TIMEOUT)
+        self.limits = httpx.Limits(
+            max_connections=API_MAX_CONNECTIONS,
+            max_keepalive_connections=API_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=30.0
+        )
+
+    @abstractmethod
+    def _send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None
+    ):
+        """Envia a requisição e devolve o JSON (ou um awaitable dele, no cliente assíncrono)"""
+
     def search_address(self, address_text: str) -> List[Dict[str, Any]]:
         """Busca por um endereço e retorna suas coordenadas geográficas"""
         endpoint = f"{self.base_url}/api/Address/buscar"
         params = {"endereco": address_text}
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("GET", endpoint, params=params)
+
     def search_establishments(
-        self, 
-        latitude: float, 
-        longitude: float, 
-        radius_km: float = 5, 
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 5,
         specialty_id: Optional[str] = None,
         doctor_name: Optional[str] = None,
-        insurance_id: Optional[int] = None
+        insurance_id: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        max_professionals: Optional[int] = None,
+        summary: bool = False
     ) -> List[Dict[str, Any]]:
-        """Busca estabelecimentos de saúde próximos a uma localização"""
+        """
+        Busca estabelecimentos de saúde próximos a uma localização
+
+        fields mantém só esses campos de cada estabelecimento, max_professionals
+        limita os profissionais por estabelecimento e summary devolve o resumo
+        (nome, CNES, distância, telefone, endereço e só os profissionais da
+        especialidade/nome buscados), ordenado pela distância. Com qualquer um
+        deles a busca vai pela API Python (/api/csharp/establishments/search),
+        que formata a resposta no servidor; sem eles, direto ao C#
+        """
+        if summary or fields or max_professionals is not None:
+            if insurance_id:
+                raise ValueError("A busca formatada (summary/fields/max_professionals) não filtra por convênio")
+            params = {
+                "latitude": latitude,
+                "longitude": longitude,
+                "radius_km": radius_km,
+                "summary": summary
+            }
+            if specialty_id:
+                params["specialty_id"] = specialty_id
+            if doctor_name:
+                params["doctor_name"] = doctor_name
+            if fields:
+                params["fields"] = ",".join(fields)
+            if max_professionals is not None:
+                params["max_professionals"] = max_professionals
+            return self._send("GET", f"{self.appointment_api_url}/api/csharp/establishments/search", params=params)
+
         endpoint = f"{self.base_url}/api/Estabelecimento/proximos"
         params = {
             "latitude": latitude,
             "longitude": longitude,
             "raioKm": radius_km
         }
-        
+
         if specialty_id:
             params["especialidadeId"] = specialty_id
         if doctor_name:
             params["nomeMedico"] = doctor_name
         if insurance_id:
             params["convenioId"] = insurance_id
-            
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-    
+
+        return self._send("GET", endpoint, params=params)
+
     def get_establishment_details(self, cnes_code: str) -> Dict[str, Any]:
         """Obtém informações detalhadas sobre um estabelecimento específico"""
         endpoint = f"{self.base_url}/api/Estabelecimento/{cnes_code}"
-        response = requests.get(endpoint)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("GET", endpoint)
+
+    def get_establishments_details(self, cnes_codes: List[str]) -> Dict[str, Any]:
+        """
+        Detalhes de vários estabelecimentos em uma requisição (lote da API de agendamento)
+        Retorna {"results": {cnes: detalhes}, "errors": {cnes: mensagem}}
+        """
+        endpoint = f"{self.appointment_api_url}/api/csharp/establishments/batch"
+        return self._send("POST", endpoint, json={"cnes_codes": cnes_codes})
+
     def get_all_specialties(self) -> List[Dict[str, Any]]:
         """Obtém todas as especialidades médicas disponíveis"""
         endpoint = f"{self.base_url}/api/Especialidade"
-        response = requests.get(endpoint)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("GET", endpoint)
+
     # ========== MÉTODOS DE AGENDAMENTO ==========
-    
+
     def list_doctors(self, establishment_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Lista todos os médicos disponíveis para agendamento"""
         endpoint = f"{self.appointment_api_url}/api/doctors/"
         params = {}
         if establishment_id:
             params["establishment_id"] = establishment_id
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("GET", endpoint, params=params)
+
     def get_doctor(self, doctor_id: int) -> Dict[str, Any]:
         """Obtém informações de um médico específico"""
         endpoint = f"{self.appointment_api_url}/api/doctors/{doctor_id}"
-        response = requests.get(endpoint)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("GET", endpoint)
+
+    def get_doctor_slots(
+        self,
+        doctor_id: int,
+        date_from: Optional[str] = None,  # formato: "YYYY-MM-DD"
+        date_to: Optional[str] = None,  # formato: "YYYY-MM-DD"
+        duration: Optional[int] = None  # minutos
+    ) -> Dict[str, Any]:
+        """Lista os horários livres de um médico (disponibilidade menos agendamentos)"""
+        endpoint = f"{self.appointment_api_url}/api/doctors/{doctor_id}/slots"
+        params = {}
+        if date_from:
+            params["from"] = date_from
+        if date_to:
+            params["to"] = date_to
+        if duration:
+            params["duration"] = duration
+        return self._send("GET", endpoint, params=params)
+
+    def find_earliest_slots(
+        self,
+        specialty: Optional[str] = None,
+        establishment_id: Optional[str] = None,
+        date_from: Optional[str] = None,  # formato: "YYYY-MM-DD"
+        date_to: Optional[str] = None,  # formato: "YYYY-MM-DD"
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        """Primeiros horários livres entre todos os médicos da especialidade/estabelecimento"""
+        endpoint = f"{self.appointment_api_url}/api/doctors/slots/earliest"
+        params = {"limit": limit}
+        if specialty:
+            params["specialty"] = specialty
+        if establishment_id:
+            params["establishment_id"] = establishment_id
+        if date_from:
+            params["from"] = date_from
+        if date_to:
+            params["to"] = date_to
+        return self._send("GET", endpoint, params=params)
+
     def create_appointment(
         self,
         doctor_id: int,
@@ -99,11 +253,9 @@ class FindDoctorApiClient:
         }
         if notes:
             payload["notes"] = notes
-        
-        response = requests.post(endpoint, json=payload)
-        response.raise_for_status()
-        return response.json()
-    
+
+        return self._send("POST", endpoint, json=payload)
+
     def list_appointments(
         self,
         doctor_id: Optional[int] = None,
@@ -122,18 +274,14 @@ class FindDoctorApiClient:
             params["status"] = status
         if appointment_date:
             params["appointment_date"] = appointment_date
-        
-        response = requests.get(endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-    
+
+        return self._send("GET", endpoint, params=params)
+
     def get_appointment(self, appointment_id: int) -> Dict[str, Any]:
         """Obtém detalhes de um agendamento específico"""
         endpoint = f"{self.appointment_api_url}/api/appointments/{appointment_id}"
-        response = requests.get(endpoint)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("GET", endpoint)
+
     def update_appointment_status(
         self,
         appointment_id: int,
@@ -142,10 +290,68 @@ class FindDoctorApiClient:
         """Atualiza o status de um agendamento"""
         endpoint = f"{self.appointment_api_url}/api/appointments/{appointment_id}"
         payload = {"status": status}
-        response = requests.patch(endpoint, json=payload)
-        response.raise_for_status()
-        return response.json()
-    
+        return self._send("PATCH", endpoint, json=payload)
+
     def cancel_appointment(self, appointment_id: int) -> None:
         """Cancela um agendamento (altera status para cancelled)"""
-        return self.update_appointment_status(appointment_id, "cancelled")
\ No newline at end of file
+        return self.update_appointment_status(appointment_id, "cancelled")
+
+
+class FindDoctorApiClient(_FindDoctorApi):
+    """Cliente síncrono com pool de conexões (seguro para uso entre threads)"""
+
+    def __init__(self, base_url: str = "http://localhost:5210", appointment_api_url: str = "http://localhost:8000"):
+        super().__init__(base_url, appointment_api_url)
+        self.http = httpx.Client(timeout=self.timeout, limits=self.limits)
+
+    def _send(self, method, url, params=None, json=None):
+        for attempt in range(API_RETRIES + 1):
+            last_attempt = attempt == API_RETRIES
+            try:
+                response = self.http.request(method, url, params=params, json=json)
+            except httpx.TransportError as e:
+                if last_attempt or not _should_retry(method, error=e):
+                    raise
+            else:
+                if last_attempt or not _should_retry(method, status_code=response.status_code):
+                    return _result(response)
+            time.sleep(_backoff(attempt))
+
+    def close(self):
+        self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncFindDoctorApiClient(_FindDoctorApi):
+    """Mesmos métodos de FindDoctorApiClient, para uso com await"""
+
+    def __init__(self, base_url: str = "http://localhost:5210", appointment_api_url: str = "http://localhost:8000"):
+        super().__init__(base_url, appointment_api_url)
+        self.http = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+
+    async def _send(self, method, url, params=None, json=None):
+        for attempt in range(API_RETRIES + 1):
+            last_attempt = attempt == API_RETRIES
+            try:
+                response = await self.http.request(method, url, params=params, json=json)
+            except httpx.TransportError as e:
+                if last_attempt or not _should_retry(method, error=e):
+                    raise
+            else:
+                if last_attempt or not _should_retry(method, status_code=response.status_code):
+                    return _result(response)
+            await asyncio.sleep(_backoff(attempt))
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -129,6 +129,37 @@ def format_establishment_details(details_json: str) -> str:
     except Exception as e:
         return f"❌ Erro ao formatar detalhes: {str(e)}"
 
+APPOINTMENT_STATUS = {
+    "scheduled": "🟢 Agendada",
+    "confirmed": "✅ Confirmada",
+    "cancelled": "❌ Cancelada",
+    "completed": "✔️ Realizada"
+}
+
+def format_appointments_results(appointments_json: str) -> str:
+    """Formata agendamentos do paciente (saída de list_patient_appointments)."""
+    try:
+        appointments = json.loads(appointments_json)
+        if not appointments:
+            return "📋 Você não possui agendamentos no momento."
+        
+        message = "📋 **Seus agendamentos:**\n\n"
+        for apt in appointments:
+            status = apt.get('status') or ''
+            message += f"**#{apt.get('agendamento_id')}** - {apt.get('data', '')} às {apt.get('horario', '')}\n"
+            message += f"👨‍⚕️ {apt.get('medico', 'N/A')}"
+            if apt.get('especialidade') and apt['especialidade'] != 'N/A':
+                message += f" - {apt['especialidade']}"
+            message += "\n"
+            if apt.get('estabelecimento') and apt['estabelecimento'] != 'N/A':
+                message += f"🏥 {apt['estabelecimento']}\n"
+            message += f"{APPOINTMENT_STATUS.get(status, status)}\n\n"
+        
+        message += "💡 Para cancelar, informe o número do agendamento"
+        return message
+    except Exception as e:
+        return f"❌ Erro ao formatar agendamentos: {str(e)}"
+
 def split_long_message(message: str, max_length: int = 4096) -> List[str]:
     """Divide mensagens longas em múltiplas mensagens."""
     if len(message) <= max_length:
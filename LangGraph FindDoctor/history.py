@@ -0,0 +1,176 @@
+"""
+Política de histórico das conversas do agente
+No início de cada turno o nó de histórico troca as saídas longas de
+ferramentas dos turnos anteriores por um resumo curto e, quando o histórico
+passa de max_tokens, junta as mensagens mais antigas ao resumo corrente da
+conversa e as remove do estado, mantendo só a janela recente (keep_tokens).
+Assim o prompt de cada turno fica com tamanho aproximadamente constante.
+Tokens são estimados (~4 caracteres por token), sem chamar o modelo
+"""
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+from config import (
+    HISTORY_KEEP_TOKENS,
+    HISTORY_MAX_TOKENS,
+    HISTORY_SUMMARY_MAX_CHARS,
+    HISTORY_TOOL_OUTPUT_MAX_CHARS,
+)
+
+SUMMARY_PROMPT = """Você mantém o resumo de uma conversa entre um usuário e um assistente de saúde.
+Atualize o resumo atual com as novas mensagens, em português, em até 10 linhas.
+Preserve dados que o assistente ainda pode precisar: nome, email e telefone do
+paciente, endereço/coordenadas buscados, especialidade, códigos CNES, IDs de
+médicos e de agendamentos, datas e horários combinados e o que ficou pendente.
+Responda só com o resumo."""
+
+# Campos usados para identificar itens no resumo de saídas de ferramentas
+_LABEL_FIELDS = ("codigoCNES", "id", "medico_id", "nome", "name", "especialidade", "data", "horario", "status")
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    return count_tokens_approximately(messages)
+
+
+def _label(item: Any) -> str:
+    if not isinstance(item, dict):
+        return str(item)[:60]
+    return " ".join(str(item[k]) for k in _LABEL_FIELDS if item.get(k) not in (None, ""))[:80]
+
+
+def summarize_tool_output(content: str, max_chars: int = HISTORY_TOOL_OUTPUT_MAX_CHARS) -> str:
+    """Resumo curto da saída de uma ferramenta: contagem e identificação dos primeiros itens"""
+    if len(content) <= max_chars:
+        return content
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content[:max_chars] + "… (saída resumida)"
+    if isinstance(data, dict) and isinstance(data.get("results"), dict):
+        data = list(data["results"].values())  # detalhes em lote
+    if isinstance(data, list):
+        labels = "; ".join(label for label in (_label(item) for item in data[:5]) if label)
+        text = f"[{len(data)} resultado(s): {labels}] (saída resumida)"
+    elif isinstance(data, dict):
+        text = f"[{_label(data) or 'objeto'}; campos: {', '.join(list(data)[:10])}] (saída resumida)"
+    else:
+        text = str(data)
+    return text[:max_chars]
+
+
+def compact_tool_outputs(messages: List[BaseMessage], max_chars: int = HISTORY_TOOL_OUTPUT_MAX_CHARS) -> List[ToolMessage]:
+    """
+    Versões resumidas das saídas longas de ferramentas dos turnos anteriores
+    (as do turno atual ficam inteiras). Mantêm o id: add_messages substitui
+    """
+    last_turn = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    compacted = []
+    for message in messages[:last_turn]:
+        if isinstance(message, ToolMessage) and isinstance(message.content, str) and len(message.content) > max_chars:
+            compacted.append(ToolMessage(
+                content=summarize_tool_output(message.content, max_chars),
+                id=message.id,
+                name=message.name,
+                tool_call_id=message.tool_call_id,
+                status=message.status,
+                response_metadata={**message.response_metadata, "compacted": True}
+            ))
+    return compacted
+
+
+def split_history(messages: List[BaseMessage], keep_tokens: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Separa (antigas, recentes). O corte é sempre no início de um turno (mensagem
+    do usuário), para não separar chamadas de ferramenta das respostas; o
+    último turno fica sempre na janela, mesmo acima de keep_tokens
+    """
+    turn_starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not turn_starts:
+        return [], messages
+    cut = turn_starts[-1]
+    for start in reversed(turn_starts[:-1]):
+        if estimate_tokens(messages[start:]) > keep_tokens:
+            break
+        cut = start
+    return messages[:cut], messages[cut:]
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"Usuário: {message.content}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Ferramenta {message.name}: {summarize_tool_output(str(message.content), 300)}")
+        elif isinstance(message, AIMessage):
+            if message.content:
+                lines.append(f"Assistente: {message.content}")
+            for tool_call in message.tool_calls:
+                lines.append(f"Assistente chamou {tool_call['name']}({json.dumps(tool_call['args'], ensure_ascii=False)})")
+    return "\n".join(lines)
+
+
+def update_summary(summarizer, summary: str, messages: List[BaseMessage]) -> str:
+    """Novo resumo corrente: o modelo junta as mensagens ao resumo atual"""
+    transcript = _transcript(messages)
+    try:
+        response = summarizer.invoke([
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=f"Resumo atual:\n{summary or '(vazio)'}\n\nNovas mensagens:\n{transcript}")
+        ])
+        updated = str(response.content).strip()
+    except Exception as e:
+        # Sem o modelo, guarda o trecho como está (só o que couber)
+        print(f"   ⚠️ Falha ao resumir o histórico ({str(e)}), usando trecho literal")
+        updated = f"{summary}\n{transcript}".strip()
+    return updated[-HISTORY_SUMMARY_MAX_CHARS:]
+
+
+def create_history_node(
+    summarizer: Callable[[], Any],
+    max_tokens: int = HISTORY_MAX_TOKENS,
+    keep_tokens: int = HISTORY_KEEP_TOKENS,
+    tool_output_max_chars: int = HISTORY_TOOL_OUTPUT_MAX_CHARS
+):
+    """
+    Cria o nó de histórico. summarizer devolve o modelo usado para resumir
+    (chamado só quando é preciso resumir, para não criar o modelo à toa)
+    """
+    def manage_history(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Compacta saídas antigas de ferramentas e resume o que passou da janela."""
+        compacted = compact_tool_outputs(state["messages"], tool_output_max_chars)
+        by_id = {m.id: m for m in compacted}
+        messages = [by_id.get(m.id, m) for m in state["messages"]]
+
+        tokens = estimate_tokens(messages)
+        old, recent = split_history(messages, keep_tokens) if tokens > max_tokens else ([], messages)
+        if not old:
+            return {"messages": compacted} if compacted else {}
+
+        summary = update_summary(summarizer(), state.get("summary", ""), old)
+        removed = {m.id for m in old}
+        print(f"🗜️ HISTÓRICO: {len(old)} mensagem(ns) resumida(s), ~{tokens} -> ~{estimate_tokens(recent)} tokens")
+        return {
+            "messages": [m for m in compacted if m.id not in removed] + [RemoveMessage(id=m.id) for m in old],
+            "summary": summary
+        }
+
+    return manage_history
+
+
+def prompt_messages(system_message: SystemMessage, state: Dict[str, Any]) -> List[BaseMessage]:
+    """Mensagens enviadas ao modelo: prompt do sistema, resumo corrente e janela recente"""
+    messages = [system_message]
+    if state.get("summary"):
+        messages.append(SystemMessage(content=f"Resumo da conversa até aqui:\n{state['summary']}"))
+    return messages + list(state["messages"])
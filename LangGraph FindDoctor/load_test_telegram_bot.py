@@ -0,0 +1,244 @@
+"""
+Teste de carga do bot Telegram com latência de agente simulada
+Sobe uma API do Telegram falsa (aiohttp) numa porta livre, aponta o
+AsyncTeleBot para ela e injeta centenas de conversas simultâneas pelo mesmo
+caminho dos updates reais (process_new_updates). O agente é trocado por uma
+função que dorme a latência configurada. Confere: mensagens do mesmo usuário
+nunca rodam ao mesmo tempo e saem na ordem, o limite de turnos simultâneos é
+respeitado e o excesso por usuário é recusado com aviso. Com --stream o
+agente gera eventos aos poucos e também são medidos o tempo até a primeira
+edição da mensagem de processamento e o intervalo mínimo entre edições
+
+    python load_test_telegram_bot.py --users 300 --messages 1 --latency 1.0
+    python load_test_telegram_bot.py --users 100 --latency 3.0 --stream
+"""
+import argparse
+import asyncio
+import logging
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from aiohttp import web
+from telebot import asyncio_helper, types
+
+from config import BOT_MAX_CONCURRENT_TURNS, BUSY_MESSAGE, PROCESSING_MESSAGE, STREAM_EDIT_INTERVAL_SECONDS
+from telegram_bot import FindDoctorTelegramBot
+
+TOKEN = "123456:LOAD-TEST"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeTelegramApi:
+    """Responde os métodos da Bot API usados pelo bot e guarda o horário das respostas por chat"""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.replies = defaultdict(list)  # chat_id -> [(texto, instante)]
+        self.first_edits = defaultdict(list)  # chat_id -> instante da 1ª edição de cada resposta
+        self.edits = defaultdict(list)  # chat_id -> instantes de todas as edições
+        self._awaiting_edit = set()
+        self.busy = 0
+        self.next_id = 1000
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        if method not in ("sendMessage", "editMessageText"):
+            return web.json_response({"ok": True, "result": True})
+
+        data = await request.post()
+        text = data["text"]
+        chat_id = int(data["chat_id"])
+        now = time.perf_counter()
+        if method == "editMessageText":
+            self.edits[chat_id].append(now)
+            if chat_id in self._awaiting_edit:
+                self._awaiting_edit.discard(chat_id)
+                self.first_edits[chat_id].append(now)
+            if data.get("parse_mode") == "Markdown":  # edição final com a resposta
+                self.replies[chat_id].append((text, now))
+        elif text == BUSY_MESSAGE:
+            self.busy += 1
+        elif text == PROCESSING_MESSAGE:
+            self._awaiting_edit.add(chat_id)
+        else:
+            self.replies[chat_id].append((text, now))
+        self.next_id += 1
+        return web.json_response({"ok": True, "result": {
+            "message_id": self.next_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": text
+        }})
+
+
+class SlowAgent:
+    """Agente simulado: dorme a latência e registra concorrência por thread_id"""
+
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.running = defaultdict(int)
+        self.active = self.max_active = 0
+        self.overlaps = 0
+        self.received = defaultdict(list)
+
+    def _start(self, user_message: str, thread_id: str) -> float:
+        with self.lock:
+            self.running[thread_id] += 1
+            self.overlaps += self.running[thread_id] > 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.received[thread_id].append(user_message)
+        return self.latency * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _end(self, thread_id: str) -> None:
+        with self.lock:
+            self.running[thread_id] -= 1
+            self.active -= 1
+
+    def __call__(self, user_message: str, thread_id: str):
+        time.sleep(self._start(user_message, thread_id))
+        self._end(thread_id)
+        return {"response": f"Resposta para {user_message}", "thread_id": thread_id}
+
+    def stream(self, user_message: str, thread_id: str):
+        """Como ask_agent_stream: modelo decide (30%), ferramenta (30%), tokens da resposta (40%)"""
+        latency = self._start(user_message, thread_id)
+        try:
+            time.sleep(latency * 0.3)
+            yield {"type": "tool", "name": "search_establishments"}
+            time.sleep(latency * 0.3)
+            response = f"Resposta para {user_message}"
+            words = response.split(" ")
+            for i, word in enumerate(words):
+                time.sleep(latency * 0.4 / len(words))
+                yield {"type": "token", "content": word if i == 0 else " " + word, "message_id": "final"}
+        finally:
+            self._end(thread_id)
+        yield {"type": "done", "response": response, "thread_id": thread_id}
+
+
+def make_update(update_id: int, user_id: int, text: str) -> types.Update:
+    return types.Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Usuario{user_id}"},
+            "text": text
+        }
+    })
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def main(args) -> int:
+    api = FakeTelegramApi()
+    logging.getLogger("telegram_bot").setLevel(logging.ERROR)  # sem log por mensagem
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", api.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    asyncio_helper.API_URL = f"http://127.0.0.1:{port}/bot{{0}}/{{1}}"
+
+    agent = SlowAgent(args.latency, args.jitter)
+    bot = FindDoctorTelegramBot(
+        token=TOKEN, agent=agent, reset=lambda thread_id: None,
+        agent_stream=agent.stream if args.stream else None
+    )
+
+    # Rajada: cada usuário manda suas mensagens de uma vez, todos ao mesmo tempo
+    users = [100000 + i for i in range(args.users)]
+    sent = {}
+    updates = []
+    for n in range(args.messages):
+        for user_id in users:
+            text = f"u{user_id} m{n}"
+            updates.append(make_update(len(updates) + 1, user_id, text))
+    random.shuffle(updates)  # chegada intercalada entre usuários, em ordem por usuário
+    updates.sort(key=lambda u: int(u.message.text.split(" m")[1]))
+
+    started = time.perf_counter()
+    for update in updates:
+        sent[update.message.text] = time.perf_counter()
+    await bot.bot.process_new_updates(updates)
+    await asyncio.sleep(0.1)  # handlers rodam como tasks: deixa todos enfileirarem
+    await bot.dispatcher.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = []
+    first_edit_latencies = []
+    min_edit_gap = float("inf")
+    out_of_order = 0
+    for user_id in users:
+        texts = [text for text, _ in api.replies[user_id]]
+        received = agent.received[str(user_id)]
+        expected = [f"Resposta para {m}" for m in received]
+        out_of_order += texts != expected
+        for text, at in api.replies[user_id]:
+            latencies.append(at - sent[text.replace("Resposta para ", "")])
+        for text, at in zip(received, api.first_edits[user_id]):
+            first_edit_latencies.append(at - sent[text])
+        edits = api.edits[user_id]
+        min_edit_gap = min([min_edit_gap] + [b - a for a, b in zip(edits, edits[1:])])
+
+    stats = bot.dispatcher.stats()
+    answered = len(latencies)
+    # Rajada chega antes de qualquer turno terminar: aceita até os limites por usuário e total
+    accepted_expected = min(args.users * min(args.messages, bot.dispatcher.max_pending_per_user), bot.dispatcher.max_pending)
+    print(f"Usuários: {args.users} x {args.messages} mensagens, latência do agente ~{args.latency:.2f} s")
+    print(f"Turnos simultâneos permitidos: {BOT_MAX_CONCURRENT_TURNS}")
+    print(f"Respondidas: {answered}  recusadas (fila cheia): {api.busy}  tempo total: {elapsed:.1f} s")
+    print(f"Vazão: {answered / elapsed:.1f} respostas/s (sequencial seria {1 / args.latency:.1f}/s)")
+    print(f"Latência até a resposta: p50 {percentile(latencies, 0.5):.1f} s  p95 {percentile(latencies, 0.95):.1f} s  max {max(latencies, default=0):.1f} s")
+    if args.stream:
+        print(f"Até a primeira edição (progresso visível): p50 {percentile(first_edit_latencies, 0.5):.1f} s  p95 {percentile(first_edit_latencies, 0.95):.1f} s")
+        print(f"Menor intervalo entre edições no mesmo chat: {min_edit_gap:.2f} s (limite {STREAM_EDIT_INTERVAL_SECONDS:.2f} s)")
+    print(f"Máximo de turnos simultâneos observado: {agent.max_active}")
+    print(f"Dispatcher: {stats}")
+    print(f"Chamadas à API do Telegram: {dict(api.calls)}")
+
+    failures = []
+    if agent.overlaps:
+        failures.append(f"{agent.overlaps} turnos do mesmo usuário em paralelo")
+    if out_of_order:
+        failures.append(f"{out_of_order} usuários com respostas fora de ordem")
+    if agent.max_active > BOT_MAX_CONCURRENT_TURNS:
+        failures.append("limite de turnos simultâneos excedido")
+    if answered + api.busy != len(updates) or answered != accepted_expected:
+        failures.append(f"{answered} respondidas + {api.busy} recusadas para {len(updates)} mensagens")
+    if args.stream and min_edit_gap < STREAM_EDIT_INTERVAL_SECONDS * 0.95:
+        failures.append("edições mais frequentes que o limite por chat")
+    print("\n" + ("❌ " + "; ".join(failures) if failures else "✅ serialização por usuário, ordem, limite e fila conferidos"))
+
+    await runner.cleanup()
+    await asyncio_helper.session_manager.session.close()
+    bot.executor.shutdown(wait=False)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--messages", type=int, default=1, help="mensagens por usuário na rajada")
+    parser.add_argument("--latency", type=float, default=1.0, help="segundos por turno do agente")
+    parser.add_argument("--jitter", type=float, default=0.3, help="variação relativa da latência")
+    parser.add_argument("--stream", action="store_true", help="usa o caminho de streaming (edições progressivas)")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args)))
@@ -0,0 +1,55 @@
+"""
+Mensagem do Telegram editada aos poucos enquanto o agente responde
+O Telegram limita as edições (~1 por segundo por chat), então update só
+edita se já passou interval desde a última edição; o texto intermediário
+que não chegou a ser mostrado é coberto pela edição final (finish)
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from telebot.async_telebot import AsyncTeleBot
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressiveMessage:
+    def __init__(self, bot: AsyncTeleBot, chat_id: int, message_id: int, interval: float, max_length: int = 4096):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.max_length = max_length
+        self.shown = ""
+        self.edits = 0
+        self._last_edit: Optional[float] = None
+
+    async def update(self, text: str) -> None:
+        """Mostra text se o intervalo desde a última edição já passou (senão ignora)"""
+        if text == self.shown or (self._last_edit is not None and time.monotonic() - self._last_edit < self.interval):
+            return
+        await self._edit(text)
+
+    async def finish(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        """Edição final (espera o intervalo se preciso); False se o Telegram recusar"""
+        if self._last_edit is not None:
+            wait = self.interval - (time.monotonic() - self._last_edit)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        if text == self.shown and parse_mode is None:
+            return True
+        return await self._edit(text, parse_mode)
+
+    async def _edit(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        if len(text) > self.max_length:
+            text = "…" + text[-(self.max_length - 1):]  # parcial longa: mostra o final
+        self._last_edit = time.monotonic()
+        try:
+            await self.bot.edit_message_text(text, self.chat_id, self.message_id, parse_mode=parse_mode)
+        except Exception as e:
+            logger.warning(f"Falha ao editar mensagem {self.message_id}: {e}")
+            return False
+        self.shown = text
+        self.edits += 1
+        return True
@@ -0,0 +1,68 @@
+"""
+Especialidades de medical_specialties.json em memória, para o agente
+O arquivo é lido na primeira consulta e indexado por id e por nome
+normalizado (sem acento, sem caixa); depois tudo é acesso a dicionário.
+O arquivo vem junto com o agente e não muda com ele rodando, então aqui não
+há o recarregamento por mtime do registro da API (FindDoctorPythonAPI), que
+é quem edita a lista em produção
+"""
+import json
+import unicodedata
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+
+def normalize_name(name: str) -> str:
+    """Remove acentos, caixa e espaços repetidos ("Médico  Cardiologista" -> "medico cardiologista")"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.casefold().split())
+
+
+class SpecialtyRegistry:
+    """Especialidades indexadas por id e por nome normalizado"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = Lock()
+        self._specialties: Optional[List[dict]] = None
+        self._json = "[]"
+        self._by_id: Dict[str, dict] = {}
+        self._by_name: Dict[str, dict] = {}
+
+    def _load(self) -> List[dict]:
+        if self._specialties is None:
+            with self._lock:
+                if self._specialties is None:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        specialties = json.load(f)
+                    self._by_id = {str(s["id"]): s for s in specialties}
+                    self._by_name = {normalize_name(s["nome"]): s for s in specialties}
+                    self._json = json.dumps(specialties, ensure_ascii=False)
+                    self._specialties = specialties
+        return self._specialties
+
+    def all(self) -> List[dict]:
+        """Lista completa (não modificar: é compartilhada entre as chamadas)"""
+        return self._load()
+
+    def as_json(self) -> str:
+        """Lista completa já serializada"""
+        self._load()
+        return self._json
+
+    def get(self, specialty_id: str) -> Optional[dict]:
+        self._load()
+        return self._by_id.get(str(specialty_id))
+
+    def find_by_name(self, name: str) -> Optional[dict]:
+        """Busca exata pelo nome, ignorando acentos, caixa e espaços"""
+        self._load()
+        return self._by_name.get(normalize_name(name))
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+# Instância global (arquivo ao lado deste módulo)
+specialty_registry = SpecialtyRegistry(Path(__file__).parent / "medical_specialties.json")
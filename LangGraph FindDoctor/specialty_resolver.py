@@ -0,0 +1,231 @@
+"""
+Resolução de nomes de especialidade digitados pelo usuário
+Os nomes do registro são normalizados uma vez (sem acento/caixa, sem o
+prefixo "MEDICO", sufixos flexionados reduzidos: cardiologista/cardiologia ->
+cardiolog) e indexados por token e por trigrama. Cada busca consulta só os
+candidatos que compartilham algum token ou trigrama com o termo e devolve os
+resultados ordenados com uma confiança entre 0 e 1
+"""
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from specialty_registry import SpecialtyRegistry, normalize_name, specialty_registry
+
+# Palavras ignoradas nos nomes e nas buscas
+STOPWORDS = {
+    "medico", "medica", "medicos", "medicas", "dr", "dra", "doutor", "doutora",
+    "especialista", "especialidade", "em", "de", "da", "do", "das", "dos",
+    "e", "o", "a", "os", "as", "para", "com", "no", "na", "um", "uma",
+}
+
+# Sufixos flexionados removidos (o mais longo primeiro), mantendo ao menos 4 letras
+SUFFIXES = ("istas", "ista", "icos", "icas", "ico", "ica", "ias", "ia", "os", "as", "es", "o", "a", "s")
+
+# Termos leigos / abreviações -> termo da especialidade
+SYNONYMS = {
+    "coracao": "cardiologista",
+    "cardio": "cardiologista",
+    "pele": "dermatologista",
+    "dermato": "dermatologista",
+    "crianca": "pediatra",
+    "criancas": "pediatra",
+    "infantil": "pediatra",
+    "bebe": "pediatra",
+    "olho": "oftalmologista",
+    "olhos": "oftalmologista",
+    "vista": "oftalmologista",
+    "oculista": "oftalmologista",
+    "osso": "ortopedista",
+    "ossos": "ortopedista",
+    "gineco": "ginecologista",
+    "mulher": "ginecologista",
+    "gravidez": "obstetra",
+    "gestante": "obstetra",
+    "obstetricia": "obstetra",
+    "otorrino": "otorrinolaringologista",
+    "ouvido": "otorrinolaringologista",
+    "garganta": "otorrinolaringologista",
+    "nariz": "otorrinolaringologista",
+    "rim": "nefrologista",
+    "rins": "nefrologista",
+    "cancer": "oncologista",
+    "pulmao": "pneumologista",
+    "estomago": "gastroenterologista",
+    "gastro": "gastroenterologista",
+    "idoso": "geriatra",
+    "idosos": "geriatra",
+    "endocrino": "endocrinologista",
+    "diabetes": "endocrinologista",
+    "tireoide": "endocrinologista",
+    "cerebro": "neurologista",
+    "neuro": "neurologista",
+    "alergia": "alergista",
+    "reumato": "reumatologista",
+    "sangue": "hematologista",
+    "urina": "urologista",
+    "prostata": "urologista",
+    "mama": "mastologista",
+    "anestesia": "anestesiologista",
+    "raio": "radiologia",
+}
+
+# Confiança mínima para considerar a especialidade resolvida
+MIN_CONFIDENCE = 0.5
+
+# Similaridade de trigramas a partir da qual dois tokens são o mesmo termo com erro
+# de digitação ("cardiolojista"); especialidades distintas ficam abaixo
+# (neurologista x nefrologista = 0.67)
+FUZZY_THRESHOLD = 0.7
+
+
+def stem(token: str) -> str:
+    """Reduz a forma flexionada ("cardiologista", "cardiologia" -> "cardiolog")"""
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados, sem stopwords, com sinônimos expandidos e reduzidos"""
+    tokens = []
+    for word in normalize_name(text.replace("(", " ").replace(")", " ")).split():
+        word = SYNONYMS.get(word, word)
+        for part in word.split():
+            if part not in STOPWORDS:
+                tokens.append(stem(part))
+    return tokens
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _token_weight(query_token: str, name_token: str, grams: Set[str], name_grams: Set[str]) -> float:
+    """Igual vale 1, prefixo de 4+ letras 0.8, erro de digitação vale a similaridade de trigramas"""
+    if query_token == name_token:
+        return 1.0
+    if min(len(query_token), len(name_token)) >= 4 and (
+        name_token.startswith(query_token) or query_token.startswith(name_token)
+    ):
+        return 0.8
+    similarity = _dice(grams, name_grams)
+    return similarity if similarity >= FUZZY_THRESHOLD else 0.0
+
+
+class SpecialtyMatch(NamedTuple):
+    specialty: dict
+    confidence: float
+
+
+class SpecialtyResolver:
+    """Índice de tokens/trigramas sobre o registro de especialidades"""
+
+    def __init__(self, registry: SpecialtyRegistry):
+        self.registry = registry
+        self._lock = Lock()
+        self._source: Optional[list] = None
+        # (especialidade, variantes de tokens): "GINECOLOGISTA E OBSTETRA" também
+        # casa só com "ginecologista" ou só com "obstetra"
+        self._entries: List[tuple] = []
+        # token -> especialidades; trigrama -> tokens do vocabulário
+        self._by_token: Dict[str, Set[int]] = {}
+        self._tokens_by_trigram: Dict[str, Set[str]] = {}
+        self._token_grams: Dict[str, Set[str]] = {}
+        # token da busca -> {token do vocabulário: peso}
+        self._similar_cache: Dict[str, Dict[str, float]] = {}
+
+    def _index(self):
+        """(Re)constrói o índice quando o registro recarrega o arquivo"""
+        specialties = self.registry.all()
+        if specialties is self._source:
+            return
+        with self._lock:
+            if specialties is self._source:
+                return
+            entries, by_token, tokens_by_trigram, token_grams = [], {}, {}, {}
+            for position, specialty in enumerate(specialties):
+                tokens = tokenize(specialty["nome"])
+                variants = [tokens]
+                parts = normalize_name(specialty["nome"]).split(" e ")
+                if len(parts) > 1:
+                    variants.extend(tokenize(part) for part in parts)
+                entries.append((specialty, [v for v in variants if v]))
+                for token in tokens:
+                    by_token.setdefault(token, set()).add(position)
+                    if token not in token_grams:
+                        token_grams[token] = trigrams(token)
+                        for gram in token_grams[token]:
+                            tokens_by_trigram.setdefault(gram, set()).add(token)
+            self._entries, self._by_token = entries, by_token
+            self._tokens_by_trigram, self._token_grams = tokens_by_trigram, token_grams
+            self._similar_cache = {}
+            self._source = specialties
+
+    def _similar_tokens(self, token: str) -> Dict[str, float]:
+        """Tokens do vocabulário que casam com o token da busca (via índice de trigramas)"""
+        similar = self._similar_cache.get(token)
+        if similar is not None:
+            return similar
+        grams = trigrams(token)
+        candidates = set()
+        for gram in grams:
+            candidates |= self._tokens_by_trigram.get(gram, set())
+        similar = {}
+        for name_token in candidates:
+            weight = _token_weight(token, name_token, grams, self._token_grams[name_token])
+            if weight:
+                similar[name_token] = weight
+        if len(self._similar_cache) >= 4096:
+            self._similar_cache.clear()
+        self._similar_cache[token] = similar
+        return similar
+
+    def search(self, text: str, limit: int = 5) -> List[SpecialtyMatch]:
+        """Especialidades mais parecidas com o termo, da maior para a menor confiança"""
+        self._index()
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+
+        similar = [self._similar_tokens(token) for token in tokens]
+        candidates = set()
+        for weights in similar:
+            for name_token in weights:
+                candidates |= self._by_token[name_token]
+
+        matches = []
+        for position in candidates:
+            specialty, variants = self._entries[position]
+            confidence = 0.0
+            for variant in variants:
+                # Jaccard "suave": soma dos melhores pesos de cada token da busca
+                matched = sum(max((weights.get(n, 0.0) for n in variant), default=0.0) for weights in similar)
+                confidence = max(confidence, matched / (len(tokens) + len(variant) - matched))
+            matches.append(SpecialtyMatch(specialty, round(confidence, 3)))
+
+        matches.sort(key=lambda match: (-match.confidence, len(match.specialty["nome"])))
+        return matches[:limit]
+
+    def clear_cache(self):
+        """Descarta o cache de similaridade de tokens"""
+        self._similar_cache = {}
+
+    def resolve(self, text: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[SpecialtyMatch]:
+        """Melhor especialidade para o termo, ou None se a confiança for baixa"""
+        exact = self.registry.find_by_name(text)
+        if exact:
+            return SpecialtyMatch(exact, 1.0)
+        matches = self.search(text, limit=1)
+        if matches and matches[0].confidence >= min_confidence:
+            return matches[0]
+        return None
+
+
+# Instância global sobre o registro compartilhado
+specialty_resolver = SpecialtyResolver(specialty_registry)
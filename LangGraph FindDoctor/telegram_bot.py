@@ -1,17 +1,30 @@
 """
 Bot Telegram para o FindDoctor Agent
-Implementação local que conecta ao agente LangGraph existente
+Implementação local que conecta ao agente LangGraph existente.
+O bot é assíncrono (AsyncTeleBot): cada mensagem entra na fila do seu
+usuário (UserDispatcher) e o agente, que é bloqueante, roda num pool de
+threads, então um turno lento não trava as conversas dos outros usuários.
+Pedidos determinísticos (especialidades e agendamentos) são atendidos
+pelo FastPathRouter, sem chamar o modelo
 """
 
+import argparse
+import asyncio
 import logging
 import json
 import threading
-from typing import Dict, Any
-import telebot
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, Optional
 from telebot import types
+from telebot.async_telebot import AsyncTeleBot
 
 # Imports locais
-from finddoctor_agent import ask_agent
+from fast_path import AGENT_PATH, FastPathRouter
+from finddoctor_agent import ask_agent, ask_agent_stream, fast_path_router, reset_thread
+from progressive_message import ProgressiveMessage
+from user_dispatcher import UserDispatcher
+from webhook import TelegramWebhookApp
 from formatters import (
     format_address_results, 
     format_specialties_results, 
@@ -22,6 +35,17 @@ from formatters import (
 )
 from config import (
     TELEGRAM_BOT_TOKEN, 
+    BOT_MAX_CONCURRENT_TURNS,
+    BOT_MAX_PENDING_PER_USER,
+    BOT_MAX_PENDING_TOTAL,
+    BUSY_MESSAGE,
+    FAST_PATH_ENABLED,
+    STREAM_EDIT_INTERVAL_SECONDS,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL,
     WELCOME_MESSAGE, 
     HELP_MESSAGE, 
     ERROR_MESSAGE,
@@ -37,23 +61,145 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Texto mostrado na mensagem de processamento enquanto cada ferramenta roda
+TOOL_STATUS = {
+    "search_address": "📍 Localizando o endereço...",
+    "get_specialties": "🩺 Consultando as especialidades...",
+    "search_establishments": "🏥 Buscando estabelecimentos próximos...",
+    "get_establishment_details": "🏥 Buscando detalhes do estabelecimento...",
+    "get_establishments_details": "🏥 Buscando detalhes dos estabelecimentos...",
+    "list_available_doctors": "👨‍⚕️ Listando os médicos disponíveis...",
+    "list_doctor_slots": "📅 Consultando os horários livres...",
+    "find_earliest_slots": "📅 Procurando os primeiros horários livres...",
+    "schedule_appointment": "📝 Agendando a consulta...",
+    "list_patient_appointments": "📋 Consultando seus agendamentos...",
+    "cancel_patient_appointment": "❌ Cancelando o agendamento..."
+}
+
 class FindDoctorTelegramBot:
-    def __init__(self):
+    def __init__(
+        self,
+        token: str = TELEGRAM_BOT_TOKEN,
+        agent: Callable[[str, str], Dict[str, Any]] = ask_agent,
+        reset: Callable[[str], None] = reset_thread,
+        agent_stream: Optional[Callable[[str, str], Iterator[Dict[str, Any]]]] = ask_agent_stream,
+        router: Optional[FastPathRouter] = fast_path_router if FAST_PATH_ENABLED else None
+    ):
         # Verifica se o token foi configurado
-        if TELEGRAM_BOT_TOKEN == "SEU_TOKEN_AQUI":
+        if not token or token == "SEU_TOKEN_AQUI":
             print("❌ ERRO: Configure seu token do Telegram no arquivo config.py!")
             print("   1. Abra config.py")
             print("   2. Substitua 'SEU_TOKEN_AQUI' pelo token do @BotFather")
             return
         
-        self.bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
-        self.user_reset_counts = {}  # Para gerenciar resets por usuário
+        self.bot = AsyncTeleBot(token)
+        # agent/reset são bloqueantes: rodam no pool, fora do event loop
+        self.agent = agent
+        self.reset = reset
+        # Com agent_stream, a resposta aparece aos poucos na mensagem de processamento
+        self.agent_stream = agent_stream
+        # Atalhos sem LLM; sem router todo pedido vai ao agente
+        self.router = router
+        self.executor = ThreadPoolExecutor(max_workers=BOT_MAX_CONCURRENT_TURNS, thread_name_prefix="agent")
+        self.dispatcher = UserDispatcher(
+            max_workers=BOT_MAX_CONCURRENT_TURNS,
+            max_pending_per_user=BOT_MAX_PENDING_PER_USER,
+            max_pending=BOT_MAX_PENDING_TOTAL
+        )
         self.setup_handlers()
     
     def get_thread_id(self, user_id: int) -> str:
-        """Gera thread_id único por usuário, considerando resets"""
-        reset_count = self.user_reset_counts.get(user_id, 0)
-        return f"{user_id}_{reset_count}"
+        """thread_id da conversa do usuário (o /reset apaga o histórico dela)"""
+        return str(user_id)
+    
+    async def run_blocking(self, function: Callable, *args):
+        """Executa uma chamada bloqueante (agente, checkpointer) no pool de threads"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+    
+    async def ask(self, user_message: str, user_id: int) -> Dict[str, Any]:
+        """Turno do agente na conversa do usuário"""
+        return await self.run_blocking(self.agent, user_message, self.get_thread_id(user_id))
+    
+    async def ask_streaming(self, user_message: str, user_id: int, progress: ProgressiveMessage) -> Dict[str, Any]:
+        """
+        Turno do agente em streaming: o gerador roda no pool de threads e cada
+        evento passa para o event loop, que atualiza progress. Devolve o evento
+        final (response, llm_calls), no formato de ask. Se o consumo falhar no
+        meio, o gerador é avisado por stop e fechado no próximo evento, sem que
+        o handler espere por ele
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def produce():
+            stream = self.agent_stream(user_message, self.get_thread_id(user_id))
+            try:
+                for event in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+            except Exception as e:
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(events.put_nowait, {"type": "error", "error": e})
+            finally:
+                stream.close()
+        
+        producer = loop.run_in_executor(self.executor, produce)
+        text, message_id = "", None
+        finished = False
+        try:
+            while True:
+                event = await events.get()
+                if event["type"] == "token":
+                    # Nova mensagem do modelo (ex.: depois de ferramentas): recomeça o texto
+                    if event["message_id"] != message_id:
+                        text, message_id = "", event["message_id"]
+                    text += event["content"]
+                    await progress.update(text + " ▌")
+                elif event["type"] == "tool":
+                    await progress.update(TOOL_STATUS.get(event["name"], f"🔄 Consultando {event['name']}..."))
+                elif event["type"] == "error":
+                    raise event["error"]
+                else:
+                    finished = True
+                    return event
+        finally:
+            if finished:
+                await producer
+            else:
+                stop.set()
+    
+    async def reset_conversation(self, user_id: int) -> None:
+        """Apaga o histórico salvo da conversa do usuário"""
+        await self.run_blocking(self.reset, self.get_thread_id(user_id))
+        if self.router:
+            self.router.forget(self.get_thread_id(user_id))
+    
+    async def answer_fast_path(self, message, text: str) -> bool:
+        """Responde pelo atalho sem LLM quando text cai num; False se precisa do agente"""
+        if not self.router:
+            return False
+        try:
+            routed = await self.run_blocking(self.router.route, text, self.get_thread_id(message.from_user.id))
+        except Exception as e:
+            logger.error(f"Erro no atalho, seguindo pelo agente: {e}")
+            return False
+        if routed is None:
+            return False
+        for msg in split_long_message(routed["response"], MAX_MESSAGE_LENGTH):
+            await self.bot.send_message(message.chat.id, msg, parse_mode='Markdown')
+        return True
+    
+    def stats(self) -> Dict[str, Any]:
+        """Fila (UserDispatcher) e, por caminho, turnos, chamadas ao LLM e latência"""
+        return {**self.dispatcher.stats(), "paths": self.router.stats() if self.router else None}
+    
+    async def enqueue(self, message, job: Callable) -> None:
+        """Coloca job na fila do usuário; com a fila cheia, avisa em vez de enfileirar"""
+        if not self.dispatcher.submit(message.from_user.id, job):
+            logger.warning(f"Fila cheia para o usuário {message.from_user.id}: {self.dispatcher.stats()}")
+            await self.bot.reply_to(message, BUSY_MESSAGE)
     
     def create_main_keyboard(self):
         """Cria teclado principal com comandos"""
@@ -71,7 +217,7 @@ class FindDoctorTelegramBot:
         """Configura todos os handlers do bot"""
         
         @self.bot.message_handler(commands=['start'])
-        def start_command(message):
+        async def start_command(message):
             """Comando /start - Boas-vindas"""
             user_id = message.from_user.id
             user_name = message.from_user.first_name
@@ -80,7 +226,7 @@ class FindDoctorTelegramBot:
             
             keyboard = self.create_main_keyboard()
             
-            self.bot.reply_to(
+            await self.bot.reply_to(
                 message,
                 WELCOME_MESSAGE,
                 parse_mode='Markdown',
@@ -88,112 +234,39 @@ class FindDoctorTelegramBot:
             )
         
         @self.bot.message_handler(commands=['help'])
-        def help_command(message):
+        async def help_command(message):
             """Comando /help - Ajuda"""
-            self.bot.reply_to(message, HELP_MESSAGE, parse_mode='Markdown')
+            await self.bot.reply_to(message, HELP_MESSAGE, parse_mode='Markdown')
         
         @self.bot.message_handler(commands=['reset'])
-        def reset_command(message):
-            """Comando /reset - Limpar conversa"""
-            user_id = message.from_user.id
-            
-            # Incrementa contador de reset
-            if user_id not in self.user_reset_counts:
-                self.user_reset_counts[user_id] = 0
-            self.user_reset_counts[user_id] += 1
-            
-            self.bot.reply_to(
-                message,
-                "🔄 **Conversa reiniciada!**\n\n"
-                "Seu histórico foi limpo. Como posso ajudar você agora?",
-                parse_mode='Markdown'
-            )
+        async def reset_command(message):
+            """Comando /reset - Limpar conversa (na fila do usuário, depois do turno em andamento)"""
+            await self.enqueue(message, lambda: self.reset_and_reply(message))
         
         @self.bot.message_handler(commands=['especialidades'])
-        def specialties_command(message):
+        async def specialties_command(message):
             """Comando /especialidades - Mostrar especialidades"""
-            processing_msg = self.bot.reply_to(message, PROCESSING_MESSAGE)
-            
-            try:
-                user_id = self.get_thread_id(message.from_user.id)
-                
-                # Chama o agente para obter especialidades
-                result = ask_agent("Mostre todas as especialidades médicas disponíveis", thread_id=user_id)
-                response = result.get('response', '')
-                
-                # Deleta mensagem de processamento
-                self.bot.delete_message(message.chat.id, processing_msg.message_id)
-                
-                # Formata resposta
-                formatted_response = self.format_response_by_content(response)
-                
-                # Divide mensagem se muito longa
-                messages = split_long_message(formatted_response, MAX_MESSAGE_LENGTH)
-                for msg in messages:
-                    self.bot.send_message(message.chat.id, msg, parse_mode='Markdown')
-                    
-            except Exception as e:
-                logger.error(f"Erro ao buscar especialidades: {e}")
-                self.bot.delete_message(message.chat.id, processing_msg.message_id)
-                self.bot.reply_to(message, ERROR_MESSAGE)
+            await self.enqueue(message, lambda: self.answer_specialties(message))
         
         @self.bot.message_handler(func=lambda message: True)
-        def handle_message(message):
+        async def handle_message(message):
             """Manipula mensagens de texto do usuário"""
-            user_message = message.text
-            user_id = self.get_thread_id(message.from_user.id)
-            user_name = message.from_user.first_name
-            
-            logger.info(f"Mensagem de {user_name} (ID: {user_id}): {user_message}")
-            
-            # Mostra indicador de "digitando"
-            self.bot.send_chat_action(message.chat.id, 'typing')
-            
-            # Envia mensagem de processamento
-            processing_msg = self.bot.reply_to(message, PROCESSING_MESSAGE)
-            
-            try:
-                # Chama o agente FindDoctor
-                result = ask_agent(user_message, thread_id=user_id)
-                response = result.get('response', '')
-                
-                # Deleta mensagem de processamento
-                self.bot.delete_message(message.chat.id, processing_msg.message_id)
-                
-                if not response:
-                    self.bot.reply_to(message, NO_RESULTS_MESSAGE)
-                    return
-                
-                # Formata resposta baseada no tipo de conteúdo
-                formatted_response = self.format_response_by_content(response)
-                
-                # Divide mensagem se muito longa
-                messages = split_long_message(formatted_response, MAX_MESSAGE_LENGTH)
-                for msg in messages:
-                    self.bot.send_message(message.chat.id, msg, parse_mode='Markdown')
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar mensagem: {e}")
-                try:
-                    self.bot.delete_message(message.chat.id, processing_msg.message_id)
-                except:
-                    pass
-                self.bot.reply_to(message, ERROR_MESSAGE)
+            await self.enqueue(message, lambda: self.answer_message(message))
         
         @self.bot.callback_query_handler(func=lambda call: True)
-        def handle_callback(call):
+        async def handle_callback(call):
             """Manipula cliques em botões inline"""
             try:
-                self.bot.answer_callback_query(call.id)
+                await self.bot.answer_callback_query(call.id)
                 
                 if call.data == "especialidades":
                     # Simula comando de especialidades
                     message = call.message
                     message.from_user = call.from_user
-                    specialties_command(message)
+                    await specialties_command(message)
                     
                 elif call.data == "help":
-                    self.bot.edit_message_text(
+                    await self.bot.edit_message_text(
                         HELP_MESSAGE,
                         call.message.chat.id,
                         call.message.message_id,
@@ -201,24 +274,125 @@ class FindDoctorTelegramBot:
                     )
                     
                 elif call.data == "reset":
-                    user_id = call.from_user.id
-                    
-                    # Incrementa contador de reset
-                    if user_id not in self.user_reset_counts:
-                        self.user_reset_counts[user_id] = 0
-                    self.user_reset_counts[user_id] += 1
-                    
-                    self.bot.edit_message_text(
-                        "🔄 **Conversa reiniciada!**\n\n"
-                        "Seu histórico foi limpo. Como posso ajudar você agora?",
-                        call.message.chat.id,
-                        call.message.message_id,
-                        parse_mode='Markdown'
-                    )
+                    message = call.message
+                    message.from_user = call.from_user
+                    await self.enqueue(message, lambda: self.reset_and_edit(call))
                     
             except Exception as e:
                 logger.error(f"Erro ao processar callback: {e}")
     
+    async def reset_and_reply(self, message):
+        """/reset: apaga o histórico e confirma"""
+        await self.reset_conversation(message.from_user.id)
+        
+        await self.bot.reply_to(
+            message,
+            "🔄 **Conversa reiniciada!**\n\n"
+            "Seu histórico foi limpo. Como posso ajudar você agora?",
+            parse_mode='Markdown'
+        )
+    
+    async def reset_and_edit(self, call):
+        """Botão de reset: apaga o histórico e troca o texto da mensagem do botão"""
+        await self.reset_conversation(call.from_user.id)
+        
+        await self.bot.edit_message_text(
+            "🔄 **Conversa reiniciada!**\n\n"
+            "Seu histórico foi limpo. Como posso ajudar você agora?",
+            call.message.chat.id,
+            call.message.message_id,
+            parse_mode='Markdown'
+        )
+    
+    async def answer_specialties(self, message):
+        """Responde /especialidades pelo registro local (pelo agente só sem router)"""
+        if await self.answer_fast_path(message, "/especialidades"):
+            return
+        
+        processing_msg = await self.bot.reply_to(message, PROCESSING_MESSAGE)
+        
+        try:
+            # Chama o agente para obter especialidades
+            result = await self.ask("Mostre todas as especialidades médicas disponíveis", message.from_user.id)
+            response = result.get('response', '')
+            
+            # Deleta mensagem de processamento
+            await self.bot.delete_message(message.chat.id, processing_msg.message_id)
+            
+            # Formata resposta
+            formatted_response = self.format_response_by_content(response)
+            
+            # Divide mensagem se muito longa
+            messages = split_long_message(formatted_response, MAX_MESSAGE_LENGTH)
+            for msg in messages:
+                await self.bot.send_message(message.chat.id, msg, parse_mode='Markdown')
+                
+        except Exception as e:
+            logger.error(f"Erro ao buscar especialidades: {e}")
+            await self.bot.delete_message(message.chat.id, processing_msg.message_id)
+            await self.bot.reply_to(message, ERROR_MESSAGE)
+    
+    async def answer_message(self, message):
+        """Responde uma mensagem de texto com um turno do agente"""
+        user_message = message.text
+        user_id = self.get_thread_id(message.from_user.id)
+        user_name = message.from_user.first_name
+        
+        logger.info(f"Mensagem de {user_name} (ID: {user_id}): {user_message}")
+        
+        # Pedidos determinísticos não passam pelo modelo
+        if await self.answer_fast_path(message, user_message):
+            return
+        
+        # Mostra indicador de "digitando"
+        await self.bot.send_chat_action(message.chat.id, 'typing')
+        
+        # Envia mensagem de processamento
+        processing_msg = await self.bot.reply_to(message, PROCESSING_MESSAGE)
+        
+        try:
+            # Chama o agente FindDoctor
+            started = time.perf_counter()
+            progress = None
+            if self.agent_stream:
+                progress = ProgressiveMessage(
+                    self.bot, message.chat.id, processing_msg.message_id,
+                    interval=STREAM_EDIT_INTERVAL_SECONDS, max_length=MAX_MESSAGE_LENGTH
+                )
+                result = await self.ask_streaming(user_message, message.from_user.id, progress)
+            else:
+                result = await self.ask(user_message, message.from_user.id)
+            response = result.get('response', '')
+            if self.router:
+                self.router.record(AGENT_PATH, (time.perf_counter() - started) * 1000, result.get('llm_calls', 0))
+            
+            if not response:
+                await self.bot.delete_message(message.chat.id, processing_msg.message_id)
+                await self.bot.reply_to(message, NO_RESULTS_MESSAGE)
+                return
+            
+            # Formata resposta baseada no tipo de conteúdo
+            formatted_response = self.format_response_by_content(response)
+            
+            # Divide mensagem se muito longa
+            messages = split_long_message(formatted_response, MAX_MESSAGE_LENGTH)
+            
+            # A primeira parte substitui a mensagem de processamento (já editada no streaming)
+            if progress and await progress.finish(messages[0], parse_mode='Markdown'):
+                messages = messages[1:]
+            else:
+                await self.bot.delete_message(message.chat.id, processing_msg.message_id)
+            for msg in messages:
+                await self.bot.send_message(message.chat.id, msg, parse_mode='Markdown')
+            
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem: {e}")
+            try:
+                await self.bot.delete_message(message.chat.id, processing_msg.message_id)
+            except:
+                pass
+            await self.bot.reply_to(message, ERROR_MESSAGE)
+    
     def format_response_by_content(self, response: str) -> str:
         """Formata resposta baseada no conteúdo"""
         try:
@@ -269,16 +443,50 @@ class FindDoctorTelegramBot:
         
         try:
             # Inicia o bot
-            self.bot.polling(none_stop=True)
+            asyncio.run(self.bot.polling(non_stop=True))
         except Exception as e:
             logger.error(f"Erro no bot: {e}")
             raise
+        finally:
+            self.executor.shutdown(wait=False)
+    
+    def webhook_app(self, secret_token: str = WEBHOOK_SECRET_TOKEN, webhook_url: str = WEBHOOK_URL) -> TelegramWebhookApp:
+        """App ASGI do modo webhook, ligada aos mesmos handlers do polling"""
+        return TelegramWebhookApp(
+            self.bot,
+            secret_token=secret_token,
+            path=WEBHOOK_PATH,
+            webhook_url=webhook_url or None,
+            stats=self.stats
+        )
+    
+    def start_webhook(self):
+        """Inicia o bot recebendo os updates por webhook"""
+        import uvicorn
+        
+        if not WEBHOOK_URL or not WEBHOOK_SECRET_TOKEN:
+            print("❌ ERRO: Configure WEBHOOK_URL e WEBHOOK_SECRET_TOKEN no arquivo config.py!")
+            return
+        
+        print("🤖 FindDoctor Telegram Bot iniciando (webhook)...")
+        print(f"📱 Recebendo updates em {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        try:
+            uvicorn.run(self.webhook_app(), host=WEBHOOK_HOST, port=WEBHOOK_PORT, log_level="warning")
+        finally:
+            self.executor.shutdown(wait=False)
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Bot Telegram do FindDoctor")
+    parser.add_argument("--webhook", action="store_true", help="recebe updates por webhook em vez de polling")
+    args = parser.parse_args()
+    
     bot = FindDoctorTelegramBot()
     try:
-        bot.start_bot()
+        if args.webhook:
+            bot.start_webhook()
+        else:
+            bot.start_bot()
     except KeyboardInterrupt:
         print("\n🛑 Bot parado pelo usuário")
     except Exception as e:
@@ -0,0 +1,103 @@
+"""
+Despacho das mensagens do bot por usuário
+Mensagens do mesmo usuário são processadas em ordem, uma por vez (o turno
+seguinte vê o histórico do anterior); usuários diferentes rodam em paralelo,
+até max_workers turnos ao mesmo tempo. submit recusa a mensagem (devolve
+False) quando o usuário já tem max_pending_per_user mensagens esperando ou o
+total de mensagens na fila chega a max_pending: o bot avisa o usuário em vez
+de acumular trabalho sem limite (as contagens incluem a mensagem em andamento)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class UserDispatcher:
+    def __init__(self, max_workers: int, max_pending_per_user: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending_per_user = max_pending_per_user
+        self.max_pending = max_pending
+        self._queues: Dict[Hashable, Deque[Tuple[Job, float]]] = {}
+        self._tasks = set()
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.pending = 0  # na fila ou em execução
+        self.active = 0
+        self.reset_stats()
+
+    def submit(self, key: Hashable, job: Job) -> bool:
+        """Enfileira job na fila do usuário key; False se a fila estiver cheia"""
+        queue = self._queues.get(key)
+        if self.pending >= self.max_pending or (queue is not None and len(queue) >= self.max_pending_per_user):
+            self.rejected += 1
+            return False
+
+        self.pending += 1
+        self.submitted += 1
+        self._idle.clear()
+        if queue is not None:
+            queue.append((job, time.monotonic()))
+        else:
+            queue = self._queues[key] = deque([(job, time.monotonic())])
+            task = asyncio.get_running_loop().create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _drain(self, key: Hashable, queue: Deque[Tuple[Job, float]]) -> None:
+        """Executa os jobs de um usuário em ordem; a fila some quando esvazia"""
+        try:
+            while queue:
+                # O job só sai da fila ao terminar: len(queue) inclui o que está rodando
+                job, queued_at = queue[0]
+                async with self._semaphore:
+                    wait_ms = (time.monotonic() - queued_at) * 1000
+                    self.total_wait_ms += wait_ms
+                    self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+                    self.active += 1
+                    self.max_active = max(self.max_active, self.active)
+                    try:
+                        await job()
+                        self.completed += 1
+                    except Exception:
+                        self.failed += 1
+                        logger.exception(f"Erro ao processar mensagem do usuário {key}")
+                    finally:
+                        queue.popleft()
+                        self.active -= 1
+                        self.pending -= 1
+                        if self.pending == 0:
+                            self._idle.set()
+        finally:
+            del self._queues[key]
+
+    async def join(self) -> None:
+        """Espera todas as mensagens aceitas terminarem"""
+        await self._idle.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        started = self.completed + self.failed + self.active
+        return {
+            "users": len(self._queues),
+            "pending": self.pending,
+            "active": self.active,
+            "max_active": self.max_active,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_ms / started, 1) if started else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 1)
+        }
+
+    def reset_stats(self) -> None:
+        self.submitted = self.rejected = self.completed = self.failed = 0
+        self.max_active = 0
+        self.total_wait_ms = self.max_wait_ms = 0.0
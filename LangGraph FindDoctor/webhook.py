@@ -0,0 +1,133 @@
+"""
+Modo webhook do bot: app ASGI que recebe os updates do Telegram por POST
+Cada requisição tem o cabeçalho X-Telegram-Bot-Api-Secret-Token conferido
+com o segredo registrado no setWebhook; o update vai para os mesmos handlers
+do modo polling (process_new_updates). Sem estado além da deduplicação de
+update_id, então várias réplicas podem ficar atrás de um balanceador (com
+CHECKPOINTER_BACKEND "postgres" o histórico é compartilhado entre elas).
+GET /health responde 200 com as estatísticas da fila, para o balanceador
+
+    curl -X POST localhost:8080/telegram/webhook \
+         -H "X-Telegram-Bot-Api-Secret-Token: $SEGREDO" \
+         -H "Content-Type: application/json" -d @sample_update.json
+"""
+import hmac
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from telebot import asyncio_helper, types
+from telebot.async_telebot import AsyncTeleBot
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+# update_ids recentes lembrados: o Telegram reenvia o update se a resposta falhar
+RECENT_UPDATES = 1000
+
+
+class TelegramWebhookApp:
+    def __init__(
+        self,
+        bot: AsyncTeleBot,
+        secret_token: str,
+        path: str = "/telegram/webhook",
+        webhook_url: Optional[str] = None,
+        max_body_bytes: int = 1024 * 1024,
+        stats: Optional[Callable[[], Dict[str, Any]]] = None
+    ):
+        if not secret_token:
+            raise ValueError("O modo webhook exige um secret_token")
+        self.bot = bot
+        self.secret_token = secret_token.encode()
+        self.path = path
+        self.webhook_url = webhook_url
+        self.max_body_bytes = max_body_bytes
+        self.stats = stats
+        self._recent: "OrderedDict[int, None]" = OrderedDict()
+        self.received = self.duplicates = self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            status, body = await self._handle(scope, receive)
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json")]
+            })
+            await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.webhook_url:
+                        # Idempotente: cada réplica pode registrar a mesma URL
+                        await self.bot.set_webhook(url=self.webhook_url, secret_token=self.secret_token.decode())
+                        logger.info(f"Webhook registrado em {self.webhook_url}")
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if asyncio_helper.session_manager.session is not None:
+                    await asyncio_helper.session_manager.session.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _handle(self, scope, receive):
+        path, method = scope["path"], scope["method"]
+        if path == "/health" and method == "GET":
+            return 200, {"status": "ok", "webhook": self.counters(), "queue": self.stats() if self.stats else None}
+        if path != self.path:
+            return 404, {"error": "não encontrado"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+
+        headers = dict(scope["headers"])
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, b""), self.secret_token):
+            self.rejected += 1
+            return 401, {"error": "secret token inválido"}
+
+        body = await self._read_body(receive)
+        if body is None:
+            self.rejected += 1
+            return 413, {"error": "corpo grande demais"}
+        try:
+            update = types.Update.de_json(json.loads(body))
+        except (ValueError, KeyError, TypeError):
+            self.rejected += 1
+            return 400, {"error": "update inválido"}
+
+        if update.update_id in self._recent:
+            self.duplicates += 1
+            return 200, {"ok": True, "duplicate": True}
+        self._recent[update.update_id] = None
+        while len(self._recent) > RECENT_UPDATES:
+            self._recent.popitem(last=False)
+
+        self.received += 1
+        # Os handlers só enfileiram o turno do agente: a resposta ao Telegram é rápida
+        await self.bot.process_new_updates([update])
+        return 200, {"ok": True}
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        """Corpo da requisição, ou None se passar de max_body_bytes"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    def counters(self) -> Dict[str, int]:
+        return {"received": self.received, "duplicates": self.duplicates, "rejected": self.rejected}